@@ -1,4 +1,4 @@
-import asyncio, random, string
+import asyncio, random, string, threading, time
 import nest_asyncio
 
 nest_asyncio.apply()
@@ -11,7 +11,7 @@ from enum import Enum
 import uuid
 import models
 
-from python.helpers import extract_tools, files, errors, history, tokens, context as context_helper
+from python.helpers import extract_tools, files, errors, history, tokens, context as context_helper, shell_pool, browser_pool
 from python.helpers import dirty_json
 from python.helpers.print_style import PrintStyle
 
@@ -40,6 +40,9 @@ class AgentContext:
     _contexts: dict[str, "AgentContext"] = {}
     _counter: int = 0
     _notification_manager = None
+    _load_lock = threading.RLock()
+    _version: int = 0  # last change of any context or of the context list
+    _version_lock = threading.Lock()
 
     def __init__(
         self,
@@ -56,6 +59,8 @@ class AgentContext:
         data: dict | None = None,
         output_data: dict | None = None,
         set_current: bool = False,
+        loader: Callable[["AgentContext"], None] | None = None,
+        log_output: dict | None = None,
     ):
         # initialize context
         self.id = id or AgentContext.generate_id()
@@ -67,13 +72,24 @@ class AgentContext:
             AgentContext.set_current(self.id)
 
         # initialize state
+        self.version = 0
         self.name = name
         self.config = config
-        self.log = log or Log.Log()
-        self.log.context = self
-        self.Delta = Delta or Agent(0, self.config, self)
+        # chats restored from their index load log and agents on first access
+        self._loader = loader
+        self._loaded = loader is None
+        self._loading = False
+        self._unloading: int | None = None  # thread saving the context to unload it
+        self._log_output = log_output or {}  # log fields of output() until loaded
+        self._log: Log.Log | None = None
+        self._Delta: Agent | None = None
+        self._streaming_agent: Agent | None = None
+        self.last_access = time.monotonic()
+        if not loader:
+            self.log = log or Log.Log()
+            self.Delta = Delta or Agent(0, self.config, self)
+            self.streaming_agent = streaming_agent
         self.paused = paused
-        self.streaming_agent = streaming_agent
         self.task: DeferredTask | None = None
         self.created_at = created_at or datetime.now(timezone.utc)
         self.type = type
@@ -82,8 +98,147 @@ class AgentContext:
         self.last_message = last_message or datetime.now(timezone.utc)
         self.data = data or {}
         self.output_data = output_data or {}
+        self.mark_changed()
+
+
+    @property
+    def log(self) -> Log.Log:
+        self._touch()
+        log = self._log
+        if log is None:
+            self.load()
+            log = self._log
+        return log  # type: ignore[return-value]
+
+    @log.setter
+    def log(self, log: Log.Log):
+        self._log = log
+        log.context = self
+        self.mark_changed()
+
+    @property
+    def Delta(self) -> "Agent":
+        self._touch()
+        agent = self._Delta
+        if agent is None:
+            self.load()
+            agent = self._Delta
+        return agent  # type: ignore[return-value]
+
+    @Delta.setter
+    def Delta(self, agent: "Agent"):
+        self._Delta = agent
+
+    @property
+    def streaming_agent(self) -> "Agent|None":
+        self._touch()
+        self.load()
+        return self._streaming_agent
+
+    @streaming_agent.setter
+    def streaming_agent(self, agent: "Agent|None"):
+        self._streaming_agent = agent
+
+    @property
+    def name(self) -> str | None:
+        return self._name
+
+    @name.setter
+    def name(self, name: str | None):
+        self._name = name
+        self.mark_changed()
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    @paused.setter
+    def paused(self, paused: bool):
+        self._paused = paused
+        self.mark_changed()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def mark_changed(self):
+        """Gives the context a new version, polls send changed contexts to clients."""
+        with AgentContext._version_lock:
+            AgentContext._version += 1
+            self.version = AgentContext._version
 
+    @staticmethod
+    def get_version() -> int:
+        """Version of the context list, increases when any context changes or is removed."""
+        return AgentContext._version
+
+    def _touch(self):
+        unloading = self._unloading
+        if unloading == threading.get_ident():
+            return  # saved by unload, not a use
+        self.last_access = time.monotonic()
+        if unloading:
+            # wait for the running unload, if it released the context it loads again from disk
+            with AgentContext._load_lock:
+                pass
 
+    def load(self):
+        """Loads the log and agents of a context restored from its index."""
+        if self._loaded:
+            return
+        with AgentContext._load_lock:
+            # loaded by another thread meanwhile, or accessed by the loader itself
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+            try:
+                self._loader(self)  # type: ignore[misc]
+            except Exception as e:
+                PrintStyle.error(f"Error loading chat {self.id}: {e}")
+            finally:
+                if self._log is None:
+                    self.log = Log.Log()
+                if self._Delta is None:
+                    self.Delta = Agent(0, self.config, self)
+                self._loader = None
+                self._loaded = True
+                self._loading = False
+
+    def unload(
+        self,
+        loader: Callable[["AgentContext"], None],
+        save: Callable[["AgentContext"], None] | None = None,
+        min_idle: float = 0,
+    ) -> "Agent|None":
+        """
+        Saves and releases the log and agents of an idle context, loader restores them
+        on next access. Returns the released top agent, None if the context is in use.
+        """
+        with AgentContext._load_lock:
+            if not self._loaded or self._loading or (self.task and self.task.is_alive()):
+                return None
+            if time.monotonic() - self.last_access < min_idle:
+                return None
+            if save:
+                accessed, task = self.last_access, self.task
+                self._unloading = threading.get_ident()
+                try:
+                    save(self)
+                finally:
+                    self._unloading = None
+                # used by another thread while saving, it may hold the agents
+                if self.last_access != accessed or self.task is not task or (
+                    self.task and self.task.is_alive()
+                ):
+                    return None
+            agent = self._Delta
+            self._log_output = self._get_log_output()
+            self._loaded = False
+            self._loader = loader
+            self._log = None
+            self._Delta = None
+            self._streaming_agent = None
+            return agent
 
     @staticmethod
     def get(id: str):
@@ -138,8 +293,13 @@ class AgentContext:
     @staticmethod
     def remove(id: str):
         context = AgentContext._contexts.pop(id, None)
+        if context:
+            with AgentContext._version_lock:
+                AgentContext._version += 1
         if context and context.task:
             context.task.kill()
+        shell_pool.close_pools(id)
+        browser_pool.close_pools(id)
         return context
 
     def get_data(self, key: str, recursive: bool = True):
@@ -157,6 +317,7 @@ class AgentContext:
     def set_output_data(self, key: str, value: Any, recursive: bool = True):
         # recursive is not used now, prepared for context hierarchy
         self.output_data[key] = value
+        self.mark_changed()
 
     def output(self):
         # Defensive check for created_at attribute (in case object was created without going through __init__)
@@ -175,9 +336,7 @@ class AgentContext:
                 else Localization.get().serialize_datetime(datetime.fromtimestamp(0))
             ),
             "no": self.no,
-            "log_guid": self.log.guid,
-            "log_version": len(self.log.updates),
-            "log_length": len(self.log.logs),
+            **self._get_log_output(),
             "paused": self.paused,
             "last_message": (
                 Localization.get().serialize_datetime(self.last_message)
@@ -188,6 +347,21 @@ class AgentContext:
             **self.output_data,
         }
 
+    def _get_log_output(self):
+        # listing contexts does not load them or count as their use
+        log = self._log
+        if not self._loaded or log is None:
+            return {
+                "log_guid": self._log_output.get("log_guid", ""),
+                "log_version": self._log_output.get("log_version", 0),
+                "log_length": self._log_output.get("log_length", 0),
+            }
+        return {
+            "log_guid": log.guid,
+            "log_version": len(log.updates),
+            "log_length": len(log.logs),
+        }
+
     @staticmethod
     def log_to_all(
         type: Log.Type,
@@ -201,6 +375,8 @@ class AgentContext:
     ) -> list[Log.LogItem]:
         items: list[Log.LogItem] = []
         for context in AgentContext.all():
+            if not context.is_loaded:
+                continue  # chats not loaded yet show their saved log
             items.append(
                 context.log.log(
                     type, heading, content, kvps, temp, update_progress, id, **kwargs
@@ -214,6 +390,7 @@ class AgentContext:
 
     def reset(self):
         self.kill_process()
+        browser_pool.close_pools(self.id, stop_thread=False)
         self.log.reset()
         self.Delta = Agent(0, self.config, self)
         self.streaming_agent = None
@@ -338,6 +515,8 @@ class Agent:
     DATA_NAME_SUPERIOR = "_superior"
     DATA_NAME_SUBORDINATE = "_subordinate"
     DATA_NAME_CTX_WINDOW = "ctx_window"
+    DATA_NAME_CTX_WINDOW_PROMPT = "_ctx_window_prompt"
+    DATA_NAME_PROMPT_PARTS = "_prompt_parts"
 
     def __init__(
         self, number: int, config: AgentConfig, context: AgentContext | None = None
@@ -497,6 +676,7 @@ class Agent:
         # set system prompt and message history
         loop_data.system = await self.get_system_prompt(self.loop_data)
         loop_data.history_output = self.history.output()
+        history_prefix_length = self.history.get_stable_prefix_length()
 
         # and allow extensions to edit them
         await self.call_extensions("message_loop_prompts_after", loop_data=loop_data)
@@ -521,24 +701,42 @@ class Agent:
             loop_data.history_output + extras
         )
 
+        # mark the end of the summarized history for provider prompt caching
+        prefix_end = history.get_prefix_end_index(
+            loop_data.history_output + extras, history_prefix_length
+        )
+        if prefix_end >= 0:
+            history_langchain[prefix_end].additional_kwargs[
+                models.CACHE_BREAKPOINT_KWARG
+            ] = True
+
         # build full prompt from system prompt, message history and extrS
         full_prompt: list[BaseMessage] = [
             SystemMessage(content=system_text),
             *history_langchain,
         ]
-        full_text = ChatPromptTemplate.from_messages(full_prompt).format()
 
-        # store as last context window content
-        self.set_data(
-            Agent.DATA_NAME_CTX_WINDOW,
-            {
-                "text": full_text,
-                "tokens": tokens.approximate_tokens(full_text),
-            },
-        )
+        # store as last context window content, text is only formatted when requested
+        self.set_data(Agent.DATA_NAME_CTX_WINDOW_PROMPT, full_prompt)
+        self.data.pop(Agent.DATA_NAME_CTX_WINDOW, None)
 
         return full_prompt
 
+    def get_ctx_window(self) -> dict[str, Any] | None:
+        window = self.get_data(Agent.DATA_NAME_CTX_WINDOW)
+        if window and isinstance(window, dict):
+            return window
+        full_prompt = self.get_data(Agent.DATA_NAME_CTX_WINDOW_PROMPT)
+        if not full_prompt:
+            return None
+        full_text = ChatPromptTemplate.from_messages(full_prompt).format()
+        window = {
+            "text": full_text,
+            "tokens": tokens.approximate_tokens(full_text),
+        }
+        self.set_data(Agent.DATA_NAME_CTX_WINDOW, window)
+        return window
+
     def handle_critical_exception(self, exception: Exception):
         if isinstance(exception, HandledException):
             raise exception  # Re-raise the exception to kill the loop
@@ -576,6 +774,21 @@ class Agent:
         )
         return system_prompt
 
+    def get_prompt_part(
+        self, name: str, fingerprint: Any, build: Callable[[], str]
+    ) -> str:
+        """Return a cached system prompt part, rebuilding it only when its fingerprint or prompt files change."""
+        parts: dict[str, tuple[Any, files.PromptDependencies, str]] = self.data.setdefault(
+            Agent.DATA_NAME_PROMPT_PARTS, {}
+        )
+        cached = parts.get(name)
+        if cached and cached[0] == fingerprint and cached[1].is_fresh():
+            return cached[2]
+        with files.track_prompt_dependencies() as dependencies:
+            text = build()
+        parts[name] = (fingerprint, dependencies, text)
+        return text
+
     def parse_prompt(self, _prompt_file: str, **kwargs):
         dirs = [files.get_abs_path("prompts")]
         if (
@@ -705,6 +918,7 @@ class Agent:
         message: str,
         callback: Callable[[str], Awaitable[None]] | None = None,
         background: bool = False,
+        cache: bool = True,
     ):
         model = self.get_utility_model()
 
@@ -723,13 +937,29 @@ class Agent:
             if call_data["callback"]:
                 await call_data["callback"](chunk)
 
-        response, _reasoning = await call_data["model"].unified_call(
-            system_message=call_data["system"],
-            user_message=call_data["message"],
-            response_callback=stream_callback if call_data["callback"] else None,
-            rate_limiter_callback=self.rate_limiter_callback if not call_data["background"] else None,
-        )
+        async def call():
+            response, _reasoning = await call_data["model"].unified_call(
+                system_message=call_data["system"],
+                user_message=call_data["message"],
+                response_callback=stream_callback if call_data["callback"] else None,
+                rate_limiter_callback=self.rate_limiter_callback if not call_data["background"] else None,
+            )
+            return response
+
+        # identical utility prompts can be served from the response cache if enabled for the model
+        cache_ttl = models.get_response_cache_ttl(call_data["model"]) if cache else 0
+        if not cache_ttl:
+            return await call()
 
+        key = models.ResponseCache.make_key(
+            call_data["model"].model_name,
+            call_data["system"],
+            call_data["message"],
+            call_data["model"].kwargs,
+        )
+        response, cached = await models.response_cache.get_or_call(key, call, cache_ttl)
+        if cached and call_data["callback"]:
+            await call_data["callback"](response)
         return response
 
     async def call_chat_model(
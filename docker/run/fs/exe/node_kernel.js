@@ -0,0 +1,95 @@
+#!/usr/bin/env node
+
+// Long-lived Node.js kernel for the code execution tool.
+// Reads one JSON request per line from stdin, {"code": "..."}, evaluates it in a persistent
+// context and prints the kernel prompt when done.
+
+const vm = require('vm');
+const path = require('path');
+const readline = require('readline');
+const util = require('util');
+
+const PROMPT = '[node kernel] >>> ';
+
+// Enhance `require` to search CWD first, then globally
+function customRequire(moduleName) {
+  try {
+    const cwdPath = require.resolve(moduleName, { paths: [path.join(process.cwd(), 'node_modules')] });
+    return require(cwdPath);
+  } catch (cwdErr) {
+    try {
+      return require(moduleName);
+    } catch (globalErr) {
+      console.error(`Cannot find module: ${moduleName}`);
+      throw globalErr;
+    }
+  }
+}
+
+// One context for the kernel lifetime, top-level declarations persist between requests
+const context = vm.createContext({
+  ...global,
+  require: customRequire,
+  __filename: path.join(process.cwd(), 'eval.js'),
+  __dirname: process.cwd(),
+  module: { exports: {} },
+  exports: module.exports,
+  console: console,
+  process: process,
+  Buffer: Buffer,
+  setTimeout: setTimeout,
+  setInterval: setInterval,
+  setImmediate: setImmediate,
+  clearTimeout: clearTimeout,
+  clearInterval: clearInterval,
+  clearImmediate: clearImmediate,
+});
+
+let counter = 0;
+
+async function run(code) {
+  let result;
+  try {
+    result = vm.runInContext(code, context, { filename: 'eval.js' });
+  } catch (error) {
+    if (error.name !== 'SyntaxError' || !/await/.test(error.message)) throw error;
+    // top-level await, run as an async expression or else as an async function body
+    try {
+      result = vm.runInContext(`(async () => (\n${code}\n))()`, context, { filename: 'eval.js' });
+    } catch (expressionError) {
+      if (expressionError.name !== 'SyntaxError') throw expressionError;
+      result = vm.runInContext(`(async () => {\n${code}\n})()`, context, { filename: 'eval.js' });
+    }
+  }
+  result = await result;
+  counter += 1;
+  if (result !== undefined) console.log(`Out[${counter}]:`, util.inspect(result));
+}
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+let queue = Promise.resolve();
+
+rl.on('line', (line) => {
+  line = line.trim();
+  if (!line) return;
+  queue = queue.then(async () => {
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (error) {
+      console.error(`Invalid kernel request: ${error.message}`);
+      process.stdout.write('\n' + PROMPT);
+      return;
+    }
+    if (request.exit) process.exit(0);
+    try {
+      await run(request.code || '');
+    } catch (error) {
+      console.error(error);
+    }
+    process.stdout.write('\n' + PROMPT);
+  });
+});
+rl.on('close', () => queue.then(() => process.exit(0)));
+
+process.stdout.write('\n' + PROMPT);
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Long-lived Python kernel for the code execution tool.
+
+Reads one JSON request per line from stdin, {"code": "..."}, runs it in a persistent
+IPython namespace and prints the kernel prompt when done. Ctrl+C interrupts the running
+cell without losing state. Cells get an empty stdin, so input() raises EOFError instead
+of consuming the next request.
+"""
+
+import json
+import os
+import sys
+
+PROMPT = "[python kernel] >>> "
+
+
+def _create_runner():
+    try:
+        from IPython.core.interactiveshell import InteractiveShell
+
+        shell = InteractiveShell.instance(colors="NoColor")
+
+        def run(code: str):
+            shell.run_cell(code, store_history=True)
+
+        return run
+    except ImportError:
+        # plain interpreter when IPython is missing, echoes the last expression like the REPL
+        import ast
+        import traceback
+
+        namespace = {"__name__": "__main__"}
+
+        def run(code: str):
+            try:
+                tree = ast.parse(code, "<cell>", "exec")
+                last = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+                exec(compile(tree, "<cell>", "exec"), namespace)
+                if last is not None:
+                    result = eval(compile(ast.Expression(last.value), "<cell>", "eval"), namespace)
+                    if result is not None:
+                        print(repr(result))
+            except BaseException:
+                traceback.print_exc()
+
+        return run
+
+
+def _take_requests():
+    # the request channel moves to its own descriptor, cells and their subprocesses read /dev/null
+    requests = open(os.dup(0), "r", encoding="utf-8", errors="replace")
+    null = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null, 0)
+    os.close(null)
+    sys.stdin = open(os.devnull, "r")
+    return requests
+
+
+def main():
+    requests = _take_requests()
+    run = _create_runner()
+    while True:
+        sys.stdout.write("\n" + PROMPT)
+        sys.stdout.flush()
+        try:
+            line = requests.readline()
+        except KeyboardInterrupt:
+            continue
+        if not line:
+            break  # stdin closed
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            print(f"Invalid kernel request: {e}", file=sys.stderr)
+            continue
+        if request.get("exit"):
+            break
+        try:
+            run(request.get("code", ""))
+        except KeyboardInterrupt:
+            print("KeyboardInterrupt", file=sys.stderr)
+        sys.stderr.flush()
+
+
+if __name__ == "__main__":
+    main()
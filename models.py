@@ -1,7 +1,18 @@
-from dataclasses import dataclass, field
+import asyncio
+from collections import OrderedDict
+import concurrent.futures
+from dataclasses import asdict, dataclass, field, is_dataclass
+from email.utils import parsedate_to_datetime
 from enum import Enum
+import glob
+import hashlib
+import json
 import logging
 import os
+import random
+import re
+import threading
+import time
 from typing import (
     Any,
     Awaitable,
@@ -21,7 +32,7 @@ import openai
 # from litellm.types.utils import ModelResponse  # Not available in this version
 
 from python.helpers import dotenv
-from python.helpers import settings, dirty_json
+from python.helpers import settings, dirty_json, files
 from python.helpers.dotenv import load_dotenv
 from python.helpers.providers import get_provider_config
 from python.helpers.rate_limiter import RateLimiter
@@ -87,6 +98,15 @@ class ModelConfig:
         return kwargs
 
 
+# wrapper kwarg naming the service whose api keys are rotated per call (round-robin)
+API_KEY_SERVICE_KWARG = "a0_api_key_service"
+MAX_CACHED_MODELS = 32
+
+# langchain message additional_kwargs flag marking the end of a stable prompt prefix
+CACHE_BREAKPOINT_KWARG = "a0_cache_breakpoint"
+MAX_CACHE_BREAKPOINTS = 4
+
+
 class ChatChunk(TypedDict):
     """Simplified response chunk for chat models."""
     response_delta: str
@@ -195,18 +215,234 @@ class ChatGenerationResult:
         return ChatChunk(response_delta=response, reasoning_delta=reasoning)
 
 
+@dataclass
+class PromptCacheStats:
+    """Prompt cache accounting for one model, parsed from provider usage fields."""
+    requests: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    cache_creation_tokens: int = 0
+
+    def add_usage(self, usage: dict[str, int]):
+        self.requests += 1
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.cached_tokens += usage.get("cached_tokens", 0)
+        self.cache_creation_tokens += usage.get("cache_creation_tokens", 0)
+        if usage.get("cached_tokens", 0):
+            self.cache_hits += 1
+
+    def hit_ratio(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+@dataclass
+class ResponseCacheStats:
+    """Utility response cache accounting, hits and coalesced calls are saved LLM round-trips."""
+    requests: int = 0
+    hits: int = 0
+    disk_hits: int = 0
+    coalesced: int = 0
+
+    @property
+    def saved_calls(self) -> int:
+        return self.hits + self.coalesced
+
+    def hit_ratio(self) -> float:
+        return self.saved_calls / self.requests if self.requests else 0.0
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of model responses with TTL, a bounded in-memory LRU
+    and overflow spilled to disk. Concurrent identical requests share one call.
+    Disk reads and writes run in threads outside the lock, never on the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_disk_entries: int = 4096,
+        folder: str = "tmp/cache/responses",
+    ):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.folder = folder
+        self.stats = ResponseCacheStats()
+        self._spills = 0
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._spilling: dict[str, tuple[float, str]] = {}  # evicted, not yet written to disk
+        self._in_flight: dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name: str, system: str, message: str, params: dict) -> str:
+        params = {
+            k: v for k, v in params.items() if k != "api_key" and not k.startswith("a0_")
+        }
+        data = json.dumps([model_name, system, message, params], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    async def get_or_call(
+        self, key: str, call: Callable[[], Awaitable[str]], ttl: float
+    ) -> tuple[str, bool]:
+        """Returns (response, cached). Only one caller per key runs call at a time."""
+        while True:
+            with self._lock:
+                self.stats.requests += 1
+                response = self._get(key)
+                if response is not None:
+                    self.stats.hits += 1
+                    return response, True
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    pending = self._in_flight[key] = concurrent.futures.Future()
+                    leader = True
+                else:
+                    self.stats.coalesced += 1
+                    leader = False
+
+            if not leader:
+                # futures from other event loops are awaited through wrap_future
+                try:
+                    return await asyncio.wrap_future(pending), True
+                except asyncio.CancelledError:
+                    if not pending.cancelled():
+                        raise
+                    with self._lock:
+                        self.stats.requests -= 1
+                        self.stats.coalesced -= 1
+                    continue  # the leader was cancelled, try again
+
+            try:
+                # a spilled response is read before calling the model, followers wait for both
+                entry = await asyncio.to_thread(self._read_spilled, key)
+                if entry is not None and entry[0] >= time.time():
+                    with self._lock:
+                        self.stats.hits += 1
+                        self.stats.disk_hits += 1
+                        spills = self._put(key, entry)
+                    cached = True
+                    response = entry[1]
+                else:
+                    response = await call()
+                    with self._lock:
+                        spills = self._put(key, (time.time() + ttl, response))
+                    cached = False
+            except BaseException as e:
+                with self._lock:
+                    self._in_flight.pop(key, None)
+                if isinstance(e, Exception):
+                    pending.set_exception(e)
+                else:
+                    pending.cancel()
+                raise
+            with self._lock:
+                self._in_flight.pop(key, None)
+            pending.set_result(response)
+            if spills:
+                await asyncio.to_thread(self._write_spills, spills)
+            return response, cached
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._spilling.clear()
+        files.delete_dir(self.folder)
+
+    def _get(self, key: str) -> str | None:
+        # caller holds the lock, only memory is checked here
+        entry = self._entries.get(key) or self._spilling.get(key)
+        if entry is None:
+            return None
+        expires, response = entry
+        if expires < time.time():
+            self._entries.pop(key, None)
+            return None
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        return response
+
+    def _put(self, key: str, entry: tuple[float, str]) -> list[tuple[str, tuple[float, str]]]:
+        # caller holds the lock, returns evicted entries for _write_spills
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        spills = []
+        while len(self._entries) > self.max_entries:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            if evicted[0] > time.time():
+                self._spilling[evicted_key] = evicted
+                spills.append((evicted_key, evicted))
+        return spills
+
+    def _spill_path(self, key: str) -> str:
+        return files.get_abs_path(self.folder, key[:2], key + ".json")
+
+    def _write_spills(self, spills: list[tuple[str, tuple[float, str]]]):
+        # runs in a thread
+        for key, entry in spills:
+            try:
+                path = self._spill_path(key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump({"expires": entry[0], "response": entry[1]}, f)
+            except OSError:
+                pass  # spilling is best effort
+            with self._lock:
+                if self._spilling.get(key) is entry:
+                    del self._spilling[key]
+                self._spills += 1
+                prune = self._spills % 64 == 0
+            if prune:
+                self._prune_spilled()
+
+    def _read_spilled(self, key: str) -> tuple[float, str] | None:
+        # runs in a thread
+        path = self._spill_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.remove(path)  # back in memory now
+            return float(data["expires"]), str(data["response"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _prune_spilled(self):
+        # runs in a thread
+        folder = files.get_abs_path(self.folder)
+        paths = glob.glob(os.path.join(folder, "*", "*.json"))
+        if len(paths) <= self.max_disk_entries:
+            return
+        paths.sort(key=lambda p: os.path.getmtime(p))
+        for path in paths[: len(paths) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
 rate_limiters: dict[str, RateLimiter] = {}
 api_keys_round_robin: dict[str, int] = {}
+prompt_cache_stats: dict[str, PromptCacheStats] = {}
+response_cache = ResponseCache()
 
 
-def get_api_key(service: str) -> str:
-    # get api key for the service
-    key = (
+def _get_raw_api_key(service: str) -> str:
+    return (
         dotenv.get_dotenv_value(f"API_KEY_{service.upper()}")
         or dotenv.get_dotenv_value(f"{service.upper()}_API_KEY")
         or dotenv.get_dotenv_value(f"{service.upper()}_API_TOKEN")
         or "None"
     )
+
+
+def has_multiple_api_keys(service: str) -> bool:
+    return "," in _get_raw_api_key(service)
+
+
+def get_api_key(service: str) -> str:
+    # get api key for the service
+    key = _get_raw_api_key(service)
     # if the key contains a comma, use round-robin
     if "," in key:
         api_keys = [k.strip() for k in key.split(",") if k.strip()]
@@ -215,17 +451,46 @@ def get_api_key(service: str) -> str:
     return key
 
 
+def _resolve_call_kwargs(kwargs: dict) -> dict:
+    # pick the next round-robin api key for this call, cached wrappers must not pin one key
+    service = kwargs.get(API_KEY_SERVICE_KWARG)
+    # internal a0_* params never reach the provider
+    kwargs = {k: v for k, v in kwargs.items() if not k.startswith("a0_")}
+    if service and "api_key" not in kwargs:
+        key = get_api_key(service)
+        if key and key not in ("None", "NA"):
+            kwargs["api_key"] = key
+    return kwargs
+
+
+def get_response_cache_stats() -> ResponseCacheStats:
+    return response_cache.stats
+
+
+def get_response_cache_ttl(model: Any) -> float:
+    # opt-in per model via kwargs: a0_response_cache=true, a0_response_cache_ttl=<seconds>
+    kwargs = getattr(model, "kwargs", None) or {}
+    if not _is_enabled(kwargs.get("a0_response_cache", False)):
+        return 0
+    return float(kwargs.get("a0_response_cache_ttl", 3600))
+
+
 def get_rate_limiter(
     provider: str, name: str, requests: int, input: int, output: int
 ) -> RateLimiter:
     key = f"{provider}\\{name}"
     rate_limiters[key] = limiter = rate_limiters.get(key, RateLimiter(seconds=60))
-    limiter.limits["requests"] = requests or 0
-    limiter.limits["input"] = input or 0
-    limiter.limits["output"] = output or 0
+    limiter.set_limits(requests=requests, input=input, output=output)
     return limiter
 
 
+def get_prompt_cache_stats(model_name: str) -> PromptCacheStats:
+    prompt_cache_stats[model_name] = stats = prompt_cache_stats.get(
+        model_name, PromptCacheStats()
+    )
+    return stats
+
+
 def _is_transient_litellm_error(exc: Exception) -> bool:
     """Uses status_code when available, else falls back to exception types"""
     # Prefer explicit status codes if present
@@ -251,6 +516,152 @@ def _is_transient_litellm_error(exc: Exception) -> bool:
     return isinstance(exc, transient_types)
 
 
+class LLMErrorKind(Enum):
+    RATE_LIMITED = "rate_limited"
+    TRANSIENT = "transient"
+    CONTEXT_OVERFLOW = "context_overflow"
+    FATAL = "fatal"
+
+
+_CONTEXT_OVERFLOW_PATTERN = re.compile(
+    r"context[ _]length|context[ _]window|maximum context|too many tokens|prompt is too long",
+    re.IGNORECASE,
+)
+
+
+def classify_llm_error(exc: Exception) -> LLMErrorKind:
+    """Sorts provider errors into retry classes, context overflow is never retried"""
+    # checked first, rate limits like "too many tokens per minute" also match the overflow pattern
+    if getattr(exc, "status_code", None) == 429 or isinstance(
+        exc, getattr(openai, "RateLimitError", ())
+    ):
+        return LLMErrorKind.RATE_LIMITED
+    if isinstance(
+        exc, getattr(litellm, "ContextWindowExceededError", ())
+    ) or _CONTEXT_OVERFLOW_PATTERN.search(str(exc)):
+        return LLMErrorKind.CONTEXT_OVERFLOW
+    if _is_transient_litellm_error(exc):
+        return LLMErrorKind.TRANSIENT
+    return LLMErrorKind.FATAL
+
+
+def get_retry_after(exc: Exception) -> float | None:
+    """Seconds requested by the provider in Retry-After(-ms) headers, if any"""
+    headers = getattr(exc, "litellm_response_headers", None)
+    if not headers:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+@dataclass
+class RetryPolicy:
+    """Retries rate limited and transient errors with decorrelated jitter"""
+    max_attempts: int = 2
+    base_delay: float = 1.5
+    max_delay: float = 60.0
+
+    def should_retry(self, kind: LLMErrorKind, attempt: int) -> bool:
+        if attempt >= self.max_attempts:
+            return False
+        return kind in (LLMErrorKind.RATE_LIMITED, LLMErrorKind.TRANSIENT)
+
+    def next_delay(self, previous: float, retry_after: float | None = None) -> float | None:
+        # decorrelated jitter spreads retries of concurrent contexts apart
+        upper = max(self.base_delay, previous * 3)
+        delay = min(self.max_delay, random.uniform(self.base_delay, upper))
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                return None  # provider asks for a longer pause than we are willing to wait
+            delay = max(delay, retry_after)
+        return delay
+
+
+class CircuitBreaker:
+    """Shared by all contexts calling the same provider endpoint.
+    Opens after repeated rate limit/transient failures or on Retry-After,
+    then lets a single probe call through before closing again."""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.probe_until = 0.0
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        return self.open_until > time.monotonic()
+
+    async def before_call(self, max_wait: float):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                remaining = self.open_until - now
+                if remaining <= 0:
+                    if self.failures < self.failure_threshold:
+                        return  # closed
+                    if self.probe_until <= now:
+                        # half-open, this call is the probe
+                        self.probe_until = now + self.cooldown
+                        return
+                    remaining = self.probe_until - now
+            if remaining > max_wait:
+                raise CircuitOpenError(
+                    f"Provider endpoint is failing, calls paused for {remaining:.0f}s"
+                )
+            await asyncio.sleep(remaining + random.uniform(0, 0.1))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.probe_until = 0.0
+
+    def record_failure(self, kind: LLMErrorKind, retry_after: float | None = None):
+        if kind not in (LLMErrorKind.RATE_LIMITED, LLMErrorKind.TRANSIENT):
+            # the endpoint did respond, let the next probe through
+            with self._lock:
+                self.probe_until = 0.0
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.failures += 1
+            self.probe_until = 0.0
+            if retry_after:
+                # every context backs off as the provider asked
+                self.open_until = max(self.open_until, now + retry_after)
+            if self.failures >= self.failure_threshold:
+                self.open_until = max(self.open_until, now + self.cooldown)
+
+
+circuit_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider: str, api_base: str = "") -> CircuitBreaker:
+    key = f"{provider}\\{api_base}"
+    circuit_breakers[key] = breaker = circuit_breakers.get(key, CircuitBreaker())
+    return breaker
+
+
 async def apply_rate_limiter(
     model_config: ModelConfig | None,
     input_text: str,
@@ -267,9 +678,9 @@ async def apply_rate_limiter(
         model_config.limit_input,
         model_config.limit_output,
     )
-    limiter.add(input=approximate_tokens(input_text))
-    limiter.add(requests=1)
-    await limiter.wait(rate_limiter_callback)
+    await limiter.acquire(
+        rate_limiter_callback, input=approximate_tokens(input_text), requests=1
+    )
     return limiter
 
 
@@ -284,6 +695,23 @@ def apply_rate_limiter_sync(
         return
     import asyncio, nest_asyncio
 
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    # blocking waits are only allowed off event loops, on a loop the nested run below
+    # keeps the other tasks of the loop (and queued async waiters) going
+    if not rate_limiter_callback and not running:
+        limiter = get_rate_limiter(
+            model_config.provider,
+            model_config.name,
+            model_config.limit_requests,
+            model_config.limit_input,
+            model_config.limit_output,
+        )
+        limiter.acquire_sync(input=approximate_tokens(input_text), requests=1)
+        return limiter
+
     nest_asyncio.apply()
     return asyncio.run(
         apply_rate_limiter(model_config, input_text, rate_limiter_callback)
@@ -438,7 +866,10 @@ class LiteLLMChatWrapper(SimpleChatModel):
 
         # Call the model
         resp = completion(
-            model=self.model_name, messages=msgs, stop=stop, **{**self.kwargs, **kwargs}
+            model=self.model_name,
+            messages=msgs,
+            stop=stop,
+            **_resolve_call_kwargs({**self.kwargs, **kwargs}),
         )
 
         # Parse output
@@ -467,7 +898,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
             messages=msgs,
             stream=True,
             stop=stop,
-            **{**self.kwargs, **kwargs},
+            **_resolve_call_kwargs({**self.kwargs, **kwargs}),
         ):
             # parse chunk
             parsed = _parse_chunk(chunk) # chunk parsing
@@ -498,7 +929,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
             messages=msgs,
             stream=True,
             stop=stop,
-            **{**self.kwargs, **kwargs},
+            **_resolve_call_kwargs({**self.kwargs, **kwargs}),
         )
         async for chunk in response:  # type: ignore
             # parse chunk
@@ -545,17 +976,45 @@ class LiteLLMChatWrapper(SimpleChatModel):
 
         # Prepare call kwargs and retry config (strip A0-only params before calling LiteLLM)
         call_kwargs: dict[str, Any] = {**self.kwargs, **kwargs}
-        max_retries: int = int(call_kwargs.pop("a0_retry_attempts", 2))
-        retry_delay_s: float = float(call_kwargs.pop("a0_retry_delay_seconds", 1.5))
+        retry_policy = RetryPolicy(
+            max_attempts=int(call_kwargs.pop("a0_retry_attempts", 2)),
+            base_delay=float(call_kwargs.pop("a0_retry_delay_seconds", 1.5)),
+            max_delay=float(call_kwargs.pop("a0_retry_max_delay_seconds", 60)),
+        )
+        prompt_caching: bool = _is_enabled(call_kwargs.pop("a0_prompt_caching", False))
+        # stream callbacks get chunks batched into small windows instead of per token
+        coalescer = StreamCoalescer(
+            {"reasoning": reasoning_callback, "response": response_callback},
+            max_delay=float(call_kwargs.pop("a0_stream_window_ms", 30)) / 1000,
+            max_chars=int(call_kwargs.pop("a0_stream_window_chars", 256)),
+        )
+        call_kwargs = _resolve_call_kwargs(call_kwargs)
+        # retries are handled by the policy above, not again inside the provider client
+        call_kwargs.setdefault("max_retries", 0)
+        breaker = get_circuit_breaker(self.provider, str(call_kwargs.get("api_base", "")))
         stream = reasoning_callback is not None or response_callback is not None or tokens_callback is not None
 
+        # mark the stable prompt prefix for providers with explicit prompt caching
+        if prompt_caching:
+            msgs_conv = _apply_cache_breakpoints(
+                msgs_conv, _get_cache_breakpoints(messages)
+            )
+            if stream:
+                # usage (including cached tokens) is only sent in the last chunk on request
+                call_kwargs.setdefault("stream_options", {"include_usage": True})
+        cache_stats = get_prompt_cache_stats(self.model_name)
+
         # results
         result = ChatGenerationResult()
 
         attempt = 0
+        delay = 0.0
         while True:
             got_any_chunk = False
             try:
+                # wait if the endpoint is failing for all contexts
+                await breaker.before_call(retry_policy.max_delay)
+
                 # call model
                 _completion = await acompletion(
                     model=self.model_name,
@@ -566,16 +1025,21 @@ class LiteLLMChatWrapper(SimpleChatModel):
 
                 if stream:
                     # iterate over chunks
-                    async for chunk in _completion:  # type: ignore
+                    async for chunk in coalescer.iterate(_completion):  # type: ignore
                         got_any_chunk = True
+                        # collect prompt cache accounting from the usage chunk
+                        usage = _parse_usage(chunk)
+                        if usage:
+                            cache_stats.add_usage(usage)
+                        if not chunk["choices"]:
+                            continue
                         # parse chunk
                         parsed = _parse_chunk(chunk)
                         output = result.add_chunk(parsed)
 
                         # collect reasoning delta and call callbacks
                         if output["reasoning_delta"]:
-                            if reasoning_callback:
-                                await reasoning_callback(output["reasoning_delta"], result.reasoning)
+                            await coalescer.add("reasoning", output["reasoning_delta"], result.reasoning)
                             if tokens_callback:
                                 await tokens_callback(
                                     output["reasoning_delta"],
@@ -586,8 +1050,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
                                 limiter.add(output=approximate_tokens(output["reasoning_delta"]))
                         # collect response delta and call callbacks
                         if output["response_delta"]:
-                            if response_callback:
-                                await response_callback(output["response_delta"], result.response)
+                            await coalescer.add("response", output["response_delta"], result.response)
                             if tokens_callback:
                                 await tokens_callback(
                                     output["response_delta"],
@@ -596,9 +1059,13 @@ class LiteLLMChatWrapper(SimpleChatModel):
                             # Add output tokens to rate limiter if configured
                             if limiter:
                                 limiter.add(output=approximate_tokens(output["response_delta"]))
+                    await coalescer.flush()
 
                 # non-stream response
                 else:
+                    usage = _parse_usage(_completion)
+                    if usage:
+                        cache_stats.add_usage(usage)
                     parsed = _parse_chunk(_completion)
                     output = result.add_chunk(parsed)
                     if limiter:
@@ -608,6 +1075,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
                             limiter.add(output=approximate_tokens(output["reasoning_delta"]))
 
                 # Successful completion of stream
+                breaker.record_success()
                 return result.response, result.reasoning
 
             except AuthenticationError as e:
@@ -660,14 +1128,108 @@ class LiteLLMChatWrapper(SimpleChatModel):
                 auth_error.args = (error_message, llm_provider, model)
                 raise auth_error from e
                 
+            except CircuitOpenError:
+                raise
             except Exception as e:
-                import asyncio
+                kind = classify_llm_error(e)
+                retry_after = get_retry_after(e)
+                breaker.record_failure(kind, retry_after)
 
-                # Retry only if no chunks received and error is transient
-                if got_any_chunk or not _is_transient_litellm_error(e) or attempt >= max_retries:
+                # Retry only if no chunks received and error is rate limit or transient
+                if got_any_chunk or not retry_policy.should_retry(kind, attempt):
+                    raise
+                next_delay = retry_policy.next_delay(delay, retry_after)
+                if next_delay is None:
                     raise
                 attempt += 1
-                await asyncio.sleep(retry_delay_s)
+                delay = next_delay
+                await asyncio.sleep(delay)
+
+
+class StreamCoalescer:
+    """
+    Batches stream deltas per kind into windows of max_delay seconds or max_chars
+    characters before calling back. Deltas are delivered in order, exactly once,
+    so stateful consumers like the secrets stream filter see the same text.
+    """
+
+    def __init__(
+        self,
+        callbacks: dict[str, Callable[[str, str], Awaitable[None]] | None],
+        max_delay: float = 0.03,
+        max_chars: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.callbacks = callbacks
+        self.max_delay = max_delay
+        self.max_chars = max_chars
+        self._clock = clock
+        self._kind = ""
+        self._parts: list[str] = []
+        self._size = 0
+        self._full = ""
+        self._started = 0.0
+
+    async def add(self, kind: str, delta: str, full: str):
+        if not self.callbacks.get(kind):
+            return
+        if self._parts and kind != self._kind:
+            await self.flush()  # keep reasoning and response in order
+        if not self._parts:
+            self._kind = kind
+            self._started = self._clock()
+        self._parts.append(delta)
+        self._size += len(delta)
+        self._full = full
+        if (
+            self._size >= self.max_chars
+            or self._clock() - self._started >= self.max_delay
+        ):
+            await self.flush()
+
+    async def flush(self):
+        if not self._parts:
+            return
+        chunk, full = "".join(self._parts), self._full
+        self._parts = []
+        self._size = 0
+        callback = self.callbacks.get(self._kind)
+        if callback:
+            await callback(chunk, full)
+
+    def time_to_flush(self) -> float | None:
+        if not self._parts:
+            return None
+        return max(0.0, self._started + self.max_delay - self._clock())
+
+    async def iterate(self, stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        # pass chunks through, flushing a pending window when the stream stalls past its deadline
+        iterator = stream.__aiter__()
+        pending: asyncio.Future | None = None
+        try:
+            while True:
+                timeout = self.time_to_flush()
+                if timeout is None:
+                    try:
+                        chunk = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                else:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                    while not pending.done():
+                        await asyncio.wait({pending}, timeout=self.time_to_flush())
+                        if not pending.done():
+                            await self.flush()
+                    try:
+                        chunk = pending.result()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        pending = None
+                yield chunk
+        finally:
+            if pending and not pending.done():
+                pending.cancel()
 
 
 class AsyncAIChatReplacement:
@@ -723,12 +1285,12 @@ class BrowserCompatibleChatWrapper(ChatOpenRouter):
         **kwargs: Any,
     ):
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self._wrapper.a0_model_conf, str(messages))
+        await apply_rate_limiter(self._wrapper.a0_model_conf, str(messages))
 
         # Call the model
         try:
             model = kwargs.pop("model", None)
-            kwrgs = {**self._wrapper.kwargs, **kwargs}
+            kwrgs = _resolve_call_kwargs({**self._wrapper.kwargs, **kwargs})
 
             # hack from browser-use to fix json schema for gemini (additionalProperties, $defs, $ref)
             if "response_format" in kwrgs and "json_schema" in kwrgs["response_format"] and model.startswith("gemini/"):
@@ -785,7 +1347,9 @@ class LiteLLMEmbeddingWrapper(Embeddings):
         # Apply rate limiting if configured
         apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
 
-        resp = embedding(model=self.model_name, input=texts, **self.kwargs)
+        resp = embedding(
+            model=self.model_name, input=texts, **_resolve_call_kwargs(self.kwargs)
+        )
         return [
             item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
             for item in resp.data  # type: ignore
@@ -795,7 +1359,9 @@ class LiteLLMEmbeddingWrapper(Embeddings):
         # Apply rate limiting if configured
         apply_rate_limiter_sync(self.a0_model_conf, text)
 
-        resp = embedding(model=self.model_name, input=[text], **self.kwargs)
+        resp = embedding(
+            model=self.model_name, input=[text], **_resolve_call_kwargs(self.kwargs)
+        )
         item = resp.data[0]  # type: ignore
         return item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
 
@@ -857,12 +1423,15 @@ def _get_litellm_chat(
     model_config: Optional[ModelConfig] = None,
     **kwargs: Any,
 ):
-    # use api key from kwargs or env
-    api_key = kwargs.pop("api_key", None) or get_api_key(provider_name)
+    # use api key from kwargs or env, rotated keys are resolved per call
+    if "api_key" not in kwargs and has_multiple_api_keys(provider_name):
+        kwargs.setdefault(API_KEY_SERVICE_KWARG, provider_name)
+    if API_KEY_SERVICE_KWARG not in kwargs:
+        api_key = kwargs.pop("api_key", None) or get_api_key(provider_name)
 
-    # Only pass API key if key is not a placeholder
-    if api_key and api_key not in ("None", "NA"):
-        kwargs["api_key"] = api_key
+        # Only pass API key if key is not a placeholder
+        if api_key and api_key not in ("None", "NA"):
+            kwargs["api_key"] = api_key
 
     provider_name, model_name, kwargs = _adjust_call_args(
         provider_name, model_name, kwargs
@@ -893,12 +1462,15 @@ def _get_litellm_embedding(
             **kwargs,
         )
 
-    # use api key from kwargs or env
-    api_key = kwargs.pop("api_key", None) or get_api_key(provider_name)
+    # use api key from kwargs or env, rotated keys are resolved per call
+    if "api_key" not in kwargs and has_multiple_api_keys(provider_name):
+        kwargs.setdefault(API_KEY_SERVICE_KWARG, provider_name)
+    if API_KEY_SERVICE_KWARG not in kwargs:
+        api_key = kwargs.pop("api_key", None) or get_api_key(provider_name)
 
-    # Only pass API key if key is not a placeholder
-    if api_key and api_key not in ("None", "NA"):
-        kwargs["api_key"] = api_key
+        # Only pass API key if key is not a placeholder
+        if api_key and api_key not in ("None", "NA"):
+            kwargs["api_key"] = api_key
 
     provider_name, model_name, kwargs = _adjust_call_args(
         provider_name, model_name, kwargs
@@ -936,6 +1508,64 @@ def _parse_chunk(chunk: Any) -> ChatChunk:
 
 
 
+def _parse_usage(chunk: Any) -> dict[str, int] | None:
+    usage = _get_field(chunk, "usage")
+    if not usage:
+        return None
+    details = _get_field(usage, "prompt_tokens_details")
+    cached = _get_field(details, "cached_tokens") or _get_field(
+        usage, "cache_read_input_tokens"
+    )
+    return {
+        "prompt_tokens": _get_field(usage, "prompt_tokens") or 0,
+        "cached_tokens": cached or 0,
+        "cache_creation_tokens": _get_field(usage, "cache_creation_input_tokens") or 0,
+    }
+
+
+def _get_field(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _is_enabled(value: Any) -> bool:
+    # values from .env style kwargs come as strings
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _get_cache_breakpoints(messages: List[BaseMessage]) -> list[int]:
+    # system prompt and the end of the stable history prefix marked by Agent.prepare_prompt
+    return [
+        i
+        for i, m in enumerate(messages)
+        if m.type == "system" or m.additional_kwargs.get(CACHE_BREAKPOINT_KWARG)
+    ]
+
+
+def _apply_cache_breakpoints(msgs: List[dict], breakpoints: list[int]) -> List[dict]:
+    # providers allow only a few breakpoints, keep the last ones (longest prefixes)
+    for index in breakpoints[-MAX_CACHE_BREAKPOINTS:]:
+        message = msgs[index]
+        content = message.get("content")
+        if isinstance(content, str):
+            if not content:
+                continue
+            content = [{"type": "text", "text": content}]
+        elif isinstance(content, list) and content:
+            content = [dict(block) if isinstance(block, dict) else block for block in content]
+        else:
+            continue
+        if isinstance(content[-1], dict):
+            content[-1]["cache_control"] = {"type": "ephemeral"}
+            msgs[index] = {**message, "content": content}
+    return msgs
+
+
 def _adjust_call_args(provider_name: str, model_name: str, kwargs: dict):
     # for openrouter add app reference
     if provider_name == "openrouter":
@@ -981,8 +1611,14 @@ def _merge_provider_defaults(
             for k, v in extra_kwargs.items():
                 kwargs.setdefault(k, v)
 
+        # Opt-in prompt cache breakpoints for providers that support them
+        if cfg.get("prompt_caching"):
+            kwargs.setdefault("a0_prompt_caching", True)
+
     # Inject API key based on the *original* provider id if still missing
-    if "api_key" not in kwargs:
+    if "api_key" not in kwargs and has_multiple_api_keys(original_provider):
+        kwargs[API_KEY_SERVICE_KWARG] = original_provider
+    elif "api_key" not in kwargs:
         key = get_api_key(original_provider)
         if key and key not in ("None", "NA"):
             kwargs["api_key"] = key
@@ -999,29 +1635,95 @@ def _merge_provider_defaults(
     return provider_name, kwargs
 
 
+_model_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+_model_cache_lock = threading.Lock()
+
+
+def _freeze(value: Any) -> Any:
+    # hashable, order independent form of kwargs for cache keys
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, Enum):
+        return value.value
+    if is_dataclass(value) and not isinstance(value, type):
+        return _freeze(asdict(value))
+    hash(value)
+    return value
+
+
+def _get_cached_model(kind: str, provider: str, name: str, model_config, kwargs: dict, create: Callable[[], Any]):
+    try:
+        key = (
+            kind,
+            provider.lower(),
+            name,
+            _freeze(model_config),
+            _freeze(kwargs),
+            settings.get_settings_revision(),  # api keys and global kwargs live in settings
+        )
+    except TypeError:
+        return create()  # unhashable kwargs, do not cache
+
+    with _model_cache_lock:
+        model = _model_cache.get(key)
+        if model is not None:
+            _model_cache.move_to_end(key)
+            return model
+
+    model = create()
+    with _model_cache_lock:
+        model = _model_cache.setdefault(key, model)
+        _model_cache.move_to_end(key)
+        while len(_model_cache) > MAX_CACHED_MODELS:
+            _model_cache.popitem(last=False)
+    return model
+
+
+def clear_model_cache():
+    with _model_cache_lock:
+        _model_cache.clear()
+
+
+def _create_chat_model(
+    cls: type, provider: str, name: str, model_config: Optional[ModelConfig], kwargs: dict
+):
+    orig = provider.lower()
+    provider_name, kwargs = _merge_provider_defaults("chat", orig, dict(kwargs))
+    return _get_litellm_chat(cls, name, provider_name, model_config, **kwargs)
+
+
+def _create_embedding_model(
+    provider: str, name: str, model_config: Optional[ModelConfig], kwargs: dict
+):
+    orig = provider.lower()
+    provider_name, kwargs = _merge_provider_defaults("embedding", orig, dict(kwargs))
+    return _get_litellm_embedding(name, provider_name, model_config, **kwargs)
+
+
 def get_chat_model(
     provider: str, name: str, model_config: Optional[ModelConfig] = None, **kwargs: Any
 ) -> LiteLLMChatWrapper:
-    orig = provider.lower()
-    provider_name, kwargs = _merge_provider_defaults("chat", orig, kwargs)
-    return _get_litellm_chat(
-        LiteLLMChatWrapper, name, provider_name, model_config, **kwargs
+    return _get_cached_model(
+        "chat", provider, name, model_config, kwargs,
+        lambda: _create_chat_model(LiteLLMChatWrapper, provider, name, model_config, kwargs),
     )
 
 
 def get_browser_model(
     provider: str, name: str, model_config: Optional[ModelConfig] = None, **kwargs: Any
 ) -> BrowserCompatibleChatWrapper:
-    orig = provider.lower()
-    provider_name, kwargs = _merge_provider_defaults("chat", orig, kwargs)
-    return _get_litellm_chat(
-        BrowserCompatibleChatWrapper, name, provider_name, model_config, **kwargs
+    return _get_cached_model(
+        "browser", provider, name, model_config, kwargs,
+        lambda: _create_chat_model(BrowserCompatibleChatWrapper, provider, name, model_config, kwargs),
     )
 
 
 def get_embedding_model(
     provider: str, name: str, model_config: Optional[ModelConfig] = None, **kwargs: Any
 ) -> LiteLLMEmbeddingWrapper | LocalSentenceTransformerWrapper:
-    orig = provider.lower()
-    provider_name, kwargs = _merge_provider_defaults("embedding", orig, kwargs)
-    return _get_litellm_embedding(name, provider_name, model_config, **kwargs)
+    return _get_cached_model(
+        "embedding", provider, name, model_config, kwargs,
+        lambda: _create_embedding_model(provider, name, model_config, kwargs),
+    )
@@ -40,7 +40,7 @@ async def preload():
         # async tasks to preload
         tasks = [
             preload_embedding(),
-            # preload_whisper(),
+            preload_whisper(),
             # preload_kokoro()
         ]
 
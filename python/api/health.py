@@ -1,5 +1,5 @@
 from python.helpers.api import ApiHandler, Request, Response
-from python.helpers import errors, git
+from python.helpers import context_eviction, errors, git
 
 class HealthCheck(ApiHandler):
 
@@ -23,4 +23,4 @@ class HealthCheck(ApiHandler):
         except Exception as e:
             error = errors.error_text(e)
 
-        return {"gitinfo": gitinfo, "error": error}
+        return {"gitinfo": gitinfo, "error": error, "contexts": context_eviction.get_stats()}
@@ -0,0 +1,18 @@
+from python.helpers.api import ApiHandler, Request, Response
+from python.helpers import knowledge_import, memory
+
+
+class GetKnowledgeProgress(ApiHandler):
+    async def process(self, input: dict, request: Request) -> dict | Response:
+        ctxid = input.get("ctxid", "")
+        if not ctxid:
+            raise Exception("No context id provided")
+        context = self.use_context(ctxid)
+
+        # counters of the running or last knowledge import of the context memory
+        progress = knowledge_import.get_progress(memory.get_context_memory_subdir(context))
+
+        return {
+            "ok": True,
+            "progress": progress.to_dict() if progress else None,
+        }
@@ -1,14 +1,26 @@
+import threading
+import uuid
+
 from python.helpers.api import ApiHandler, Request, Response
 
 from agent import AgentContext, AgentContextType
 
-from python.helpers.task_scheduler import TaskScheduler
+from python.helpers.task_scheduler import TaskScheduler, serialize_task
 from python.helpers.localization import Localization
 from python.helpers.dotenv import get_dotenv_value
 
+# identifies this server run, versions seen before a restart never match
+BOOT_ID = str(uuid.uuid4())
+
 
 class Poll(ApiHandler):
 
+    # context and task lists by timezone, shared by all clients until a version changes
+    _lists_lock = threading.Lock()
+    _lists: dict[str, tuple[str, list[dict], list[dict]]] = {}
+    # serialized contexts by timezone and id, reused while the context and tasks are unchanged
+    _outputs: dict[str, dict[str, tuple[tuple[int, int], dict]]] = {}
+
     @classmethod
     def requires_csrf(cls) -> bool:
         return False  # Disable CSRF for poll endpoint to allow UI to work
@@ -21,6 +33,9 @@ class Poll(ApiHandler):
         ctxid = input.get("context", "")
         from_no = input.get("log_from", 0)
         notifications_from = input.get("notifications_from", 0)
+        # versions returned by the previous poll, sections that did not change since are omitted
+        # clients that send none get every section
+        versions = input.get("versions") or {}
 
         # Get timezone from input (default to dotenv default or UTC if not provided)
         timezone = input.get("timezone", get_dotenv_value("DEFAULT_USER_TIMEZONE", "UTC"))
@@ -35,14 +50,36 @@ class Poll(ApiHandler):
         else:
             context = None
 
+        response: dict = {
+            "deselect_chat": ctxid and not context,
+            "context": context.id if context else "",
+        }
+        current = {
+            "context": f"{BOOT_ID}:{context.id}:{context.version}" if context else "",
+            "notifications": "",
+            "contexts": "",
+        }
+
         # Get logs only if we have a context
-        logs = context.log.output(start=from_no) if context else []
+        if versions.get("context") != current["context"]:
+            response.update({
+                "logs": context.log.output(start=from_no) if context else [],
+                "log_guid": context.log.guid if context else "",
+                "log_version": len(context.log.updates) if context else 0,
+                "log_progress": context.log.progress if context else 0,
+                "log_progress_active": context.log.progress_active if context else False,
+                "paused": context.paused if context else False,
+            })
 
         # Get notifications from global notification manager
         notification_manager = AgentContext.get_notification_manager()
-        notifications = notification_manager.output(start=notifications_from)
-
-        # loop AgentContext._contexts
+        current["notifications"] = f"{notification_manager.guid}:{notification_manager.version}"
+        if versions.get("notifications") != current["notifications"]:
+            response.update({
+                "notifications": notification_manager.output(start=notifications_from),
+                "notifications_guid": notification_manager.guid,
+                "notifications_version": len(notification_manager.updates),
+            })
 
         # Get a task scheduler instance
         scheduler = TaskScheduler.get()
@@ -50,86 +87,97 @@ class Poll(ApiHandler):
         # Always reload the scheduler on each poll to ensure we have the latest task state
         # await scheduler.reload() # does not seem to be needed
 
-        # loop AgentContext._contexts and divide into contexts and tasks
-
-        ctxs = []
-        tasks = []
-        processed_contexts = set()  # Track processed context IDs
-
-        all_ctxs = list(AgentContext._contexts.values())
-        # First, identify all tasks
-        for ctx in all_ctxs:
-            # Skip if already processed
-            if ctx.id in processed_contexts:
-                continue
-
-            # Skip BACKGROUND contexts as they should be invisible to users
-            # Handle backward compatibility: if type doesn't exist, default to USER
-            ctx_type = getattr(ctx, 'type', AgentContextType.USER)
-            if ctx_type == AgentContextType.BACKGROUND:
-                processed_contexts.add(ctx.id)
-                continue
-
-            # Create the base context data that will be returned
-            context_data = ctx.output()
-
-            context_task = scheduler.get_task_by_uuid(ctx.id)
-            # Determine if this is a task-dedicated context by checking if a task with this UUID exists
-            is_task_context = (
-                context_task is not None and context_task.context_id == ctx.id
-            )
-
-            if not is_task_context:
-                ctxs.append(context_data)
-            else:
-                # If this is a task, get task details from the scheduler
-                task_details = scheduler.serialize_task(ctx.id)
-                if task_details:
-                    # Add task details to context_data with the same field names
-                    # as used in scheduler endpoints to maintain UI compatibility
-                    context_data.update({
-                        "task_name": task_details.get("name"),  # name is for context, task_name for the task name
-                        "uuid": task_details.get("uuid"),
-                        "state": task_details.get("state"),
-                        "type": task_details.get("type"),
-                        "system_prompt": task_details.get("system_prompt"),
-                        "prompt": task_details.get("prompt"),
-                        "last_run": task_details.get("last_run"),
-                        "last_result": task_details.get("last_result"),
-                        "attachments": task_details.get("attachments", []),
-                        "context_id": task_details.get("context_id"),
-                    })
-
-                    # Add type-specific fields
-                    if task_details.get("type") == "scheduled":
-                        context_data["schedule"] = task_details.get("schedule")
-                    elif task_details.get("type") == "planned":
-                        context_data["plan"] = task_details.get("plan")
-                    else:
-                        context_data["token"] = task_details.get("token")
-
-                tasks.append(context_data)
-
-            # Mark as processed
-            processed_contexts.add(ctx.id)
-
-        # Sort tasks and chats by their creation date, descending
-        ctxs.sort(key=lambda x: x["created_at"], reverse=True)
-        tasks.sort(key=lambda x: x["created_at"], reverse=True)
+        # versions are read before the lists are built, changes made meanwhile are sent next time
+        current["contexts"] = f"{BOOT_ID}:{AgentContext.get_version()}:{scheduler.get_version()}"
+        if versions.get("contexts") != current["contexts"]:
+            ctxs, tasks = self._get_lists(current["contexts"], timezone, scheduler)
+            response.update({"contexts": ctxs, "tasks": tasks})
 
         # data from this server
-        return {
-            "deselect_chat": ctxid and not context,
-            "context": context.id if context else "",
-            "contexts": ctxs,
-            "tasks": tasks,
-            "logs": logs,
-            "log_guid": context.log.guid if context else "",
-            "log_version": len(context.log.updates) if context else 0,
-            "log_progress": context.log.progress if context else 0,
-            "log_progress_active": context.log.progress_active if context else False,
-            "paused": context.paused if context else False,
-            "notifications": notifications,
-            "notifications_guid": notification_manager.guid,
-            "notifications_version": len(notification_manager.updates),
-        }
+        response["versions"] = current
+        if versions == current:
+            response["unchanged"] = True
+        return response
+
+    @classmethod
+    def _get_lists(
+        cls, version: str, timezone: str, scheduler: TaskScheduler
+    ) -> tuple[list[dict], list[dict]]:
+        with cls._lists_lock:
+            cached = cls._lists.get(timezone)
+            if cached and cached[0] == version:
+                return cached[1], cached[2]
+
+            Localization.get().set_timezone(timezone)
+            tasks_version = scheduler.get_version()
+            tasks_by_uuid = {task.uuid: task for task in scheduler.get_tasks()}
+            previous = cls._outputs.get(timezone, {})
+            outputs: dict[str, tuple[tuple[int, int], dict]] = {}
+
+            # loop AgentContext._contexts and divide into contexts and tasks
+            ctxs = []
+            tasks = []
+            for ctx in AgentContext.all():
+                # Skip BACKGROUND contexts as they should be invisible to users
+                # Handle backward compatibility: if type doesn't exist, default to USER
+                ctx_type = getattr(ctx, 'type', AgentContextType.USER)
+                if ctx_type == AgentContextType.BACKGROUND:
+                    continue
+
+                context_task = tasks_by_uuid.get(ctx.id)
+                # Determine if this is a task-dedicated context by checking if a task with this UUID exists
+                is_task_context = (
+                    context_task is not None and context_task.context_id == ctx.id
+                )
+
+                key = (ctx.version, tasks_version)
+                output = previous.get(ctx.id)
+                if output and output[0] == key:
+                    context_data = output[1]
+                else:
+                    context_data = cls._serialize_context(ctx, context_task if is_task_context else None)
+                outputs[ctx.id] = (key, context_data)
+
+                if not is_task_context:
+                    ctxs.append(context_data)
+                else:
+                    tasks.append(context_data)
+
+            # Sort tasks and chats by their creation date, descending
+            ctxs.sort(key=lambda x: x["created_at"], reverse=True)
+            tasks.sort(key=lambda x: x["created_at"], reverse=True)
+
+            cls._outputs[timezone] = outputs
+            cls._lists[timezone] = (version, ctxs, tasks)
+            return ctxs, tasks
+
+    @staticmethod
+    def _serialize_context(ctx: AgentContext, task) -> dict:
+        # Create the base context data that will be returned
+        context_data = ctx.output()
+        if task:
+            # If this is a task, get task details from the scheduler
+            task_details = serialize_task(task)
+            # Add task details to context_data with the same field names
+            # as used in scheduler endpoints to maintain UI compatibility
+            context_data.update({
+                "task_name": task_details.get("name"),  # name is for context, task_name for the task name
+                "uuid": task_details.get("uuid"),
+                "state": task_details.get("state"),
+                "type": task_details.get("type"),
+                "system_prompt": task_details.get("system_prompt"),
+                "prompt": task_details.get("prompt"),
+                "last_run": task_details.get("last_run"),
+                "last_result": task_details.get("last_result"),
+                "attachments": task_details.get("attachments", []),
+                "context_id": task_details.get("context_id"),
+            })
+
+            # Add type-specific fields
+            if task_details.get("type") == "scheduled":
+                context_data["schedule"] = task_details.get("schedule")
+            elif task_details.get("type") == "planned":
+                context_data["plan"] = task_details.get("plan")
+            else:
+                context_data["token"] = task_details.get("token")
+        return context_data
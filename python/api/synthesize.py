@@ -1,5 +1,8 @@
 # api/synthesize.py
 
+import json
+from typing import Iterator
+
 from python.helpers.api import ApiHandler, Request, Response
 
 from python.helpers import runtime, settings, kokoro_tts
@@ -8,7 +11,8 @@ class Synthesize(ApiHandler):
     async def process(self, input: dict, request: Request) -> dict | Response:
         text = input.get("text", "")
         ctxid = input.get("ctxid", "")
-        
+        stream = input.get("stream", False)
+
         if ctxid:
             context = self.use_context(ctxid)
 
@@ -33,10 +37,26 @@ class Synthesize(ApiHandler):
             #     return {"audio_parts": audio_parts, "success": True}
 
             # audio is chunked on the frontend for better flow
+            if stream:
+                # one JSON line per sentence, played while later ones are synthesized
+                parts = await kokoro_tts.open_stream([text])
+                return Response(
+                    response=self._stream_lines(parts),
+                    status=200,
+                    mimetype="application/x-ndjson",
+                )
             audio = await kokoro_tts.synthesize_sentences([text])
             return {"audio": audio, "success": True}
         except Exception as e:
             return {"error": str(e), "success": False}
+
+    @staticmethod
+    def _stream_lines(parts: Iterator[str]) -> Iterator[str]:
+        try:
+            for audio in parts:
+                yield json.dumps({"audio": audio, "success": True}) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e), "success": False}) + "\n"
     
     # def _clean_text(self, text: str) -> str:
     #     """Clean text by removing markdown, tables, code blocks, and other formatting"""
@@ -1,3 +1,6 @@
+import json
+from typing import Iterator
+
 from python.helpers.api import ApiHandler, Request, Response
 
 from python.helpers import runtime, settings, whisper
@@ -6,6 +9,7 @@ class Transcribe(ApiHandler):
     async def process(self, input: dict, request: Request) -> dict | Response:
         audio = input.get("audio")
         ctxid = input.get("ctxid", "")
+        stream = input.get("stream", False)
 
         if ctxid:
             context = self.use_context(ctxid)
@@ -14,5 +18,22 @@ class Transcribe(ApiHandler):
         #     context.log.log(type="info", content="Whisper STT model is currently being initialized, please wait...")
 
         set = settings.get_settings()
+        if stream:
+            # one JSON line per transcribed chunk of the recording
+            chunks = await whisper.open_stream(set["stt_model_size"], audio) # type: ignore
+            return Response(
+                response=self._stream_lines(chunks),
+                status=200,
+                mimetype="application/x-ndjson",
+            )
         result = await whisper.transcribe(set["stt_model_size"], audio) # type: ignore
         return result
+
+    @staticmethod
+    def _stream_lines(chunks: Iterator[dict]) -> Iterator[str]:
+        # errors after the response started are sent as a last line, not as a clean end
+        try:
+            for chunk in chunks:
+                yield json.dumps(chunk) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e), "success": False}) + "\n"
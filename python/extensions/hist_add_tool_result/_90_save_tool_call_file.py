@@ -1,10 +1,13 @@
 from typing import Any
 from python.helpers.extension import Extension
 from python.helpers import files, persist_chat
-import os, re
+import itertools, os, re
 
 LEN_MIN = 500
 
+# next file number per messages folder
+_counters: dict[str, itertools.count] = {}
+
 class SaveToolCallFile(Extension):
     async def execute(self, data: dict[str, Any] | None = None, **kwargs):
         if not data:
@@ -23,11 +26,8 @@ class SaveToolCallFile(Extension):
         msgs_folder = persist_chat.get_chat_msg_files_folder(self.agent.context.id)
         os.makedirs(msgs_folder, exist_ok=True)
 
-        # count the files in the directory
-        last_num = len(os.listdir(msgs_folder))
-
         # create new file
-        new_file = files.get_abs_path(msgs_folder, f"{last_num+1}.txt")
+        new_file = files.get_abs_path(msgs_folder, f"{_next_file_number(msgs_folder)}.txt")
         files.write_file(
             new_file,
             result,
@@ -35,3 +35,12 @@ class SaveToolCallFile(Extension):
 
         # add the path to the history
         data["file"] = new_file
+
+
+def _next_file_number(folder: str) -> int:
+    counter = _counters.get(folder)
+    if counter is None:
+        # continue after existing files, the folder is only listed once
+        numbers = [int(name[:-4]) for name in os.listdir(folder) if name.endswith(".txt") and name[:-4].isdigit()]
+        counter = _counters[folder] = itertools.count(max(numbers, default=0) + 1)
+    return next(counter)
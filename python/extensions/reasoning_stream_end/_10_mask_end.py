@@ -2,6 +2,8 @@ from python.helpers.extension import Extension
 
 
 class MaskReasoningStreamEnd(Extension):
+    stateless = True
+
     async def execute(self, **kwargs):
         # Get agent and finalize the streaming filter
         agent = kwargs.get("agent")
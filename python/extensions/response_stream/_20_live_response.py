@@ -8,6 +8,8 @@ from python.helpers import log
 
 class LiveResponse(Extension):
 
+    stateless = True
+
     async def execute(
         self,
         loop_data: LoopData = LoopData(),
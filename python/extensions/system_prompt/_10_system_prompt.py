@@ -1,8 +1,8 @@
 from typing import Any
 from python.helpers.extension import Extension
-from python.helpers.mcp_handler import MCPConfig
+from python.helpers.mcp_handler import MCPConfig, get_tools_revision
 from agent import Agent, LoopData
-from python.helpers.settings import get_settings
+from python.helpers.settings import get_settings, get_settings_revision
 from python.helpers import projects
 
 
@@ -14,12 +14,32 @@ class SystemPrompt(Extension):
         loop_data: LoopData = LoopData(),
         **kwargs: Any
     ):
-        # append main system prompt and tools
-        main = get_main_prompt(self.agent)
-        tools = get_tools_prompt(self.agent)
-        mcp_tools = get_mcp_tools_prompt(self.agent)
-        secrets_prompt = get_secrets_prompt(self.agent)
-        project_prompt = get_project_prompt(self.agent)
+        # append main system prompt and tools, unchanged parts are reused from cache
+        agent = self.agent
+        profile = agent.config.profile
+        main = agent.get_prompt_part(
+            "main", profile, lambda: get_main_prompt(agent)
+        )
+        tools = agent.get_prompt_part(
+            "tools",
+            (profile, agent.config.chat_model.vision),
+            lambda: get_tools_prompt(agent),
+        )
+        mcp_tools = agent.get_prompt_part(
+            "mcp_tools",
+            (profile, get_tools_revision()),
+            lambda: get_mcp_tools_prompt(agent),
+        )
+        secrets_prompt = agent.get_prompt_part(
+            "secrets",
+            (profile, get_secrets_revision(agent)),
+            lambda: get_secrets_prompt(agent),
+        )
+        project_prompt = agent.get_prompt_part(
+            "project",
+            (profile, get_project_revision(agent)),
+            lambda: get_project_prompt(agent),
+        )
 
         system_prompt.append(main)
         system_prompt.append(tools)
@@ -69,6 +89,24 @@ def get_secrets_prompt(agent: Agent):
         return ""
 
 
+def get_secrets_revision(agent: Agent):
+    try:
+        from python.helpers.secrets import get_secrets_manager
+
+        secrets_manager = get_secrets_manager(agent.context)
+        # settings variables are part of the secrets prompt too
+        return (secrets_manager.get_revision(), get_settings_revision())
+    except Exception:
+        return None
+
+
+def get_project_revision(agent: Agent):
+    project_name = agent.context.get_data(projects.CONTEXT_DATA_KEY_PROJECT)
+    if not project_name:
+        return None
+    return (project_name, projects.get_project_revision(project_name))
+
+
 def get_project_prompt(agent: Agent):
     result = agent.read_prompt("agent.system.projects.main.md")
     project_name = agent.context.get_data(projects.CONTEXT_DATA_KEY_PROJECT)
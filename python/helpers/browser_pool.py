@@ -0,0 +1,209 @@
+import asyncio
+import shutil
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+from python.helpers import defer
+from python.helpers.print_style import PrintStyle
+
+# launched browsers per pool
+MAX_SIZE = 2
+# seconds before an unused browser is closed
+IDLE_TIMEOUT = 300
+# seconds a health check may take before the browser counts as crashed
+HEALTH_TIMEOUT = 5
+# share one pool across all contexts instead of one pool per context
+SHARED = False
+
+GLOBAL = "global"
+
+
+class BrowserPool:
+    """
+    Launched browser sessions reused across browser_agent tasks. Sessions are bound to the
+    event loop of the pool thread, so acquire and release must be awaited on that thread.
+    """
+
+    def __init__(
+        self,
+        owner: str,
+        factory: Callable[[int], Awaitable[Any]],
+        max_size: int = MAX_SIZE,
+        idle_timeout: float = IDLE_TIMEOUT,
+        isolate: bool = False,
+    ):
+        self.owner = owner
+        self.factory = factory  # launches and returns a started session for a slot number
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.isolate = isolate  # clear cookies between leases when shared across contexts
+        self.thread_name = "BrowserPool" + owner
+        self._slots: dict[int, Any] = {}  # slot number -> session, idle or leased
+        self._idle: list[tuple[float, Any]] = []  # (released at, session), most recent last
+        self._waiters: list[asyncio.Future] = []
+        self._reaper: asyncio.Task | None = None
+        self._closed = False
+
+    async def acquire(self, fresh: bool = False) -> Any:
+        """
+        Returns a healthy browser session, reusing an idle one or launching a new one.
+        Fresh leases close the idle browsers first, so no cookies, storage or pages carry over.
+        """
+        if fresh:
+            while self._idle:
+                _, session = self._idle.pop()
+                await self._discard(session)
+        while True:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            while self._idle:
+                _, session = self._idle.pop()
+                if await _is_healthy(session):
+                    return session
+                PrintStyle.warning("Idle browser crashed, relaunching")
+                await self._discard(session)
+
+            slot = next((slot for slot in range(self.max_size) if slot not in self._slots), None)
+            if slot is not None:
+                self._slots[slot] = None  # reserved while launching
+                try:
+                    session = await self.factory(slot)
+                except BaseException:
+                    self._slots.pop(slot, None)
+                    self._notify()
+                    raise
+                self._slots[slot] = session
+                return session
+
+            # all browsers are leased, wait for one to come back
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    async def release(self, session: Any):
+        """Returns a session to the pool, crashed sessions are closed instead."""
+        if self._closed or not await _is_healthy(session) or not await _reset(session, self.isolate):
+            await self._discard(session)
+        else:
+            self._idle.append((time.monotonic(), session))
+            if not self._reaper or self._reaper.done():
+                self._reaper = asyncio.ensure_future(self._reap())
+        self._notify()
+
+    async def close(self):
+        """Closes all browsers and deletes their profiles."""
+        self._closed = True
+        self._idle = []
+        for session in [session for session in self._slots.values() if session]:
+            await self._discard(session)
+        self._notify()
+
+    def get_slot(self, session: Any) -> int | None:
+        return next((slot for slot, item in self._slots.items() if item is session), None)
+
+    async def _discard(self, session: Any):
+        # closed, broken and reaped browsers all leave their profile behind otherwise
+        slot = self.get_slot(session)
+        if slot is not None:
+            del self._slots[slot]
+        self._notify()
+        await _kill(session)
+        await asyncio.to_thread(_delete_profile, session)
+
+    async def _reap(self):
+        # close browsers that stayed idle for idle_timeout
+        while self._idle:
+            released_at, session = self._idle[0]
+            wait = released_at + self.idle_timeout - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            self._idle.pop(0)
+            await self._discard(session)
+
+    def _notify(self):
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+_pools: dict[Hashable, BrowserPool] = {}
+
+
+def get_pool(owner: str | None, factory: Callable[[int], Awaitable[Any]]) -> BrowserPool:
+    """Pool for a context id, or the shared pool for None."""
+    owner = owner or GLOBAL
+    pool = _pools.get(owner)
+    if pool is None:
+        pool = _pools[owner] = BrowserPool(owner, factory, isolate=owner == GLOBAL)
+    else:
+        pool.factory = factory  # keep browser settings current
+    return pool
+
+
+def close_pools(owner: str, stop_thread: bool = True):
+    """Closes the browsers of a context on reset or removal, removed contexts also stop the pool thread."""
+    pool = _pools.pop(owner, None)
+    if not pool:
+        return
+    thread = defer.EventLoopThread(pool.thread_name)
+
+    async def close():
+        try:
+            await pool.close()
+        except Exception as e:
+            PrintStyle.error(f"Error closing browsers: {e}")
+        finally:
+            if stop_thread:
+                thread.terminate()
+
+    thread.run_coroutine(close())
+
+
+async def _is_healthy(session: Any) -> bool:
+    try:
+        context = session.browser_context
+        if not context:
+            return False
+        browser = context.browser
+        if browser and not browser.is_connected():
+            return False
+        page = context.pages[0] if context.pages else await context.new_page()
+        await asyncio.wait_for(page.evaluate("1"), HEALTH_TIMEOUT)
+        return True
+    except Exception:
+        return False
+
+
+async def _reset(session: Any, isolate: bool) -> bool:
+    # leave one tab open, shared pools also forget cookies and the last page
+    try:
+        context = session.browser_context
+        pages = list(context.pages)
+        for page in pages[1:]:
+            await page.close()
+        if isolate:
+            await context.clear_cookies()
+            if pages:
+                await pages[0].goto("about:blank")
+        return True
+    except Exception:
+        return False
+
+
+def _delete_profile(session: Any):
+    profile = getattr(session, "browser_profile", None)
+    user_data_dir = getattr(profile, "user_data_dir", None)
+    if user_data_dir:
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+
+
+async def _kill(session: Any):
+    try:
+        await session.kill()
+    except Exception as e:
+        PrintStyle.error(f"Error closing browser session: {e}")
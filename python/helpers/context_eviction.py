@@ -0,0 +1,134 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from agent import Agent, AgentContext, AgentContextType
+from python.helpers import browser_pool, dotenv, persist_chat, shell_pool
+from python.helpers.print_style import PrintStyle
+
+# loaded chats kept in memory, least recently used idle ones are evicted above it
+MAX_LOADED = 50
+# seconds without use after which a chat is evicted regardless of the cap
+IDLE_TIMEOUT = 3600
+# seconds a chat stays loaded after its last use even above the cap
+MIN_IDLE = 60
+# recent evictions and rehydrations kept for inspection
+EVENTS_SIZE = 100
+
+
+@dataclass
+class EvictionStats:
+    evictions: int = 0
+    rehydrations: int = 0
+    events: deque = field(default_factory=lambda: deque(maxlen=EVENTS_SIZE))
+
+    def record(self, event: str, context: AgentContext, seconds: float):
+        if event == "evicted":
+            self.evictions += 1
+        else:
+            self.rehydrations += 1
+        self.events.append(
+            {"event": event, "context": context.id, "time": time.time(), "seconds": seconds}
+        )
+
+
+stats = EvictionStats()
+
+
+def get_limits() -> tuple[int, float]:
+    """Cap of loaded chats and idle timeout, configurable in .env."""
+    return (
+        int(dotenv.get_dotenv_value("A0_MAX_LOADED_CHATS", MAX_LOADED)),
+        float(dotenv.get_dotenv_value("A0_CHAT_IDLE_TIMEOUT", IDLE_TIMEOUT)),
+    )
+
+
+def get_stats() -> dict[str, Any]:
+    contexts = AgentContext.all()
+    max_loaded, idle_timeout = get_limits()
+    return {
+        "contexts": len(contexts),
+        "loaded": sum(1 for context in contexts if context.is_loaded),
+        "max_loaded": max_loaded,
+        "idle_timeout": idle_timeout,
+        "evictions": stats.evictions,
+        "rehydrations": stats.rehydrations,
+    }
+
+
+def evict_idle(max_loaded: int | None = None, idle_timeout: float | None = None) -> list[str]:
+    """
+    Evicts chats idle for longer than idle_timeout, then least recently used ones
+    while more than max_loaded are loaded. Running chats are never evicted.
+    """
+    default_max, default_timeout = get_limits()
+    max_loaded = default_max if max_loaded is None else max_loaded
+    idle_timeout = default_timeout if idle_timeout is None else idle_timeout
+
+    contexts = AgentContext.all()
+    loaded = sum(1 for context in contexts if context.is_loaded)
+    candidates = sorted(
+        (
+            context
+            for context in contexts
+            if context.is_loaded and context.type != AgentContextType.BACKGROUND
+        ),
+        key=lambda context: context.last_access,
+    )
+    evicted = []
+    now = time.monotonic()
+    for context in candidates:
+        if loaded <= max_loaded and now - context.last_access < idle_timeout:
+            break  # the rest was used more recently
+        if evict(context):
+            evicted.append(context.id)
+            loaded -= 1
+    return evicted
+
+
+def evict(context: AgentContext, min_idle: float = MIN_IDLE) -> bool:
+    """Saves a chat to disk and releases its memory, shells and browsers."""
+    start = time.monotonic()
+    try:
+        agent = persist_chat.unload_tmp_chat(context, _rehydrate, min_idle=min_idle)
+    except Exception as e:
+        PrintStyle.error(f"Error evicting chat {context.id}: {e}")
+        return False
+    if not agent:
+        return False
+    _release(context, agent)
+    stats.record("evicted", context, time.monotonic() - start)
+    PrintStyle.debug(f"Evicted idle chat {context.id}")
+    return True
+
+
+def _rehydrate(context: AgentContext):
+    start = time.monotonic()
+    persist_chat.load_tmp_chat(context)
+    stats.record("rehydrated", context, time.monotonic() - start)
+    PrintStyle.debug(f"Rehydrated chat {context.id}")
+
+
+def _release(context: AgentContext, agent: Agent | None):
+    # shells and browser tasks kept in agent data by the code execution and browser tools
+    shells = []
+    while agent:
+        state = agent.get_data("_cet_state")
+        if state:
+            shells += [wrap.session for wrap in [*state.shells.values(), *state.kernels.values()]]
+        browser_state = agent.get_data("_browser_agent_state")
+        if browser_state:
+            browser_state.kill_task()
+        agent = agent.get_data(Agent.DATA_NAME_SUBORDINATE)
+
+    shell_pool.close_pools(context.id)
+    browser_pool.close_pools(context.id)
+    if shells and context.task:
+        # shells belong to the event loop of the context task
+        context.task.event_loop_thread.run_coroutine(_close_shells(shells))
+
+
+async def _close_shells(shells: list[Any]):
+    for shell in shells:
+        shell_pool.recycle(shell)
@@ -0,0 +1,144 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from python.helpers import files
+
+# parsed, chunked and embedded documents kept across calls and restarts
+INDEX_FOLDER = "tmp/document_index"
+# total bytes of chunks and embeddings on disk, least recently used documents go first
+MAX_SIZE = 1024 * 1024 * 1024
+
+
+@dataclass
+class IndexedDocument:
+    uri: str
+    version: str
+    chunks: list[tuple[str, dict]]  # (text, metadata) per chunk
+    embeddings: np.ndarray  # one row per chunk
+
+
+class DocumentIndex:
+    """
+    SQLite index of document chunks and embeddings keyed by normalized URI and
+    embedding model. Entries are valid for one document version, a content hash
+    for files or ETag / Last-Modified for web documents. WAL mode lets other
+    readers and processes use the index while it is written.
+    """
+
+    def __init__(self, folder: str = INDEX_FOLDER, max_size: int = MAX_SIZE):
+        self.path = files.get_abs_path(folder, "index.db")
+        self.max_size = max_size
+        self._lock = threading.Lock()  # serializes writers of this process
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    uri TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    chunks TEXT NOT NULL,
+                    embeddings BLOB NOT NULL,
+                    dimensions INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed REAL NOT NULL,
+                    PRIMARY KEY (uri, model)
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS documents_accessed ON documents (accessed)"
+            )
+
+    def get(self, uri: str, model: str, version: str) -> IndexedDocument | None:
+        """Returns the indexed document if it was stored for this version."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT chunks, embeddings, dimensions FROM documents WHERE uri = ? AND model = ? AND version = ?",
+                (uri, model, version),
+            ).fetchone()
+        if not row:
+            return None
+        self._touch(uri, model)
+        chunks, embeddings, dimensions = row
+        return IndexedDocument(
+            uri=uri,
+            version=version,
+            chunks=[(text, metadata) for text, metadata in json.loads(chunks)],
+            embeddings=np.frombuffer(embeddings, dtype=np.float32).reshape(-1, dimensions),
+        )
+
+    def put(
+        self,
+        uri: str,
+        model: str,
+        version: str,
+        chunks: list[tuple[str, dict]],
+        embeddings: list[list[float]] | np.ndarray,
+    ):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        chunks_json = json.dumps(chunks, default=str)
+        blob = vectors.tobytes()
+        size = len(chunks_json.encode("utf-8")) + len(blob)
+        if size > self.max_size:
+            return  # would evict everything else
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (uri, model, version, chunks_json, blob, vectors.shape[-1], size, time.time()),
+            )
+            self._evict(conn)
+
+    def delete(self, uri: str) -> bool:
+        with self._lock, self._connect() as conn:
+            return conn.execute("DELETE FROM documents WHERE uri = ?", (uri,)).rowcount > 0
+
+    def get_size(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+
+    def _touch(self, uri: str, model: str):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE documents SET accessed = ? WHERE uri = ? AND model = ?",
+                (time.time(), uri, model),
+            )
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_size:
+            return
+        for uri, model, size in conn.execute(
+            "SELECT uri, model, size FROM documents ORDER BY accessed"
+        ).fetchall():
+            conn.execute("DELETE FROM documents WHERE uri = ? AND model = ?", (uri, model))
+            total -= size
+            if total <= self.max_size:
+                break
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commits or rolls back
+                yield conn
+        finally:
+            conn.close()
+
+
+_index: DocumentIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> DocumentIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DocumentIndex()
+        return _index
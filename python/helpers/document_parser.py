@@ -0,0 +1,246 @@
+import asyncio
+import concurrent.futures
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Awaitable, Callable
+
+# parser processes shared by all contexts
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+# pages per parsing task, OCR pages are slow so their shards are smaller
+PAGES_PER_SHARD = 8
+OCR_PAGES_PER_SHARD = 2
+# seconds between intervention checks while waiting for parsers
+CHECK_INTERVAL = 0.5
+# imported once by the fork server, parser processes start with them loaded
+# (files first, it breaks an import cycle of knowledge_import)
+PRELOAD_MODULES = [
+    "python.helpers.files",
+    "python.helpers.document_parser",
+    "python.helpers.knowledge_import",
+]
+
+_executor: concurrent.futures.ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> concurrent.futures.ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # forking the threaded server itself could copy locks held by other threads,
+            # workers are forked from a single threaded server process instead, which
+            # imports only the parser modules and not the application as __main__
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(PRELOAD_MODULES)
+            _executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=MAX_WORKERS, mp_context=context
+            )
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run(
+    fn: Callable, *args, check: Callable[[], Awaitable] | None = None
+):
+    """Runs a parser function in the process pool, calling check while waiting."""
+    results = [result async for result in _run_all([(fn, args)], check)]
+    return results[0]
+
+
+def run_many(
+    tasks: list[tuple[Callable, tuple]], check: Callable[[], Awaitable] | None = None
+) -> AsyncIterator:
+    """Runs (function, args) tasks in the process pool, yielding results in order."""
+    return _run_all(tasks, check)
+
+
+async def parse_unstructured(
+    file_path: str = "", web_url: str = "", check: Callable[[], Awaitable] | None = None
+) -> str:
+    return await run(_parse_unstructured, file_path, web_url, check=check)
+
+
+async def parse_html(
+    content: str = "", web_url: str = "", check: Callable[[], Awaitable] | None = None
+) -> str:
+    """Converts HTML content, or the page at web_url, to markdown."""
+    return await run(_parse_html, content, web_url, check=check)
+
+
+async def parse_pdf(
+    path: str,
+    check: Callable[[], Awaitable] | None = None,
+    progress: Callable[[str], None] | None = None,
+) -> str:
+    """
+    Extracts text, markdown tables and image OCR from a PDF with page shards parsed in
+    parallel. Falls back to OCR of rendered pages when the PDF has no text layer.
+    """
+    pages = await run(_count_pdf_pages, path, check=check)
+    contents = "\n".join(
+        [
+            page
+            async for page in iter_pdf_pages(
+                path, pages, _parse_pdf_pages, PAGES_PER_SHARD, check, progress
+            )
+        ]
+    )
+    if contents.strip():
+        return contents
+
+    if progress:
+        progress("No text layer found, running OCR")
+    return "".join(
+        [
+            page + "\n\n"
+            async for page in iter_pdf_pages(
+                path, pages, _ocr_pdf_pages, OCR_PAGES_PER_SHARD, check, progress
+            )
+        ]
+    )
+
+
+async def iter_pdf_pages(
+    path: str,
+    pages: int,
+    parser: Callable[[str, int, int], list[str]],
+    shard_pages: int,
+    check: Callable[[], Awaitable] | None = None,
+    progress: Callable[[str], None] | None = None,
+) -> AsyncIterator[str]:
+    """Yields page texts in order as soon as their shard is parsed."""
+    shards = [
+        (parser, (path, start, min(start + shard_pages, pages)))
+        for start in range(0, pages, shard_pages)
+    ]
+    done = 0
+    async for texts in _run_all(shards, check):
+        done += len(texts)
+        if progress:
+            progress(f"Parsed {done} of {pages} pages")
+        for text in texts:
+            yield text
+
+
+async def _run_all(
+    tasks: list[tuple[Callable, tuple]], check: Callable[[], Awaitable] | None
+) -> AsyncIterator:
+    # submit everything, the pool bounds parallelism, and yield results in order
+    loop = asyncio.get_running_loop()
+    try:
+        futures = [loop.run_in_executor(get_executor(), fn, *args) for fn, args in tasks]
+    except BrokenProcessPool:
+        shutdown()
+        futures = [loop.run_in_executor(get_executor(), fn, *args) for fn, args in tasks]
+    try:
+        for future in futures:
+            while True:
+                finished, _ = await asyncio.wait({future}, timeout=CHECK_INTERVAL)
+                if check:
+                    await check()  # raises to cancel parsing
+                if finished:
+                    break
+            yield future.result()
+    finally:
+        # shards not started yet are dropped, running ones finish in the background
+        for future in futures:
+            future.cancel()
+
+
+# functions below run in the parser processes
+
+
+def _count_pdf_pages(path: str) -> int:
+    import fitz
+
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+def _parse_pdf_pages(path: str, start: int, end: int) -> list[str]:
+    # page text followed by its tables as markdown and the text of its images
+    import fitz
+
+    texts = []
+    with fitz.open(path) as doc:
+        for number in range(start, end):
+            try:
+                page = doc[number]
+                parts = [page.get_text()]
+                try:
+                    parts += [table.to_markdown() for table in page.find_tables().tables]
+                except Exception:
+                    pass
+                parts += _ocr_page_images(doc, page)
+                texts.append("\n".join(part for part in parts if part))
+            except Exception:
+                texts.append("")  # unreadable page, OCR fallback covers text-less documents
+    return texts
+
+
+def _ocr_page_images(doc, page) -> list[str]:
+    try:
+        import fitz
+        import pytesseract
+        from PIL import Image
+    except ImportError:
+        return []
+
+    texts = []
+    for image in page.get_images(full=True):
+        try:
+            pixmap = fitz.Pixmap(doc, image[0])
+            if pixmap.n - pixmap.alpha >= 4:
+                pixmap = fitz.Pixmap(fitz.csRGB, pixmap)
+            text = pytesseract.image_to_string(Image.open(io.BytesIO(pixmap.tobytes("png"))))
+            if text.strip():
+                texts.append(text)
+        except Exception:
+            continue
+    return texts
+
+
+def _ocr_pdf_pages(path: str, start: int, end: int) -> list[str]:
+    import pdf2image
+    import pytesseract
+
+    images = pdf2image.convert_from_path(path, first_page=start + 1, last_page=end)  # type: ignore
+    return [pytesseract.image_to_string(image) for image in images]
+
+
+def _parse_unstructured(file_path: str = "", web_url: str = "") -> str:
+    from langchain_unstructured import UnstructuredLoader
+
+    loader = UnstructuredLoader(
+        file_path=file_path or None,
+        web_url=web_url or None,
+        mode="single",
+        partition_via_api=False,
+        # chunking_strategy="by_page",
+        strategy="hi_res",
+    )
+    return "\n".join([element.page_content for element in loader.load()])
+
+
+def _parse_html(content: str = "", web_url: str = "") -> str:
+    from langchain_core.documents import Document
+    from langchain_community.document_loaders import AsyncHtmlLoader
+    from langchain_community.document_transformers import MarkdownifyTransformer
+
+    if web_url:
+        parts: list[Document] = AsyncHtmlLoader(web_path=web_url).load()
+    else:
+        parts = [Document(page_content=content)]
+    return "\n".join(
+        [element.page_content for element in MarkdownifyTransformer().transform_documents(parts)]
+    )
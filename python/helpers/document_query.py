@@ -2,12 +2,12 @@ import mimetypes
 import os
 import asyncio
 import aiohttp
+import hashlib
 import json
 
 from python.helpers.vector_db import VectorDB
 
 os.environ["USER_AGENT"] = "@mixedbread-ai/unstructured"  # noqa E402
-from langchain_unstructured import UnstructuredLoader  # noqa E402
 
 from urllib.parse import urlparse
 from typing import Callable, Sequence, List, Optional, Tuple
@@ -15,15 +15,12 @@ from datetime import datetime
 
 from langchain_community.document_loaders import AsyncHtmlLoader
 from langchain_community.document_loaders.text import TextLoader
-from langchain_community.document_loaders.pdf import PyMuPDFLoader
-from langchain_community.document_transformers import MarkdownifyTransformer
-from langchain_community.document_loaders.parsers.images import TesseractBlobParser
 
 from langchain_core.documents import Document
 from langchain.schema import SystemMessage, HumanMessage
 
 from python.helpers.print_style import PrintStyle
-from python.helpers import files, errors
+from python.helpers import files, errors, document_index, document_parser
 from agent import Agent
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -36,6 +33,8 @@ class DocumentQueryStore:
     """
     FAISS Store for document query results.
     Manages documents identified by URI for storage, retrieval, and searching.
+    Chunks and embeddings are also kept in the persistent document index, so
+    unchanged documents are not parsed and embedded again.
     """
 
     # Default chunking parameters
@@ -62,6 +61,7 @@ class DocumentQueryStore:
         """Initialize a DocumentQueryStore instance."""
         self.agent = agent
         self.vector_db: VectorDB | None = None
+        self._versions: dict[str, str | None] = {}  # normalized uri -> source version
 
     @staticmethod
     def normalize_uri(uri: str) -> str:
@@ -94,8 +94,100 @@ class DocumentQueryStore:
 
         return normalized
 
+    async def get_document_version(self, document_uri: str) -> str | None:
+        """
+        Version of the document source that validates the persistent index: a content
+        hash for files, ETag or Last-Modified for web documents, None if unknown.
+        """
+        document_uri = self.normalize_uri(document_uri)
+        scheme = urlparse(document_uri).scheme
+        try:
+            if scheme == "file":
+                path = document_uri.removeprefix("file://")
+                if os.path.isfile(path):
+                    return "sha256:" + await asyncio.to_thread(_hash_file, path)
+            elif scheme == "https":
+                async with aiohttp.ClientSession() as session:
+                    async with session.head(
+                        document_uri,
+                        timeout=aiohttp.ClientTimeout(total=5.0),
+                        allow_redirects=True,
+                    ) as response:
+                        if response.status < 400:
+                            if etag := response.headers.get("ETag"):
+                                return f"etag:{etag}"
+                            if modified := response.headers.get("Last-Modified"):
+                                return f"modified:{modified}"
+        except Exception as e:
+            PrintStyle.error(f"Error checking document version '{document_uri}': {e}")
+        return None
+
+    async def _get_version(self, document_uri: str) -> str | None:
+        if document_uri not in self._versions:
+            self._versions[document_uri] = await self.get_document_version(document_uri)
+        return self._versions[document_uri]
+
+    def _get_index_model(self) -> str:
+        # embeddings and chunks depend on the model and chunking parameters
+        model = getattr(self.agent.get_embedding_model(), "model_name", "default")
+        return f"{model}:{self.DEFAULT_CHUNK_SIZE}:{self.DEFAULT_CHUNK_OVERLAP}"
+
+    async def _load_indexed_document(self, document_uri: str) -> bool:
+        """Loads chunks and embeddings of the current document version from the persistent index."""
+        version = await self._get_version(document_uri)
+        if not version:
+            return False
+        try:
+            indexed = await asyncio.to_thread(
+                document_index.get_index().get,
+                document_uri,
+                self._get_index_model(),
+                version,
+            )
+            if not indexed:
+                return False
+
+            if not self.vector_db:
+                self.vector_db = self.init_vector_db()
+            docs = [
+                Document(page_content=text, metadata=dict(metadata))
+                for text, metadata in indexed.chunks
+            ]
+            await self.vector_db.insert_documents(docs, embeddings=indexed.embeddings)
+            PrintStyle.standard(
+                f"Loaded document '{document_uri}' with {len(docs)} chunks from index"
+            )
+            return True
+        except Exception as e:
+            err_text = errors.format_error(e)
+            PrintStyle.error(f"Error loading indexed document '{document_uri}': {err_text}")
+            return False
+
+    async def _save_indexed_document(
+        self, document_uri: str, docs: list[Document], embeddings: list[list[float]]
+    ):
+        version = await self._get_version(document_uri)
+        if not version:
+            return  # source cannot be validated later
+        chunks = [
+            (doc.page_content, {k: v for k, v in doc.metadata.items() if k != "id"})
+            for doc in docs
+        ]
+        try:
+            await asyncio.to_thread(
+                document_index.get_index().put,
+                document_uri,
+                self._get_index_model(),
+                version,
+                chunks,
+                embeddings,
+            )
+        except Exception as e:
+            err_text = errors.format_error(e)
+            PrintStyle.error(f"Error indexing document '{document_uri}': {err_text}")
+
     def init_vector_db(self):
-        return VectorDB(self.agent, cache=True)
+        return VectorDB(self.agent, cache=True, index_fields=["document_uri"])
 
     async def add_document(
         self, text: str, document_uri: str, metadata: dict | None = None
@@ -114,8 +206,8 @@ class DocumentQueryStore:
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
-        # Delete existing document if it exists to avoid duplicates
-        await self.delete_document(document_uri)
+        # Delete existing document if it exists to avoid duplicates, its index entry is replaced on save
+        await self.delete_document(document_uri, keep_index=True)
 
         # Initialize metadata
         doc_metadata = metadata or {}
@@ -145,10 +237,14 @@ class DocumentQueryStore:
             if not self.vector_db:
                 self.vector_db = self.init_vector_db()
 
-            ids = await self.vector_db.insert_documents(docs)
+            embeddings = await self.vector_db.embeddings.aembed_documents(
+                [doc.page_content for doc in docs]
+            )
+            ids = await self.vector_db.insert_documents(docs, embeddings=embeddings)
             PrintStyle.standard(
                 f"Added document '{document_uri}' with {len(docs)} chunks"
             )
+            await self._save_indexed_document(document_uri, docs, embeddings)
             return True, ids
         except Exception as e:
             err_text = errors.format_error(e)
@@ -166,15 +262,13 @@ class DocumentQueryStore:
             The complete document if found, None otherwise
         """
 
-        # DB not initialized, no documents inside
-        if not self.vector_db:
-            return None
-
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
-        # Get all chunks for this document
+        # Get all chunks for this document, from the persistent index if not loaded yet
         docs = await self._get_document_chunks(document_uri)
+        if not docs and await self._load_indexed_document(document_uri):
+            docs = await self._get_document_chunks(document_uri)
         if not docs:
             PrintStyle.error(f"Document not found: {document_uri}")
             return None
@@ -210,9 +304,7 @@ class DocumentQueryStore:
 
         # get docs from vector db
 
-        chunks = await self.vector_db.search_by_metadata(
-            filter=f"document_uri == '{document_uri}'",
-        )
+        chunks = self.vector_db.get_by_field("document_uri", [document_uri])
 
         PrintStyle.standard(f"Found {len(chunks)} chunks for document: {document_uri}")
         return chunks
@@ -228,39 +320,47 @@ class DocumentQueryStore:
             True if the document exists, False otherwise
         """
 
-        # DB not initialized, no documents inside
-        if not self.vector_db:
-            return False
-
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
         chunks = await self._get_document_chunks(document_uri)
-        return len(chunks) > 0
+        if chunks:
+            return True
+
+        # not loaded yet, use the persistent index if the source did not change
+        return await self._load_indexed_document(document_uri)
 
-    async def delete_document(self, document_uri: str) -> bool:
+    async def delete_document(self, document_uri: str, keep_index: bool = False) -> bool:
         """
         Delete a document from the store.
 
         Args:
             document_uri: The URI of the document to delete
+            keep_index: Keep the entry in the persistent index
 
         Returns:
             True if deleted, False if not found
         """
 
-        # DB not initialized, no documents inside
-        if not self.vector_db:
-            return False
-
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
-        chunks = await self.vector_db.search_by_metadata(
-            filter=f"document_uri == '{document_uri}'",
-        )
+        # the persistent index would bring the document back otherwise
+        indexed = False
+        if not keep_index:
+            try:
+                indexed = await asyncio.to_thread(document_index.get_index().delete, document_uri)
+            except Exception as e:
+                err_text = errors.format_error(e)
+                PrintStyle.error(f"Error removing indexed document '{document_uri}': {err_text}")
+
+        # DB not initialized, no documents inside
+        if not self.vector_db:
+            return indexed
+
+        chunks = self.vector_db.get_by_field("document_uri", [document_uri])
         if not chunks:
-            return False
+            return indexed
 
         # Collect IDs to delete
         ids_to_delete = [chunk.metadata["id"] for chunk in chunks]
@@ -325,9 +425,51 @@ class DocumentQueryStore:
         Returns:
             List of matching document chunks
         """
-        return await self.search_documents(
-            query, limit, threshold, f"document_uri == '{document_uri}'"
+        results = await self.search_documents_by_uris(
+            [query], [document_uri], limit, threshold
         )
+        return results[0]
+
+    async def search_documents_by_uris(
+        self,
+        queries: Sequence[str],
+        document_uris: Sequence[str],
+        limit: int = 10,
+        threshold: float = 0.5,
+    ) -> List[List[Document]]:
+        """
+        Search several queries at once within the given documents.
+
+        Args:
+            queries: The search query strings
+            document_uris: The URIs of the documents to search within
+            limit: Maximum number of results per query
+            threshold: Minimum similarity score threshold (0-1)
+
+        Returns:
+            List of matching document chunks for each query
+        """
+
+        # DB not initialized, no documents inside
+        if not self.vector_db:
+            return [[] for _ in queries]
+
+        normalized_uris = [self.normalize_uri(uri) for uri in document_uris]
+        ids = [
+            chunk.metadata["id"]
+            for chunk in self.vector_db.get_by_field("document_uri", normalized_uris)
+        ]
+
+        try:
+            results = await self.vector_db.search_many_by_similarity_threshold(
+                queries=queries, limit=limit, threshold=threshold, ids=ids
+            )
+            for query, chunks in zip(queries, results):
+                PrintStyle.standard(f"Search '{query}' returned {len(chunks)} results")
+            return results
+        except Exception as e:
+            PrintStyle.error(f"Error searching documents: {str(e)}")
+            return [[] for _ in queries]
 
     async def list_documents(self) -> List[str]:
         """
@@ -351,6 +493,14 @@ class DocumentQueryStore:
         return sorted(list(uris))
 
 
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 class DocumentQueryHelper:
 
     def __init__(
@@ -373,40 +523,27 @@ class DocumentQueryHelper:
             *[self.document_get_content(uri, True) for uri in document_uris]
         )
         await self.agent.handle_intervention()
-        selected_chunks = {}
-        for question in questions:
-            self.progress_callback(f"Optimizing query: {question}")
-            await self.agent.handle_intervention()
-            human_content = f'Search Query: "{question}"'
-            system_content = self.agent.parse_prompt(
-                "fw.document_query.optmimize_query.md"
-            )
-
-            optimized_query = (
-                await self.agent.call_utility_model(
-                    system=system_content, message=human_content
-                )
-            ).strip()
-
-            await self.agent.handle_intervention()
-            self.progress_callback(f"Searching documents with query: {optimized_query}")
 
-            normalized_uris = [self.store.normalize_uri(uri) for uri in document_uris]
-            doc_filter = " or ".join(
-                [f"document_uri == '{uri}'" for uri in normalized_uris]
-            )
+        # optimize all queries concurrently, then search them with one embedding pass
+        self.progress_callback(f"Optimizing {len(questions)} queries")
+        optimized_queries = await asyncio.gather(
+            *[self.optimize_query(question) for question in questions]
+        )
 
-            chunks = await self.store.search_documents(
-                query=optimized_query,
-                limit=100,
-                threshold=DEFAULT_SEARCH_THRESHOLD,
-                filter=doc_filter,
-            )
+        await self.agent.handle_intervention()
+        self.progress_callback(
+            f"Searching documents with queries: {', '.join(optimized_queries)}"
+        )
 
-            self.progress_callback(f"Found {len(chunks)} chunks")
+        results = await self.store.search_documents_by_uris(
+            queries=optimized_queries,
+            document_uris=document_uris,
+            limit=100,
+            threshold=DEFAULT_SEARCH_THRESHOLD,
+        )
+        selected_chunks = self._select_chunks(document_uris, results)
 
-            for chunk in chunks:
-                selected_chunks[chunk.metadata["id"]] = chunk
+        self.progress_callback(f"Found {len(selected_chunks)} chunks")
 
         if not selected_chunks:
             self.progress_callback("No relevant content found in the documents")
@@ -420,7 +557,7 @@ class DocumentQueryHelper:
 
         questions_str = "\n".join([f" *  {question}" for question in questions])
         content = "\n\n----\n\n".join(
-            [chunk.page_content for chunk in selected_chunks.values()]
+            [chunk.page_content for chunk in selected_chunks]
         )
 
         qa_system_message = self.agent.parse_prompt(
@@ -439,6 +576,42 @@ class DocumentQueryHelper:
 
         return True, str(ai_response)
 
+    async def optimize_query(self, question: str) -> str:
+        await self.agent.handle_intervention()
+        human_content = f'Search Query: "{question}"'
+        system_content = self.agent.parse_prompt(
+            "fw.document_query.optmimize_query.md"
+        )
+
+        optimized_query = (
+            await self.agent.call_utility_model(
+                system=system_content, message=human_content
+            )
+        ).strip()
+        return optimized_query or question
+
+    def _select_chunks(
+        self, document_uris: List[str], results: List[List[Document]]
+    ) -> List[Document]:
+        # unique chunks in document order, repeated content is kept once
+        uri_order: dict[str, int] = {}
+        for uri in document_uris:
+            uri_order.setdefault(self.store.normalize_uri(uri), len(uri_order))
+        chunks: dict[str, Document] = {}
+        contents = set()
+        for chunk in (chunk for result in results for chunk in result):
+            if chunk.metadata["id"] in chunks or chunk.page_content in contents:
+                continue
+            chunks[chunk.metadata["id"]] = chunk
+            contents.add(chunk.page_content)
+        return sorted(
+            chunks.values(),
+            key=lambda chunk: (
+                uri_order.get(chunk.metadata.get("document_uri"), len(uri_order)),
+                chunk.metadata.get("chunk_index", 0),
+            ),
+        )
+
     async def document_get_content(
         self, document_uri: str, add_to_db: bool = False
     ) -> str:
@@ -513,15 +686,15 @@ class DocumentQueryHelper:
         if not exists:
             await self.agent.handle_intervention()
             if mimetype.startswith("image/"):
-                document_content = self.handle_image_document(document_uri, scheme)
+                document_content = await self.handle_image_document(document_uri, scheme)
             elif mimetype == "text/html":
-                document_content = self.handle_html_document(document_uri, scheme)
+                document_content = await self.handle_html_document(document_uri, scheme)
             elif mimetype.startswith("text/") or mimetype == "application/json":
                 document_content = self.handle_text_document(document_uri, scheme)
             elif mimetype == "application/pdf":
-                document_content = self.handle_pdf_document(document_uri, scheme)
+                document_content = await self.handle_pdf_document(document_uri, scheme)
             else:
-                document_content = self.handle_unstructured_document(
+                document_content = await self.handle_unstructured_document(
                     document_uri, scheme
                 )
             if add_to_db:
@@ -547,29 +720,25 @@ class DocumentQueryHelper:
                 )
         return document_content
 
-    def handle_image_document(self, document: str, scheme: str) -> str:
-        return self.handle_unstructured_document(document, scheme)
+    async def handle_image_document(self, document: str, scheme: str) -> str:
+        return await self.handle_unstructured_document(document, scheme)
 
-    def handle_html_document(self, document: str, scheme: str) -> str:
+    async def handle_html_document(self, document: str, scheme: str) -> str:
+        # markdown conversion runs in the parser processes
         if scheme in ["http", "https"]:
-            loader = AsyncHtmlLoader(web_path=document)
-            parts: list[Document] = loader.load()
+            return await document_parser.parse_html(
+                web_url=document, check=self.agent.handle_intervention
+            )
         elif scheme == "file":
             # Use RFC file operations instead of TextLoader
             file_content_bytes = files.read_file_bin(document)
             file_content = file_content_bytes.decode("utf-8")
-            # Create Document manually since we're not using TextLoader
-            parts = [Document(page_content=file_content, metadata={"source": document})]
+            return await document_parser.parse_html(
+                content=file_content, check=self.agent.handle_intervention
+            )
         else:
             raise ValueError(f"Unsupported scheme: {scheme}")
 
-        return "\n".join(
-            [
-                element.page_content
-                for element in MarkdownifyTransformer().transform_documents(parts)
-            ]
-        )
-
     def handle_text_document(self, document: str, scheme: str) -> str:
         if scheme in ["http", "https"]:
             loader = AsyncHtmlLoader(web_path=document)
@@ -587,12 +756,12 @@ class DocumentQueryHelper:
 
         return "\n".join([element.page_content for element in elements])
 
-    def handle_pdf_document(self, document: str, scheme: str) -> str:
+    async def handle_pdf_document(self, document: str, scheme: str) -> str:
         temp_file_path = ""
         if scheme == "file":
             # Use RFC file operations to read the PDF file as binary
             file_content_bytes = files.read_file_bin(document)
-            # Create a temporary file for PyMuPDFLoader since it needs a file path
+            # Create a temporary file for the parser processes since they need a file path
             import tempfile
 
             with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
@@ -604,7 +773,7 @@ class DocumentQueryHelper:
             import tempfile
 
             with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                response = requests.get(document, timeout=10.0)
+                response = await asyncio.to_thread(requests.get, document, timeout=10.0)
                 if response.status_code != 200:
                     raise ValueError(
                         f"DocumentQueryHelper::handle_pdf_document: Failed to download PDF from {document}: {response.status_code}"
@@ -620,59 +789,25 @@ class DocumentQueryHelper:
             )
 
         try:
-            try:
-                loader = PyMuPDFLoader(
-                    temp_file_path,
-                    mode="single",
-                    extract_tables="markdown",
-                    extract_images=True,
-                    images_inner_format="text",
-                    images_parser=TesseractBlobParser(),
-                    pages_delimiter="\n",
-                )
-                elements: list[Document] = loader.load()
-                contents = "\n".join([element.page_content for element in elements])
-            except Exception as e:
-                PrintStyle.error(
-                    f"DocumentQueryHelper::handle_pdf_document: Error loading with PyMuPDF: {e}"
-                )
-                contents = ""
-
-            if not contents:
-                import pdf2image
-                import pytesseract
-
-                PrintStyle.debug(
-                    f"DocumentQueryHelper::handle_pdf_document: FALLBACK Converting PDF to images: {temp_file_path}"
-                )
-
-                # Convert PDF to images
-                pages = pdf2image.convert_from_path(temp_file_path)  # type: ignore
-                for page in pages:
-                    contents += pytesseract.image_to_string(page) + "\n\n"
-
-            return contents
+            # pages are parsed in parallel shards, with OCR of rendered pages as fallback
+            return await document_parser.parse_pdf(
+                temp_file_path,
+                check=self.agent.handle_intervention,
+                progress=self.progress_callback,
+            )
         finally:
             os.unlink(temp_file_path)
 
-    def handle_unstructured_document(self, document: str, scheme: str) -> str:
-        elements: list[Document] = []
+    async def handle_unstructured_document(self, document: str, scheme: str) -> str:
         if scheme in ["http", "https"]:
-            # loader = UnstructuredURLLoader(urls=[document], mode="single")
-            loader = UnstructuredLoader(
-                web_url=document,
-                mode="single",
-                partition_via_api=False,
-                # chunking_strategy="by_page",
-                strategy="hi_res",
+            return await document_parser.parse_unstructured(
+                web_url=document, check=self.agent.handle_intervention
             )
-            elements = loader.load()
         elif scheme == "file":
             # Use RFC file operations to read the file as binary
             file_content_bytes = files.read_file_bin(document)
             # Create a temporary file for UnstructuredLoader since it needs a file path
             import tempfile
-            import os
 
             # Get file extension to preserve it for proper processing
             _, ext = os.path.splitext(document)
@@ -681,18 +816,11 @@ class DocumentQueryHelper:
                 temp_file_path = temp_file.name
 
             try:
-                loader = UnstructuredLoader(
-                    file_path=temp_file_path,
-                    mode="single",
-                    partition_via_api=False,
-                    # chunking_strategy="by_page",
-                    strategy="hi_res",
+                return await document_parser.parse_unstructured(
+                    file_path=temp_file_path, check=self.agent.handle_intervention
                 )
-                elements = loader.load()
             finally:
                 # Clean up temporary file
                 os.unlink(temp_file_path)
         else:
             raise ValueError(f"Unsupported scheme: {scheme}")
-
-        return "\n".join([element.page_content for element in elements])
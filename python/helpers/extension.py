@@ -1,12 +1,21 @@
 from abc import abstractmethod
+import asyncio
+from dataclasses import dataclass
+import time
 from typing import Any
-from python.helpers import extract_tools, files 
+import weakref
+from python.helpers import extract_tools, files
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from agent import Agent
 
 class Extension:
 
+    # stateless extensions keep no state on the instance, one instance per agent is reused
+    stateless: bool = False
+    # independent extensions do not depend on their siblings and may run concurrently with them
+    independent: bool = False
+
     def __init__(self, agent: "Agent|None", **kwargs):
         self.agent: "Agent" = agent # type: ignore < here we ignore the type check as there are currently no extensions without an agent
         self.kwargs = kwargs
@@ -16,36 +25,127 @@ class Extension:
         pass
 
 
+@dataclass
+class ExtensionTiming:
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, elapsed: float):
+        self.calls += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+
+class _DispatchTable:
+    # classes for one (profile, extension point), grouped into sequential steps
+    def __init__(self, extension_point: str, folders: list[str]):
+        self.extension_point = extension_point
+        self.folders = folders
+        self.signature = _get_folders_signature(folders)
+        self.checked_at = time.monotonic()
+        self.classes = _merge_classes([_load_extensions(folder) for folder in folders])
+        self.steps = _group_steps(self.classes)
+        self.timing_keys = {cls: f"{extension_point}/{_get_file_from_module(cls.__module__)}" for cls in self.classes}
+        self.instances: "weakref.WeakKeyDictionary[Any, dict[type, Extension]]" = weakref.WeakKeyDictionary()
+        self.agentless_instances: dict[type, Extension] = {}
+
+    def is_fresh(self) -> bool:
+        now = time.monotonic()
+        if now - self.checked_at < _RECHECK_INTERVAL:
+            return True
+        self.checked_at = now
+        return _get_folders_signature(self.folders) == self.signature
+
+    def get_instance(self, cls: type[Extension], agent: "Agent|None") -> Extension:
+        if not cls.stateless:
+            return cls(agent=agent)
+        instances = self.agentless_instances if agent is None else self.instances.setdefault(agent, {})
+        instance = instances.get(cls)
+        if instance is None:
+            instance = instances[cls] = cls(agent=agent)
+        return instance
+
+
+_RECHECK_INTERVAL = 1.0  # seconds between folder change checks per dispatch table
+_tables: dict[tuple[str, str], _DispatchTable] = {}
+extension_timings: dict[str, ExtensionTiming] = {}
+
+
 async def call_extensions(extension_point: str, agent: "Agent|None" = None, **kwargs) -> Any:
+    table = _get_dispatch_table(extension_point, agent.config.profile if agent else "")
+
+    # call extensions, independent neighbours run concurrently
+    for step in table.steps:
+        if len(step) == 1:
+            await _run_extension(table, step[0], agent, kwargs)
+        else:
+            await asyncio.gather(*[_run_extension(table, cls, agent, kwargs) for cls in step])
+
+
+def get_extension_timings() -> dict[str, ExtensionTiming]:
+    return extension_timings
+
+
+async def _run_extension(table: _DispatchTable, cls: type[Extension], agent: "Agent|None", kwargs: dict):
+    start = time.perf_counter()
+    try:
+        await table.get_instance(cls, agent).execute(**kwargs)
+    finally:
+        key = table.timing_keys[cls]
+        timing = extension_timings.get(key)
+        if timing is None:
+            timing = extension_timings[key] = ExtensionTiming()
+        timing.add(time.perf_counter() - start)
+
+
+def _get_dispatch_table(extension_point: str, profile: str) -> _DispatchTable:
+    key = (profile, extension_point)
+    table = _tables.get(key)
+    if table is None or not table.is_fresh():
+        folders = [files.get_abs_path("python/extensions/" + extension_point)]
+        if profile:
+            folders.append(files.get_abs_path("agents/" + profile + "/extensions/" + extension_point))
+        if table is not None:
+            for folder in folders:
+                _cache.pop(folder, None)  # reload classes from changed folders
+        table = _tables[key] = _DispatchTable(extension_point, folders)
+    return table
+
+
+def _get_folders_signature(folders: list[str]) -> tuple:
+    return tuple(files.get_file_signature(folder) for folder in folders)
+
 
-    # get default extensions
-    defaults = await _get_extensions("python/extensions/" + extension_point)
-    classes = defaults
+def _merge_classes(class_lists: list[list[type[Extension]]]) -> list[type[Extension]]:
+    if len([classes for classes in class_lists if classes]) <= 1:
+        return next((classes for classes in class_lists if classes), [])
+    # merge them, agentics overwrite defaults
+    unique = {}
+    for classes in class_lists:
+        for cls in classes:
+            unique[_get_file_from_module(cls.__module__)] = cls
 
-    # get agent extensions
-    if agent and agent.config.profile:
-        agentics = await _get_extensions("agents/" + agent.config.profile + "/extensions/" + extension_point)
-        if agentics:
-            # merge them, agentics overwrite defaults
-            unique = {}
-            for cls in defaults + agentics:
-                unique[_get_file_from_module(cls.__module__)] = cls
+    # sort by name
+    return sorted(unique.values(), key=lambda cls: _get_file_from_module(cls.__module__))
 
-            # sort by name
-            classes = sorted(unique.values(), key=lambda cls: _get_file_from_module(cls.__module__))
 
-    # call extensions
+def _group_steps(classes: list[type[Extension]]) -> list[list[type[Extension]]]:
+    steps: list[list[type[Extension]]] = []
     for cls in classes:
-        await cls(agent=agent).execute(**kwargs)
+        if cls.independent and steps and steps[-1][0].independent:
+            steps[-1].append(cls)
+        else:
+            steps.append([cls])
+    return steps
 
 
 def _get_file_from_module(module_name: str) -> str:
     return module_name.split(".")[-1]
 
 _cache: dict[str, list[type[Extension]]] = {}
-async def _get_extensions(folder:str):
+def _load_extensions(folder: str) -> list[type[Extension]]:
     global _cache
-    folder = files.get_abs_path(folder)
     if folder in _cache:
         classes = _cache[folder]
     else:
@@ -15,6 +15,8 @@ import importlib.util
 import inspect
 import glob
 import mimetypes
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 
 class VariablesPlugin(ABC):
@@ -42,11 +44,7 @@ def load_plugin_variables(
 
     if plugin_file and exists(plugin_file):
 
-        from python.helpers import extract_tools
-
-        classes = extract_tools.load_classes_from_file(
-            plugin_file, VariablesPlugin, one_per_file=False
-        )
+        classes = _load_plugin_classes(plugin_file)
         for cls in classes:
             return cls().get_variables(file, backup_dirs, **kwargs)  # type: ignore < abstract class here is ok, it is always a subclass
 
@@ -77,42 +75,229 @@ def load_plugin_variables(
     return {}
 
 
+def _load_plugin_classes(plugin_file: str) -> list[type[VariablesPlugin]]:
+    # importing the plugin module is expensive, reuse classes until the file changes
+    signature = get_file_signature(plugin_file)
+    _record_dependencies([(plugin_file, signature)])
+    cached = _plugin_classes_cache.get(plugin_file)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    from python.helpers import extract_tools
+
+    classes = extract_tools.load_classes_from_file(
+        plugin_file, VariablesPlugin, one_per_file=False
+    )
+    _plugin_classes_cache[plugin_file] = (signature, classes)
+    return classes
+
+
 from python.helpers.strings import sanitize_string
 
 
+# compiled prompt template segment kinds
+_SEGMENT_TEXT = 0
+_SEGMENT_PLACEHOLDER = 1
+_SEGMENT_INCLUDE = 2
+
+# matches {{ include 'path' }} and {{placeholder}} in one pass
+_TEMPLATE_TOKEN_PATTERN = re.compile(
+    r"{{\s*include\s*['\"](.*?)['\"]\s*}}|{{(\w+)}}"
+)
+
+
+class _PromptTemplate:
+    """Prompt file precompiled into static segments, placeholders and includes."""
+
+    def __init__(
+        self,
+        path: str,
+        segments: list[tuple[int, str, str]],
+        dependencies: list[tuple[str, tuple[int, int] | None]],
+        is_json: bool = False,
+    ):
+        self.path = path
+        self.segments = segments
+        # files the template depends on with their signatures, None = must not exist
+        self.dependencies = dependencies
+        self.is_json = is_json
+
+    def is_fresh(self) -> bool:
+        for path, signature in self.dependencies:
+            if get_file_signature(path) != signature:
+                return False
+        return True
+
+
+_prompt_templates_cache: dict[tuple[str, str, tuple[str, ...]], _PromptTemplate] = {}
+_plugin_classes_cache: dict[
+    str, tuple[tuple[int, int] | None, list[type[VariablesPlugin]]]
+] = {}
+
+
+def get_file_signature(path: str) -> tuple[int, int] | None:
+    "Cheap change marker for a file or directory: (mtime_ns, size), None if missing."
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PromptDependencies:
+    """Files and folders a rendered prompt was built from, see track_prompt_dependencies."""
+
+    def __init__(self):
+        self.files: dict[str, tuple[int, int] | None] = {}
+
+    def add(self, dependencies):
+        for path, signature in dependencies:
+            self.files.setdefault(path, signature)
+
+    def is_fresh(self) -> bool:
+        for path, signature in self.files.items():
+            if get_file_signature(path) != signature:
+                return False
+        return True
+
+
+_prompt_dependency_trackers: ContextVar[tuple[PromptDependencies, ...]] = ContextVar(
+    "_prompt_dependency_trackers", default=()
+)
+
+
+@contextmanager
+def track_prompt_dependencies():
+    "Collect all prompt files, plugins and folders used by renders inside the block."
+    dependencies = PromptDependencies()
+    token = _prompt_dependency_trackers.set(
+        _prompt_dependency_trackers.get() + (dependencies,)
+    )
+    try:
+        yield dependencies
+    finally:
+        _prompt_dependency_trackers.reset(token)
+
+
+def _record_dependencies(dependencies):
+    for tracker in _prompt_dependency_trackers.get():
+        tracker.add(dependencies)
+
+
+def _compile_template(content: str) -> list[tuple[int, str, str]]:
+    segments: list[tuple[int, str, str]] = []
+    position = 0
+    for match in _TEMPLATE_TOKEN_PATTERN.finditer(content):
+        if match.start() > position:
+            text = content[position : match.start()]
+            segments.append((_SEGMENT_TEXT, text, text))
+        include_path, placeholder = match.group(1), match.group(2)
+        if placeholder is not None:
+            segments.append((_SEGMENT_PLACEHOLDER, placeholder, match.group(0)))
+        else:
+            segments.append((_SEGMENT_INCLUDE, include_path, match.group(0)))
+        position = match.end()
+    if position < len(content):
+        text = content[position:]
+        segments.append((_SEGMENT_TEXT, text, text))
+    return segments
+
+
+def _get_prompt_template(
+    mode: str, _filename: str, _directories: list[str], _encoding="utf-8"
+) -> _PromptTemplate:
+    # cache is keyed by the search path, so each agent profile gets its own entries
+    key = (mode, _filename, tuple(_directories))
+    template = _prompt_templates_cache.get(key)
+    if template and template.is_fresh():
+        _record_dependencies(template.dependencies)
+        return template
+
+    # resolve the file, remembering higher priority locations that may appear later
+    dependencies: list[tuple[str, tuple[int, int] | None]] = []
+    absolute_path = None
+    for directory in _directories:
+        full_path = get_abs_path(directory, _filename)
+        signature = get_file_signature(full_path)
+        dependencies.append((full_path, signature))
+        if signature is not None:
+            absolute_path = full_path
+            break
+    if absolute_path is None:
+        raise FileNotFoundError(
+            f"File '{_filename}' not found in any of the provided directories."
+        )
+
+    with open(absolute_path, "r", encoding=_encoding) as f:
+        content = f.read()
+
+    is_json = False
+    if mode == "parse":
+        is_json = is_full_json_template(content)
+        content = remove_code_fences(content)
+
+    template = _PromptTemplate(
+        absolute_path, _compile_template(content), dependencies, is_json
+    )
+    _prompt_templates_cache[key] = template
+    _record_dependencies(dependencies)
+    return template
+
+
+def _render_template(
+    _template: _PromptTemplate,
+    _directories: list[str],
+    _variables: dict[str, Any],
+    _json_values: bool = False,
+    **kwargs,
+) -> str:
+    parts: list[str] = []
+    for kind, value, raw in _template.segments:
+        if kind == _SEGMENT_TEXT:
+            parts.append(value)
+        elif kind == _SEGMENT_PLACEHOLDER:
+            if value in _variables:
+                replacement = _variables[value]
+                parts.append(
+                    json.dumps(replacement) if _json_values else str(replacement)
+                )
+            else:
+                parts.append(raw)
+        elif _json_values or os.path.isabs(value):
+            # includes are not processed in json templates, absolute paths are left as is
+            parts.append(raw)
+        else:
+            try:
+                # here we use kwargs, the plugin variables are not inherited
+                parts.append(read_prompt_file(value, _directories, **kwargs))
+            except FileNotFoundError:
+                parts.append(raw)  # keep original if file not found
+    return "".join(parts)
+
+
+def clear_prompt_cache():
+    _prompt_templates_cache.clear()
+    _plugin_classes_cache.clear()
+
+
 def parse_file(
     _filename: str, _directories: list[str] | None = None, _encoding="utf-8", **kwargs
 ):
     if _directories is None:
         _directories = []
 
-    # Find the file in the directories
-    absolute_path = find_file_in_dirs(_filename, _directories)
+    # Find, read and compile the file (cached until it changes)
+    template = _get_prompt_template("parse", _filename, _directories, _encoding)
 
-    # Read the file content
-    with open(absolute_path, "r", encoding=_encoding) as f:
-        # content = remove_code_fences(f.read())
-        content = f.read()
-
-    is_json = is_full_json_template(content)
-    content = remove_code_fences(content)
-    variables = load_plugin_variables(absolute_path, _directories, **kwargs) or {}  # type: ignore
+    variables = load_plugin_variables(template.path, _directories, **kwargs) or {}  # type: ignore
     variables.update(kwargs)
-    if is_json:
-        content = replace_placeholders_json(content, **variables)
+    if template.is_json:
+        content = _render_template(template, _directories, variables, _json_values=True)
         obj = json.loads(content)
-        # obj = replace_placeholders_dict(obj, **variables)
         return obj
     else:
-        content = replace_placeholders_text(content, **variables)
-        # Process include statements
-        content = process_includes(
-            # here we use kwargs, the plugin variables are not inherited
-            content,
-            _directories,
-            **kwargs,
-        )
-        return content
+        # Replace placeholders and process include statements in a single pass
+        return _render_template(template, _directories, variables, **kwargs)
 
 
 def read_prompt_file(
@@ -127,29 +312,14 @@ def read_prompt_file(
         _file = os.path.basename(_file)
         _directories = [folder_path] + _directories
 
-    # Find the file in the directories
-    absolute_path = find_file_in_dirs(_file, _directories)
-
-    # Read the file content
-    with open(absolute_path, "r", encoding=_encoding) as f:
-        # content = remove_code_fences(f.read())
-        content = f.read()
+    # Find, read and compile the file (cached until it changes)
+    template = _get_prompt_template("prompt", _file, _directories, _encoding)
 
     variables = load_plugin_variables(_file, _directories, **kwargs) or {}  # type: ignore
     variables.update(kwargs)
 
-    # Replace placeholders with values from kwargs
-    content = replace_placeholders_text(content, **variables)
-
-    # Process include statements
-    content = process_includes(
-        # here we use kwargs, the plugin variables are not inherited
-        content,
-        _directories,
-        **kwargs,
-    )
-
-    return content
+    # Replace placeholders and process include statements in a single pass
+    return _render_template(template, _directories, variables, **kwargs)
 
 
 def read_file(relative_path: str, encoding="utf-8"):
@@ -270,6 +440,8 @@ def get_unique_filenames_in_dirs(dir_paths: list[str], pattern: str = "*"):
     result = []
     for dir_path in dir_paths:
         full_dir = get_abs_path(dir_path)
+        # folder listings feed prompt plugins, adding or removing files changes their mtime
+        _record_dependencies([(full_dir, get_file_signature(full_dir))])
         for file_path in glob.glob(os.path.join(full_dir, pattern)):
             fname = os.path.basename(file_path)
             if fname not in seen and os.path.isfile(file_path):
@@ -467,6 +639,7 @@ def get_subdirectories(
     exclude: str | list[str] | None = None,
 ):
     abs_path = get_abs_path(relative_path)
+    _record_dependencies([(abs_path, get_file_signature(abs_path))])
     if not os.path.exists(abs_path):
         return []
     if isinstance(include, str):
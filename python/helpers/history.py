@@ -340,6 +340,12 @@ class History(Record):
         result += self.current.output()
         return result
 
+    def get_stable_prefix_length(self) -> int:
+        # bulks and past topics only change when history is compressed or a new topic starts
+        return sum(len(b.output()) for b in self.bulks) + sum(
+            len(t.output()) for t in self.topics
+        )
+
     @staticmethod
     def from_dict(data: dict, history: "History"):
         history.counter = data.get("counter", 0)
@@ -530,6 +536,21 @@ def output_langchain(messages: list[OutputMessage]):
     return result
 
 
+def get_prefix_end_index(outputs: list[OutputMessage], prefix_length: int) -> int:
+    """Index of the last message in output_langchain(outputs) that contains only
+    the first prefix_length outputs, -1 if there is none."""
+    if prefix_length <= 0 or prefix_length > len(outputs):
+        return -1
+    # output_langchain merges consecutive outputs of the same role
+    index = -1
+    for i in range(prefix_length):
+        if i == 0 or outputs[i]["ai"] != outputs[i - 1]["ai"]:
+            index += 1
+    if prefix_length < len(outputs) and outputs[prefix_length]["ai"] == outputs[prefix_length - 1]["ai"]:
+        index -= 1  # last prefix message is merged with the following one
+    return index
+
+
 def output_text(messages: list[OutputMessage], ai_label="ai", human_label="human"):
     return "\n".join(_stringify_output(o, ai_label, human_label) for o in messages)
 
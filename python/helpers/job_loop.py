@@ -4,7 +4,7 @@ import time
 from python.helpers.task_scheduler import TaskScheduler
 from python.helpers.print_style import PrintStyle
 from python.helpers import errors
-from python.helpers import runtime, dotenv
+from python.helpers import context_eviction, runtime, dotenv
 
 
 SLEEP_TIME = 60
@@ -41,6 +41,10 @@ async def run_loop():
                 await scheduler_tick()
             except Exception as e:
                 PrintStyle().error(errors.format_error(e))
+        try:
+            context_eviction.evict_idle()
+        except Exception as e:
+            PrintStyle().error(errors.format_error(e))
         await asyncio.sleep(SLEEP_TIME)  # TODO! - if we lower it under 1min, it can run a 5min job multiple times in it's target minute
 
 
@@ -1,18 +1,36 @@
 import glob
 import os
 import hashlib
-from typing import Any, Dict, Literal, TypedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Literal, NotRequired, TypedDict
 from langchain_community.document_loaders import (
     CSVLoader,
     PyPDFLoader,
     TextLoader,
     UnstructuredHTMLLoader,
 )
+from python.helpers import document_parser
 from python.helpers.log import LogItem
 from python.helpers.print_style import PrintStyle
 
 text_loader_kwargs = {"autodetect_encoding": True}
 
+# Mapping file extensions to corresponding loader classes
+# Note: Using TextLoader for JSON and MD to avoid parsing issues with consolidation
+file_types_loaders = {
+    "txt": TextLoader,
+    "pdf": PyPDFLoader,
+    "csv": CSVLoader,
+    "html": UnstructuredHTMLLoader,
+    "json": TextLoader,  # Use TextLoader for better consolidation compatibility
+    "md": TextLoader,    # Use TextLoader for better consolidation compatibility
+}
+
+# changed files loaded per parser task, knowledge files are mostly small
+FILES_PER_SHARD = 16
+# bytes read at once while hashing
+HASH_BLOCK_SIZE = 1024 * 1024
+
 
 class KnowledgeImport(TypedDict):
     file: str
@@ -20,13 +38,70 @@ class KnowledgeImport(TypedDict):
     ids: list[str]
     state: Literal["changed", "original", "removed"]
     documents: list[Any]
+    mtime: NotRequired[float]
+    size: NotRequired[int]
+    metadata: NotRequired[dict[str, Any]]  # import metadata of a changed file until it is loaded
+
+
+@dataclass
+class ImportProgress:
+    """Counters of a knowledge import, readable while the import runs."""
+
+    files: int = 0  # supported files found
+    hashed: int = 0  # files hashed because their size or mtime changed
+    changed: int = 0  # new and modified files to load
+    removed: int = 0
+    loaded: int = 0  # changed files parsed
+    failed: int = 0
+    documents: int = 0  # documents parsed from changed files
+    inserted: int = 0  # documents embedded and saved to memory
+    done: bool = False
+    callback: Callable[["ImportProgress"], None] | None = field(default=None, repr=False)
+
+    def add(self, **counts: int):
+        for name, count in counts.items():
+            setattr(self, name, getattr(self, name) + count)
+        self._notify()
+
+    def finish(self):
+        self.done = True
+        self._notify()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "files": self.files,
+            "hashed": self.hashed,
+            "changed": self.changed,
+            "removed": self.removed,
+            "loaded": self.loaded,
+            "failed": self.failed,
+            "documents": self.documents,
+            "inserted": self.inserted,
+            "done": self.done,
+        }
+
+    def _notify(self):
+        if self.callback:
+            self.callback(self)
+
+
+# progress of the last import per memory subdir
+_imports: dict[str, ImportProgress] = {}
+
+
+def track_progress(memory_subdir: str, progress: ImportProgress):
+    _imports[memory_subdir] = progress
+
+
+def get_progress(memory_subdir: str) -> ImportProgress | None:
+    return _imports.get(memory_subdir)
 
 
 def calculate_checksum(file_path: str) -> str:
     hasher = hashlib.md5()
     with open(file_path, "rb") as f:
-        buf = f.read()
-        hasher.update(buf)
+        while block := f.read(HASH_BLOCK_SIZE):
+            hasher.update(block)
     return hasher.hexdigest()
 
 
@@ -37,28 +112,59 @@ def load_knowledge(
     metadata: dict[str, Any] = {},
     filename_pattern: str = "**/*",
     recursive: bool = True,
+    progress: ImportProgress | None = None,
 ) -> Dict[str, KnowledgeImport]:
     """
     Load knowledge files from a directory with change detection and metadata enhancement.
-
-    This function now includes enhanced error handling and compatibility with the
-    intelligent memory consolidation system.
+    Changed files are loaded in this process, Memory.preload_knowledge uses
+    scan_knowledge and load_documents to load them in parallel instead.
     """
-
-    # Mapping file extensions to corresponding loader classes
-    # Note: Using TextLoader for JSON and MD to avoid parsing issues with consolidation
-    file_types_loaders = {
-        "txt": TextLoader,
-        "pdf": PyPDFLoader,
-        "csv": CSVLoader,
-        "html": UnstructuredHTMLLoader,
-        "json": TextLoader,  # Use TextLoader for better consolidation compatibility
-        "md": TextLoader,    # Use TextLoader for better consolidation compatibility
-    }
-
+    index = scan_knowledge(
+        log_item, knowledge_dir, index, metadata, filename_pattern, recursive, progress
+    )
     cnt_files = 0
     cnt_docs = 0
+    changed = [
+        (file, data.pop("metadata", {}))
+        for file, data in index.items()
+        if data.get("state") == "changed" and "metadata" in data
+    ]
+    for file, documents, error in _load_files(changed):
+        if error:
+            _report_error(log_item, file, error, progress)
+            index[file]["state"] = "removed"
+            continue
+        index[file]["documents"] = documents
+        cnt_files += 1
+        cnt_docs += len(documents)
+        if progress:
+            progress.add(loaded=1, documents=len(documents))
+
+    # Log results
+    if cnt_files > 0 or cnt_docs > 0:
+        PrintStyle.standard(f"Processed {cnt_docs} documents from {cnt_files} files.")
+        if log_item:
+            log_item.stream(
+                progress=f"\nProcessed {cnt_docs} documents from {cnt_files} files."
+            )
+
+    return index
+
 
+def scan_knowledge(
+    log_item: LogItem | None,
+    knowledge_dir: str,
+    index: Dict[str, KnowledgeImport],
+    metadata: dict[str, Any] = {},
+    filename_pattern: str = "**/*",
+    recursive: bool = True,
+    progress: ImportProgress | None = None,
+) -> Dict[str, KnowledgeImport]:
+    """
+    Marks files of a directory as original, changed or removed against the index.
+    Files with the indexed size and mtime are not read, others are hashed and
+    changed ones keep their import metadata for load_documents.
+    """
     # Validate and create knowledge directory if needed
     if not knowledge_dir:
         if log_item:
@@ -125,11 +231,8 @@ def load_knowledge(
             if ext not in file_types_loaders:
                 continue  # Skip unsupported file types
 
-            checksum = calculate_checksum(file_path)
-            if not checksum:
-                continue  # Skip files with checksum errors
-
             file_key = file_path
+            stat = os.stat(file_path)
 
             # Load existing data from the index or create a new entry
             file_data: KnowledgeImport = index.get(file_key, {
@@ -139,52 +242,44 @@ def load_knowledge(
                 "state": "changed",
                 "documents": []
             })
+            if progress:
+                progress.add(files=1)
+
+            # Unchanged size and mtime, skip reading the file
+            if (
+                file_data.get("checksum")
+                and file_data.get("size") == stat.st_size
+                and file_data.get("mtime") == stat.st_mtime
+            ):
+                file_data["state"] = "original"
+                index[file_key] = file_data
+                continue
+
+            checksum = calculate_checksum(file_path)
+            if progress:
+                progress.add(hashed=1)
+            if not checksum:
+                continue  # Skip files with checksum errors
 
             # Check if file has changed
             if file_data.get("checksum") == checksum:
                 file_data["state"] = "original"
             else:
                 file_data["state"] = "changed"
-
-            # Process changed files
-            if file_data["state"] == "changed":
                 file_data["checksum"] = checksum
-                loader_cls = file_types_loaders[ext]
-
-                try:
-                    loader = loader_cls(
-                        file_path,
-                        **(
-                            text_loader_kwargs
-                            if ext in ["txt", "csv", "html", "md"]
-                            else {}
-                        ),
-                    )
-                    documents = loader.load_and_split()
-
-                    # Enhanced metadata for better consolidation compatibility
-                    enhanced_metadata = {
-                        **metadata,
-                        "source_file": os.path.basename(file_path),
-                        "source_path": file_path,
-                        "file_type": ext,
-                        "knowledge_source": True,  # Flag to distinguish from conversation memories
-                        "import_timestamp": None,  # Will be set when inserted into memory
-                    }
-
-                    # Apply metadata to all documents
-                    for doc in documents:
-                        doc.metadata = {**doc.metadata, **enhanced_metadata}
-
-                    file_data["documents"] = documents
-                    cnt_files += 1
-                    cnt_docs += len(documents)
-
-                except Exception as e:
-                    PrintStyle(font_color="red").print(f"Error loading {file_path}: {e}")
-                    if log_item:
-                        log_item.stream(progress=f"\nError loading {os.path.basename(file_path)}: {e}")
-                    continue
+                # Enhanced metadata for better consolidation compatibility
+                file_data["metadata"] = {
+                    **metadata,
+                    "source_file": os.path.basename(file_path),
+                    "source_path": file_path,
+                    "file_type": ext,
+                    "knowledge_source": True,  # Flag to distinguish from conversation memories
+                    "import_timestamp": None,  # Will be set when inserted into memory
+                }
+                if progress:
+                    progress.add(changed=1)
+            file_data["size"] = stat.st_size
+            file_data["mtime"] = stat.st_mtime
 
             # Update the index
             index[file_key] = file_data
@@ -199,12 +294,68 @@ def load_knowledge(
         if file_key not in current_files and not file_data.get("state"):
             index[file_key]["state"] = "removed"
 
-    # Log results
-    if cnt_files > 0 or cnt_docs > 0:
-        PrintStyle.standard(f"Processed {cnt_docs} documents from {cnt_files} files.")
-        if log_item:
-            log_item.stream(
-                progress=f"\nProcessed {cnt_docs} documents from {cnt_files} files."
+    return index
+
+
+async def load_documents(
+    index: Dict[str, KnowledgeImport],
+    log_item: LogItem | None = None,
+    progress: ImportProgress | None = None,
+    check: Callable[[], Awaitable] | None = None,
+) -> AsyncIterator[tuple[str, list[Any]]]:
+    """
+    Loads changed files of a scanned index in the parser processes and yields
+    (file, documents) as shards finish. Files that fail to load are marked removed
+    so the next import tries them again.
+    """
+    changed = [
+        (file, data.pop("metadata"))
+        for file, data in index.items()
+        if data.get("state") == "changed" and "metadata" in data
+    ]
+    shards = [
+        (_load_files, (changed[start : start + FILES_PER_SHARD],))
+        for start in range(0, len(changed), FILES_PER_SHARD)
+    ]
+    async for results in document_parser.run_many(shards, check):
+        for file, documents, error in results:
+            if error:
+                _report_error(log_item, file, error, progress)
+                index[file]["state"] = "removed"
+                continue
+            if progress:
+                progress.add(loaded=1, documents=len(documents))
+            yield file, documents
+
+
+def _report_error(
+    log_item: LogItem | None, file_path: str, error: str, progress: ImportProgress | None
+):
+    PrintStyle(font_color="red").print(f"Error loading {file_path}: {error}")
+    if log_item:
+        log_item.stream(progress=f"\nError loading {os.path.basename(file_path)}: {error}")
+    if progress:
+        progress.add(failed=1)
+
+
+def _load_files(
+    changed: list[tuple[str, dict[str, Any]]],
+) -> list[tuple[str, list[Any], str]]:
+    # runs in the parser processes, returns (file, documents, error) per file
+    results = []
+    for file_path, metadata in changed:
+        try:
+            ext = metadata.get("file_type") or file_path.rsplit(".", 1)[-1].lower()
+            loader = file_types_loaders[ext](
+                file_path,
+                **(text_loader_kwargs if ext in ["txt", "csv", "html", "md"] else {}),
             )
+            documents = loader.load_and_split()
 
-    return index
+            # Apply metadata to all documents
+            for doc in documents:
+                doc.metadata = {**doc.metadata, **metadata}
+            results.append((file_path, documents, ""))
+        except Exception as e:
+            results.append((file_path, [], str(e) or type(e).__name__))
+    return results
@@ -2,21 +2,33 @@
 
 import base64
 import io
+import re
 import warnings
 import asyncio
+import numpy as np
 import soundfile as sf
+from typing import Iterator
 from python.helpers import runtime
+from python.helpers.worker import Worker
 from python.helpers.print_style import PrintStyle
 from python.helpers.notification import NotificationManager, NotificationType, NotificationPriority
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 
+SAMPLE_RATE = 24000
+# syntheses running at once, one pipeline uses all cores through torch
+MAX_WORKERS = 1
+# syntheses running or waiting for the worker, more are refused
+MAX_QUEUED = 8
+
 _pipeline = None
 _voice = "am_puck,am_onyx"
 _speed = 1.1
 is_updating_model = False
 
+_worker = Worker("kokoro", MAX_WORKERS, MAX_QUEUED)
+
 
 async def preload():
     try:
@@ -46,8 +58,7 @@ async def _preload():
                 display_time=99,
                 group="kokoro-preload")
             PrintStyle.standard("Loading Kokoro TTS model...")
-            from kokoro import KPipeline
-            _pipeline = KPipeline(lang_code="a", repo_id="hexgrad/Kokoro-82M")
+            _pipeline = await _worker.run(_load_pipeline)
             NotificationManager.send_notification(
                 NotificationType.INFO,
                 NotificationPriority.NORMAL,
@@ -58,6 +69,11 @@ async def _preload():
         is_updating_model = False
 
 
+def _load_pipeline():
+    from kokoro import KPipeline
+    return KPipeline(lang_code="a", repo_id="hexgrad/Kokoro-82M")
+
+
 async def is_downloading():
     try:
         # return await runtime.call_development_function(_is_downloading)
@@ -103,27 +119,61 @@ async def _synthesize_sentences(sentences: list[str]):
     if not _pipeline:
         await _preload()
 
-    combined_audio = []
-
     try:
-        for sentence in sentences:
-            if sentence.strip():
-                segments = _pipeline(sentence.strip(), voice=_voice, speed=_speed) # type: ignore
-                segment_list = list(segments)
+        return await _worker.run(_synthesize_all, _pipeline, sentences)
+    except Exception as e:
+        PrintStyle.error(f"Error in Kokoro TTS synthesis: {e}")
+        raise
+
+
+async def open_stream(sentences: list[str]) -> Iterator[str]:
+    """Starts a synthesis whose sentences are read by a blocking iterator, as streamed responses do."""
+    if not _pipeline:
+        await _preload()
+    return _worker.open_stream(_synthesize_each, _pipeline, sentences)
 
-                for segment in segment_list:
-                    audio_tensor = segment.audio
-                    audio_numpy = audio_tensor.detach().cpu().numpy() # type: ignore
-                    combined_audio.extend(audio_numpy)
 
-        # Convert combined audio to bytes
-        buffer = io.BytesIO()
-        sf.write(buffer, combined_audio, 24000, format="WAV")
-        audio_bytes = buffer.getvalue()
+def split_sentences(sentences: list[str]) -> list[str]:
+    """Splits texts at sentence ends and line breaks, each part is synthesized separately."""
+    return [
+        part.strip()
+        for text in sentences
+        for part in re.split(r"(?<=[.!?])\s+|\n+", text)
+        if part.strip()
+    ]
 
-        # Return base64 encoded audio
-        return base64.b64encode(audio_bytes).decode("utf-8")
 
+def _synthesize_each(pipeline, sentences: list[str]) -> Iterator[str]:
+    # base64 WAV audio of each sentence as soon as it is synthesized
+    try:
+        for sentence in split_sentences(sentences):
+            yield _encode(_synthesize(pipeline, sentence))
     except Exception as e:
         PrintStyle.error(f"Error in Kokoro TTS synthesis: {e}")
-        raise    
\ No newline at end of file
+        raise
+
+
+def _synthesize_all(pipeline, sentences: list[str]) -> str:
+    audio = [_synthesize(pipeline, sentence) for sentence in split_sentences(sentences)]
+    return _encode(_concatenate(audio))
+
+
+def _synthesize(pipeline, sentence: str) -> np.ndarray:
+    segments = pipeline(sentence, voice=_voice, speed=_speed)
+    return _concatenate([segment.audio.detach().cpu().numpy() for segment in segments])
+
+
+def _concatenate(parts: list[np.ndarray]) -> np.ndarray:
+    # one preallocated buffer instead of growing a list sample by sample
+    audio = np.empty(sum(len(part) for part in parts), dtype=np.float32)
+    position = 0
+    for part in parts:
+        audio[position : position + len(part)] = part
+        position += len(part)
+    return audio
+
+
+def _encode(audio: np.ndarray) -> str:
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, SAMPLE_RATE, format="WAV")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
@@ -191,6 +191,7 @@ class Log:
         self.guid: str = str(uuid.uuid4())
         self.updates: list[int] = []
         self.logs: list[LogItem] = []
+        self.version = 0  # increases with every change of items or progress
         self.set_initial_progress()
 
     def log(
@@ -277,6 +278,7 @@ class Log:
 
         self.updates += [item.no]
         self._update_progress_from_item(item)
+        self._changed()
 
     def set_progress(self, progress: str, no: int = 0, active: bool = True):
         progress = self._mask_recursive(progress)
@@ -286,6 +288,7 @@ class Log:
             no = len(self.logs)
         self.progress_no = no
         self.progress_active = active
+        self._changed()
 
     def set_initial_progress(self):
         self.set_progress("Waiting for input", 0, False)
@@ -311,6 +314,11 @@ class Log:
         self.logs = []
         self.set_initial_progress()
 
+    def _changed(self):
+        self.version += 1
+        if self.context:
+            self.context.mark_changed()
+
     def _update_progress_from_item(self, item: LogItem):
         if item.heading and item.update_progress != "none":
             if item.no >= self.progress_no:
@@ -43,6 +43,19 @@ from python.helpers.print_style import PrintStyle
 from python.helpers.tool import Tool, Response
 
 
+# incremented whenever servers or their tools change, used to detect stale tool prompts
+_tools_revision: int = 0
+
+
+def get_tools_revision() -> int:
+    return _tools_revision
+
+
+def _bump_tools_revision():
+    global _tools_revision
+    _tools_revision += 1
+
+
 def normalize_name(name: str) -> str:
     # Lowercase and strip whitespace
     name = name.strip().lower()
@@ -467,6 +480,7 @@ class MCPConfig(BaseModel):
 
             # Option 1: Re-initialize the existing instance (if __init__ is idempotent for other fields)
             instance.__init__(servers_list=servers_data)
+            _bump_tools_revision()
 
             # Option 2: Or, if __init__ has side effects we don't want to repeat,
             # and 'servers' is the primary thing 'update' changes:
@@ -884,6 +898,7 @@ class MCPClientBase(ABC):
                     }
                     for tool in response.tools
                 ]
+            _bump_tools_revision()
             PrintStyle(font_color="green").print(
                 f"MCPClientBase ({self.server.name}): Tools updated. Found {len(self.tools)} tools."
             )
@@ -907,6 +922,7 @@ class MCPClientBase(ABC):
             with self.__lock:
                 self.tools = []  # Ensure tools are cleared on failure
                 self.error = f"Failed to initialize. {error_text[:200]}{'...' if len(error_text) > 200 else ''}"  # store error from tools fetch
+            _bump_tools_revision()
         return self
 
     def has_tool(self, tool_name: str) -> bool:
@@ -37,6 +37,9 @@ from simpleeval import simple_eval
 # Raise the log level so WARNING messages aren't shown
 logging.getLogger("langchain_core.vectorstores.base").setLevel(logging.ERROR)
 
+# knowledge documents embedded in one request and saved at once while preloading
+KNOWLEDGE_BATCH_SIZE = 256
+
 
 class MyFaiss(FAISS):
     # override aget_by_ids
@@ -248,10 +251,16 @@ class Memory:
         self.memory_subdir = memory_subdir
 
     async def preload_knowledge(
-        self, log_item: LogItem | None, kn_dirs: list[str], memory_subdir: str
+        self,
+        log_item: LogItem | None,
+        kn_dirs: list[str],
+        memory_subdir: str,
+        progress: knowledge_import.ImportProgress | None = None,
     ):
         if log_item:
             log_item.update(heading="Preloading knowledge...")
+        progress = progress or knowledge_import.ImportProgress()
+        knowledge_import.track_progress(memory_subdir, progress)
 
         # db abs path
         db_dir = abs_db_dir(memory_subdir)
@@ -269,68 +278,131 @@ class Memory:
                 index = json.load(f)
 
         # preload knowledge folders
-        index = self._preload_knowledge_folders(log_item, kn_dirs, index)
+        index = self._preload_knowledge_folders(log_item, kn_dirs, index, progress)
 
+        # remove original versions of changed and removed files in one step
+        remove_ids = []
         for file in index:
-            if index[file]["state"] in ["changed", "removed"] and index[file].get(
-                "ids", []
-            ):  # for knowledge files that have been changed or removed and have IDs
-                await self.delete_documents_by_ids(
-                    index[file]["ids"]
-                )  # remove original version
-            if index[file]["state"] == "changed":
-                index[file]["ids"] = await self.insert_documents(
-                    index[file]["documents"]
-                )  # insert new version
-
-        # remove index where state="removed"
-        index = {k: v for k, v in index.items() if v["state"] != "removed"}
-
-        # strip state and documents from index and save it
-        for file in index:
-            if "documents" in index[file]:
-                del index[file]["documents"]  # type: ignore
-            if "state" in index[file]:
-                del index[file]["state"]  # type: ignore
-        with open(index_path, "w") as f:
-            json.dump(index, f)
+            if index[file]["state"] in ["changed", "removed"]:
+                remove_ids += index[file].get("ids", [])
+                index[file]["ids"] = []
+        progress.add(
+            removed=sum(1 for data in index.values() if data["state"] == "removed")
+        )
+        if remove_ids:
+            await self.apply_changes(remove_ids, [])
+            self._save_knowledge_index(index_path, index)
+
+        # changed files are parsed in worker processes while loaded ones are embedded,
+        # inserted and saved with the index once per batch
+        batch: list[tuple[str, list[Document]]] = []
+        async for file, documents in knowledge_import.load_documents(
+            index, log_item, progress
+        ):
+            batch.append((file, documents))
+            if sum(len(docs) for _, docs in batch) >= KNOWLEDGE_BATCH_SIZE:
+                await self._insert_knowledge(log_item, index_path, index, batch, progress)
+                batch = []
+        await self._insert_knowledge(log_item, index_path, index, batch, progress)
+
+        if progress.loaded or progress.failed:
+            PrintStyle.standard(
+                f"Processed {progress.documents} documents from {progress.loaded} files."
+            )
+            if log_item:
+                log_item.stream(
+                    progress=f"\nProcessed {progress.documents} documents from {progress.loaded} files."
+                )
+        self._save_knowledge_index(index_path, index)
+        progress.finish()
+
+    async def _insert_knowledge(
+        self,
+        log_item: LogItem | None,
+        index_path: str,
+        index: dict[str, knowledge_import.KnowledgeImport],
+        batch: list[tuple[str, list[Document]]],
+        progress: knowledge_import.ImportProgress,
+    ):
+        docs = [doc for _, documents in batch for doc in documents]
+        self.prepare_documents(docs)
+        await self.apply_changes([], docs)  # one embedding request and one save
+        for file, documents in batch:
+            index[file]["ids"] = [doc.metadata["id"] for doc in documents]
+            index[file]["state"] = "original"
+        if batch:
+            self._save_knowledge_index(index_path, index)
+        if docs:
+            progress.add(inserted=len(docs))
+            if log_item:
+                log_item.stream(
+                    progress=f"\nInserted {progress.inserted} of {progress.documents} documents"
+                )
+
+    @staticmethod
+    def _save_knowledge_index(
+        index_path: str, index: dict[str, knowledge_import.KnowledgeImport]
+    ):
+        # changed files not inserted yet are saved without checksum, an interrupted
+        # import loads them again instead of keeping documents that were removed
+        saved = {}
+        for file, data in index.items():
+            state = data.get("state")
+            if state == "removed":
+                continue
+            if state == "changed":
+                saved[file] = {"file": file, "checksum": "", "ids": []}
+            else:
+                saved[file] = {
+                    key: data[key]  # type: ignore
+                    for key in ["file", "checksum", "ids", "mtime", "size"]
+                    if key in data
+                }
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, index_path)
 
     def _preload_knowledge_folders(
         self,
         log_item: LogItem | None,
         kn_dirs: list[str],
         index: dict[str, knowledge_import.KnowledgeImport],
+        progress: knowledge_import.ImportProgress | None = None,
     ):
-        # load knowledge folders, subfolders by area
+        # scan knowledge folders, subfolders by area
         for kn_dir in kn_dirs:
             # everything in the root of the knowledge goes to main
-            index = knowledge_import.load_knowledge(
+            index = knowledge_import.scan_knowledge(
                 log_item,
                 abs_knowledge_dir(kn_dir),
                 index,
                 {"area": Memory.Area.MAIN},
                 filename_pattern="*",
                 recursive=False,
+                progress=progress,
             )
             # subdirectories go to their folders
             for area in Memory.Area:
-                index = knowledge_import.load_knowledge(
+                index = knowledge_import.scan_knowledge(
                     log_item,
                     # files.get_abs_path("knowledge", kn_dir, area.value),
                     abs_knowledge_dir(kn_dir, area.value),
                     index,
                     {"area": area.value},
                     recursive=True,
+                    progress=progress,
                 )
 
         # load instruments descriptions
-        index = knowledge_import.load_knowledge(
+        index = knowledge_import.scan_knowledge(
             log_item,
             files.get_abs_path("instruments"),
             index,
             {"area": Memory.Area.INSTRUMENTS.value},
             filename_pattern="**/*.md",
             recursive=True,
+            progress=progress,
         )
 
         return index
@@ -404,20 +476,37 @@ class Memory:
         return ids[0]
 
     async def insert_documents(self, docs: list[Document]):
-        ids = [self._generate_doc_id() for _ in range(len(docs))]
-        timestamp = self.get_timestamp()
+        ids = self.prepare_documents(docs)
 
         if ids:
-            for doc, id in zip(docs, ids):
-                doc.metadata["id"] = id  # add ids to documents metadata
-                doc.metadata["timestamp"] = timestamp  # add timestamp
-                if not doc.metadata.get("area", ""):
-                    doc.metadata["area"] = Memory.Area.MAIN.value
-
             await self.db.aadd_documents(documents=docs, ids=ids)
             self._save_db()  # persist
         return ids
 
+    def prepare_documents(self, docs: list[Document]) -> list[str]:
+        """Assigns new ids, timestamp and default area to documents before insertion."""
+        ids = [self._generate_doc_id() for _ in range(len(docs))]
+        timestamp = self.get_timestamp()
+        for doc, id in zip(docs, ids):
+            doc.metadata["id"] = id  # add ids to documents metadata
+            doc.metadata["timestamp"] = timestamp  # add timestamp
+            if not doc.metadata.get("area", ""):
+                doc.metadata["area"] = Memory.Area.MAIN.value
+        return ids
+
+    async def apply_changes(self, remove_ids: list[str], docs: list[Document]):
+        """Removes and inserts prepared documents in one step with a single save."""
+        rem_docs = await self.db.aget_by_ids(remove_ids) if remove_ids else []
+        if rem_docs:
+            await self.db.adelete(ids=[doc.metadata["id"] for doc in rem_docs])
+        if docs:
+            await self.db.aadd_documents(
+                documents=docs, ids=[doc.metadata["id"] for doc in docs]
+            )
+        if rem_docs or docs:
+            self._save_db()  # persist
+        return rem_docs
+
     async def update_documents(self, docs: list[Document]):
         ids = [doc.metadata["id"] for doc in docs]
         await self.db.adelete(ids=ids)  # delete originals
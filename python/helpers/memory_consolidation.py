@@ -34,6 +34,7 @@ class ConsolidationConfig:
     max_llm_context_memories: int = 5
     keyword_extraction_sys_prompt: str = "memory.keyword_extraction.sys.md"
     keyword_extraction_msg_prompt: str = "memory.keyword_extraction.msg.md"
+    keyword_extraction_batch_msg_prompt: str = "memory.keyword_extraction_batch.msg.md"
     processing_timeout_seconds: int = 60
     # Add safety threshold for REPLACE actions
     replace_similarity_threshold: float = 0.9  # Higher threshold for replacement safety
@@ -109,20 +110,110 @@ class MemoryConsolidator:
             PrintStyle().error(f"Memory consolidation error for area {area}: {str(e)}")
             return {"success": False, "memory_ids": []}
 
+    async def process_new_memories(
+        self,
+        new_memories: List[str],
+        area: str,
+        metadata: Dict[str, Any],
+        log_item: Optional[LogItem] = None
+    ) -> List[dict]:
+        """
+        Process several new memories as one batch. Keywords are extracted with one utility
+        call, similarity searches run concurrently, memories sharing similar memories are
+        consolidated in order so each conflict is resolved once, and all changes are saved
+        in a single step.
+
+        Args:
+            new_memories: The new memory contents to process
+            area: Memory area (MAIN, FRAGMENTS, SOLUTIONS, INSTRUMENTS)
+            metadata: Initial metadata for each memory
+            log_item: Optional log item for progress tracking
+
+        Returns:
+            list: {"success": bool, "memory_ids": [str, ...]} for each new memory
+        """
+        results = [{"success": False, "memory_ids": []} for _ in new_memories]
+        if not new_memories:
+            return results
+
+        try:
+            db = await Memory.get(self.agent)
+            changes = MemoryChanges(db)
+
+            if log_item:
+                log_item.update(progress=f"Searching similar memories for {len(new_memories)} new memories...")
+
+            keywords = await self._extract_search_keywords_batch(new_memories, log_item)
+            similar = await asyncio.gather(*[
+                self._search_similar_memories(db, memory, area, queries)
+                for memory, queries in zip(new_memories, keywords)
+            ])
+
+            async def consolidate_group(indices: List[int]):
+                # memories of a group share similar memories, run in order on staged changes
+                for i in indices:
+                    staged = StagedMemory(changes)
+                    try:
+                        results[i] = await asyncio.wait_for(
+                            self._process_memory_with_consolidation(
+                                new_memories[i],
+                                area,
+                                dict(metadata),
+                                db=staged,
+                                similar_memories=staged.resolve(similar[i])[:self.config.max_llm_context_memories]
+                            ),
+                            timeout=self.config.processing_timeout_seconds
+                        )
+                        staged.commit()
+                    except asyncio.TimeoutError:
+                        PrintStyle().error(f"Memory consolidation timeout for area {area}")
+                    except Exception as e:
+                        PrintStyle().error(f"Memory consolidation error for area {area}: {str(e)}")
+
+            if log_item:
+                log_item.update(progress="Analyzing memory consolidation...")
+            await asyncio.gather(*[consolidate_group(group) for group in self._group_overlapping(similar)])
+
+            await changes.apply()
+            return results
+
+        except Exception as e:
+            PrintStyle().error(f"Memory batch consolidation error for area {area}: {str(e)}")
+            return [{"success": False, "memory_ids": []} for _ in new_memories]
+
+    def _group_overlapping(self, similar: List[List[Document]]) -> List[List[int]]:
+        """Group indices of new memories whose similar memories overlap, in original order."""
+        groups: List[tuple[set, List[int]]] = []
+        for i, docs in enumerate(similar):
+            ids = {doc.metadata.get('id') for doc in docs if doc.metadata.get('id')}
+            group_ids, indices = set(ids), [i]
+            for group in [group for group in groups if group[0] & ids]:
+                groups.remove(group)
+                group_ids |= group[0]
+                indices = group[1] + indices
+            groups.append((group_ids, sorted(indices)))
+        return [indices for _, indices in groups]
+
     async def _process_memory_with_consolidation(
         self,
         new_memory: str,
         area: str,
         metadata: Dict[str, Any],
-        log_item: Optional[LogItem] = None
+        log_item: Optional[LogItem] = None,
+        db: "Memory | StagedMemory | None" = None,
+        similar_memories: Optional[List[Document]] = None
     ) -> dict:
-        """Execute the full consolidation pipeline."""
+        """Execute the full consolidation pipeline, batches pass staged db and pre-searched memories."""
 
         if log_item:
             log_item.update(progress="Starting intelligent memory consolidation...")
 
+        if db is None:
+            db = await Memory.get(self.agent)
+
         # Step 1: Discover similar memories
-        similar_memories = await self._find_similar_memories(new_memory, area, log_item)
+        if similar_memories is None:
+            similar_memories = await self._find_similar_memories(new_memory, area, log_item)
 
         # this block always returns
         if not similar_memories:
@@ -133,7 +224,6 @@ class MemoryConsolidator:
                     temp=True
                 )
             try:
-                db = await Memory.get(self.agent)
                 if 'timestamp' not in metadata:
                     metadata['timestamp'] = self._get_timestamp()
                 memory_id = await db.insert_text(new_memory, metadata)
@@ -162,7 +252,6 @@ class MemoryConsolidator:
             memory_ids_to_check = [doc.metadata.get('id') for doc in similar_memories if doc.metadata.get('id')]
             # Filter out None values and ensure all IDs are strings
             memory_ids_to_check = [str(id) for id in memory_ids_to_check if id is not None]
-            db = await Memory.get(self.agent)
             still_existing = db.db.get_by_ids(memory_ids_to_check)
             existing_ids = {doc.metadata.get('id') for doc in still_existing}
 
@@ -188,7 +277,6 @@ class MemoryConsolidator:
                     temp=True
                 )
             try:
-                db = await Memory.get(self.agent)
                 if 'timestamp' not in metadata:
                     metadata['timestamp'] = self._get_timestamp()
                 memory_id = await db.insert_text(new_memory, metadata)
@@ -223,7 +311,6 @@ class MemoryConsolidator:
                     temp=True
                 )
             try:
-                db = await Memory.get(self.agent)
                 if 'timestamp' not in metadata:
                     metadata['timestamp'] = self._get_timestamp()
                 memory_id = await db.insert_text(new_memory, metadata)
@@ -246,7 +333,8 @@ class MemoryConsolidator:
             consolidation_result,
             area,
             analysis_context.existing_metadata,  # Pass original metadata
-            log_item
+            log_item,
+            db
         )
 
         if log_item:
@@ -339,29 +427,41 @@ class MemoryConsolidator:
         # Step 1: Extract keywords/queries for enhanced search
         search_queries = await self._extract_search_keywords(new_memory, log_item)
 
-        all_similar = []
+        return await self._search_similar_memories(db, new_memory, area, search_queries)
+
+    async def _search_similar_memories(
+        self,
+        db: Memory,
+        new_memory: str,
+        area: str,
+        search_queries: List[str]
+    ) -> List[Document]:
+        """Run the semantic and keyword searches concurrently and rank the unique results."""
 
         # Step 2: Semantic similarity search with scores
-        semantic_similar = await db.search_similarity_threshold(
-            query=new_memory,
-            limit=self.config.max_similar_memories,
-            threshold=self.config.similarity_threshold,
-            filter=f"area == '{area}'"
-        )
-        all_similar.extend(semantic_similar)
+        searches = [
+            db.search_similarity_threshold(
+                query=new_memory,
+                limit=self.config.max_similar_memories,
+                threshold=self.config.similarity_threshold,
+                filter=f"area == '{area}'"
+            )
+        ]
 
         # Step 3: Keyword-based searches
+        # Fix division by zero: ensure len(search_queries) > 0
+        queries_count = max(1, len(search_queries))  # Prevent division by zero
         for query in search_queries:
             if query.strip():
-                # Fix division by zero: ensure len(search_queries) > 0
-                queries_count = max(1, len(search_queries))  # Prevent division by zero
-                keyword_similar = await db.search_similarity_threshold(
+                searches.append(db.search_similarity_threshold(
                     query=query.strip(),
                     limit=max(3, self.config.max_similar_memories // queries_count),
                     threshold=self.config.similarity_threshold,
                     filter=f"area == '{area}'"
-                )
-                all_similar.extend(keyword_similar)
+                ))
+
+        # results keep the query order, so ranking matches the sequential searches
+        all_similar = [doc for docs in await asyncio.gather(*searches) for doc in docs]
 
         # Step 4: Deduplicate by document ID and store similarity info
         seen_ids = set()
@@ -448,14 +548,69 @@ class MemoryConsolidator:
 
         except Exception as e:
             PrintStyle().warning(f"Keyword extraction failed: {str(e)}")
-            # Fallback: use intelligent truncation for search
-            # Take first 200 chars if short, or first sentence if longer, but cap at 200 chars
-            if len(new_memory) <= 200:
-                fallback_content = new_memory
-            else:
-                first_sentence = new_memory.split('.')[0]
-                fallback_content = first_sentence[:200] if len(first_sentence) <= 200 else new_memory[:200]
-            return [fallback_content.strip()]
+            return self._fallback_keywords(new_memory)
+
+    async def _extract_search_keywords_batch(
+        self,
+        new_memories: List[str],
+        log_item: Optional[LogItem] = None
+    ) -> List[List[str]]:
+        """Extract search keywords for several memories with one utility LLM call."""
+
+        if len(new_memories) == 1:
+            return [await self._extract_search_keywords(new_memories[0], log_item)]
+
+        try:
+            system_prompt = self.agent.read_prompt(
+                self.config.keyword_extraction_sys_prompt,
+            )
+
+            memories_text = "\n\n".join(
+                f"### Memory {i + 1}\n{memory}" for i, memory in enumerate(new_memories)
+            )
+            message_prompt = self.agent.read_prompt(
+                self.config.keyword_extraction_batch_msg_prompt,
+                memories=memories_text,
+                memories_count=len(new_memories)
+            )
+
+            keywords_response = await self.agent.call_utility_model(
+                system=system_prompt,
+                message=message_prompt,
+                background=True
+            )
+
+            # Parse the response - expect JSON array with one array of strings per memory
+            keywords_json = DirtyJson.parse_string(keywords_response.strip())
+
+            if not isinstance(keywords_json, list) or len(keywords_json) != len(new_memories):
+                raise ValueError("Keyword lists do not match the memories")
+
+            result = []
+            for keywords in keywords_json:
+                if isinstance(keywords, list):
+                    result.append([str(k) for k in keywords if k])
+                elif isinstance(keywords, str):
+                    result.append([keywords])
+                else:
+                    result.append([])
+            return result
+
+        except Exception as e:
+            PrintStyle().warning(f"Batch keyword extraction failed, extracting one by one: {str(e)}")
+            return list(await asyncio.gather(
+                *[self._extract_search_keywords(memory, log_item) for memory in new_memories]
+            ))
+
+    def _fallback_keywords(self, new_memory: str) -> List[str]:
+        # Fallback: use intelligent truncation for search
+        # Take first 200 chars if short, or first sentence if longer, but cap at 200 chars
+        if len(new_memory) <= 200:
+            fallback_content = new_memory
+        else:
+            first_sentence = new_memory.split('.')[0]
+            fallback_content = first_sentence[:200] if len(first_sentence) <= 200 else new_memory[:200]
+        return [fallback_content.strip()]
 
     async def _analyze_memory_consolidation(
         self,
@@ -537,12 +692,14 @@ class MemoryConsolidator:
         result: ConsolidationResult,
         area: str,
         original_metadata: Dict[str, Any],  # Add original metadata parameter
-        log_item: Optional[LogItem] = None
+        log_item: Optional[LogItem] = None,
+        db: "Memory | StagedMemory | None" = None
     ) -> list:
         """Apply the consolidation decisions to the memory database."""
 
         try:
-            db = await Memory.get(self.agent)
+            if db is None:
+                db = await Memory.get(self.agent)
 
             # Retrieve metadata from memories being consolidated to preserve important fields
             consolidated_metadata = await self._gather_consolidated_metadata(db, result, original_metadata)
@@ -780,6 +937,96 @@ class MemoryConsolidator:
         return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
 
+class MemoryChanges:
+    """Memory changes staged by a consolidation batch and saved in one step."""
+
+    def __init__(self, memory: Memory):
+        self.memory = memory
+        self.removed: set = set()
+        self.added: Dict[str, Document] = {}
+        self.replaced: Dict[str, List[str]] = {}  # removed id -> ids inserted by the same consolidation
+
+    async def apply(self):
+        await self.memory.apply_changes(list(self.removed), list(self.added.values()))
+
+
+class StagedMemory:
+    """
+    Memory view for one consolidation of a batch. Offers the Memory methods used by
+    the consolidation handlers, but stages changes until committed to the batch.
+    """
+
+    def __init__(self, changes: MemoryChanges):
+        self.changes = changes
+        self.db = self  # handlers read documents through db.db like on Memory
+        self.removed: set = set()
+        self.added: Dict[str, Document] = {}
+
+    def get_by_ids(self, ids) -> List[Document]:
+        result = []
+        for id in (ids if isinstance(ids, list) else [ids]):
+            if id in self.removed or id in self.changes.removed:
+                continue
+            doc = self.added.get(id) or self.changes.added.get(id)
+            if doc is None:
+                found = self.changes.memory.db.get_by_ids([id])
+                doc = found[0] if found else None
+            if doc is not None:
+                result.append(doc)
+        return result
+
+    async def aget_by_ids(self, ids) -> List[Document]:
+        return self.get_by_ids(ids)
+
+    async def delete_documents_by_ids(self, ids: List[str]):
+        rem_docs = self.get_by_ids(list(ids))
+        for doc in rem_docs:
+            id = doc.metadata["id"]
+            if id in self.added:
+                del self.added[id]
+            else:
+                self.removed.add(id)
+        return rem_docs
+
+    async def insert_text(self, text, metadata: dict = {}):
+        doc = Document(text, metadata=metadata)
+        id = self.changes.memory.prepare_documents([doc])[0]
+        self.added[id] = doc
+        return id
+
+    def resolve(self, docs: List[Document]) -> List[Document]:
+        """Similar memories with the ones consolidated earlier in the batch swapped for their results."""
+        resolved: List[Document] = []
+        seen: set = set()
+        for doc in docs:
+            self._resolve(doc.metadata.get('id'), doc.metadata.get('_consolidation_similarity'), resolved, seen)
+        return resolved
+
+    def _resolve(self, id, similarity, resolved: List[Document], seen: set):
+        if not id or id in seen:
+            return
+        seen.add(id)
+        if id in self.changes.replaced:
+            for new_id in self.changes.replaced[id]:
+                self._resolve(new_id, similarity, resolved, seen)
+            return
+        found = self.get_by_ids([id])
+        if found:
+            if similarity is not None:
+                found[0].metadata.setdefault('_consolidation_similarity', similarity)
+            resolved.append(found[0])
+
+    def commit(self):
+        inserted = list(self.added)
+        for id in self.removed:
+            if id in self.changes.added:
+                del self.changes.added[id]  # inserted and removed within the batch
+            else:
+                self.changes.removed.add(id)
+            self.changes.replaced[id] = inserted
+        self.changes.added.update(self.added)
+
+
 # Factory function for easy instantiation
 def create_memory_consolidator(agent: Agent, **config_overrides) -> MemoryConsolidator:
     """
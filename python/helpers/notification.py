@@ -64,6 +64,7 @@ class NotificationManager:
         self.updates: list[int] = []
         self.notifications: list[NotificationItem] = []
         self.max_notifications = max_notifications
+        self.version = 0  # increases with every change, unlike len(updates)
 
     @staticmethod
     def send_notification(
@@ -107,6 +108,7 @@ class NotificationManager:
         # Add to notifications
         self.notifications.append(item)
         self.updates.append(item.no)
+        self.version += 1
 
         # Enforce limit
         self._enforce_limit()
@@ -150,15 +152,18 @@ class NotificationManager:
                 if hasattr(item, key):
                     setattr(item, key, value)
             self.updates.append(no)
+            self.version += 1
 
     def mark_all_read(self):
         for notification in self.notifications:
             notification.read = True
+        self.version += 1
 
     def clear_all(self):
         self.notifications = []
         self.updates = []
         self.guid = str(uuid.uuid4())
+        self.version += 1
 
     def get_notifications_by_type(self, type: NotificationType) -> list[NotificationItem]:
         return [n for n in self.notifications if n.type == type]
\ No newline at end of file
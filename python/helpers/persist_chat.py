@@ -1,17 +1,23 @@
 from collections import OrderedDict
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable
 import uuid
 from agent import Agent, AgentConfig, AgentContext, AgentContextType
-from python.helpers import files, history
+from python.helpers import defer, files, history
 import json
+import os
 from initialize import initialize_agent
+from langchain_core.messages import messages_from_dict, messages_to_dict
 
 from python.helpers.log import Log, LogItem
 
 CHATS_FOLDER = "tmp/chats"
 LOG_SIZE = 1000
 CHAT_FILE_NAME = "chat.json"
+# lightweight summary of a chat read at startup instead of the whole chat
+CHAT_INDEX_FILE_NAME = "index.json"
+# most recently used chats loaded in the background after startup
+PREFETCH_CHATS = 10
 
 
 def get_chat_folder_path(ctxid: str):
@@ -40,6 +46,7 @@ def save_tmp_chat(context: AgentContext):
     data = _serialize_context(context)
     js = _safe_json_serialize(data, ensure_ascii=False)
     files.write_file(path, js)
+    _write_chat_index(context.id, data)
 
 
 def save_tmp_chats():
@@ -48,33 +55,123 @@ def save_tmp_chats():
         # Skip BACKGROUND contexts as they should be ephemeral
         if context.type == AgentContextType.BACKGROUND:
             continue
+        # Chats not loaded since startup are saved already
+        if not context.is_loaded:
+            continue
         save_tmp_chat(context)
 
 
-def load_tmp_chats():
-    """Load all contexts from the chats folder"""
+def load_tmp_chats(prefetch: int = PREFETCH_CHATS):
+    """
+    Register all contexts from the chats folder using their index files. Logs and
+    agents of a chat are loaded on first access, recently used chats in the background.
+    """
     _convert_v080_chats()
     folders = files.list_files(CHATS_FOLDER, "*")
-    json_files = []
-    for folder_name in folders:
-        json_files.append(_get_chat_file_path(folder_name))
+    config = initialize_agent()
 
-    ctxids = []
-    for file in json_files:
+    contexts: list[AgentContext] = []
+    for folder_name in folders:
         try:
-            js = files.read_file(file)
-            data = json.loads(js)
-            ctx = _deserialize_context(data)
-            ctxids.append(ctx.id)
+            index = _read_chat_index(folder_name)
+            contexts.append(_create_unloaded_context(index, config))
         except Exception as e:
-            print(f"Error loading chat {file}: {e}")
-    return ctxids
+            print(f"Error loading chat {folder_name}: {e}")
+
+    recent = sorted(contexts, key=lambda ctx: ctx.last_message, reverse=True)[:prefetch]
+    if recent:
+        defer.DeferredTask("ChatPrefetch").start_task(_prefetch_chats, recent)
+    return [ctx.id for ctx in contexts]
+
+
+async def _prefetch_chats(contexts: list[AgentContext]):
+    for context in contexts:
+        context.load()
 
 
 def _get_chat_file_path(ctxid: str):
     return files.get_abs_path(CHATS_FOLDER, ctxid, CHAT_FILE_NAME)
 
 
+def _get_chat_index_path(ctxid: str):
+    return files.get_abs_path(CHATS_FOLDER, ctxid, CHAT_INDEX_FILE_NAME)
+
+
+def _write_chat_index(ctxid: str, data: dict[str, Any]):
+    index = {
+        "id": data["id"],
+        "name": data["name"],
+        "created_at": data["created_at"],
+        "type": data["type"],
+        "last_message": data["last_message"],
+        "agents": len(data["agents"]),
+        "log_guid": data["log"]["guid"],
+        "log_length": len(data["log"]["logs"]),
+        "data": data["data"],
+        "output_data": data["output_data"],
+    }
+    js = _safe_json_serialize(index, ensure_ascii=False)
+    files.write_file(_get_chat_index_path(ctxid), js)
+    return json.loads(js)
+
+
+def _read_chat_index(ctxid: str) -> dict[str, Any]:
+    chat_path = _get_chat_file_path(ctxid)
+    index_path = _get_chat_index_path(ctxid)
+    # chats saved by older versions or restored from a backup get a new index
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(
+        chat_path
+    ):
+        return json.loads(files.read_file(index_path))
+    data = json.loads(files.read_file(chat_path))
+    return _write_chat_index(ctxid, data)
+
+
+def _create_unloaded_context(index: dict[str, Any], config: AgentConfig):
+    context_id = index["id"]
+    return AgentContext(
+        config=config,
+        id=context_id,
+        name=index.get("name", None),
+        created_at=datetime.fromisoformat(
+            index.get("created_at", datetime.fromtimestamp(0).isoformat())
+        ),
+        type=AgentContextType(index.get("type", AgentContextType.USER.value)),
+        last_message=datetime.fromisoformat(
+            index.get("last_message", datetime.fromtimestamp(0).isoformat())
+        ),
+        paused=False,
+        data=index.get("data", {}),
+        output_data=index.get("output_data", {}),
+        loader=load_tmp_chat,
+        # deserialized logs have one update per item
+        log_output={
+            "log_guid": index.get("log_guid", ""),
+            "log_version": index.get("log_length", 0),
+            "log_length": index.get("log_length", 0),
+        },
+    )
+
+
+def load_tmp_chat(context: AgentContext):
+    """Load the log and agents of a context registered from its index"""
+    # name, data and output data of the context may have changed since it was saved
+    data = json.loads(files.read_file(_get_chat_file_path(context.id)))
+    context.log = _deserialize_log(data.get("log", None))
+    _restore_agents(context, data)
+
+
+def unload_tmp_chat(
+    context: AgentContext,
+    loader: Callable[[AgentContext], None] = load_tmp_chat,
+    min_idle: float = 0,
+):
+    """Save an idle context and release its log and agents until next access"""
+    if context.type == AgentContextType.BACKGROUND:
+        return None  # not saved, would be lost
+    return context.unload(loader, save=save_tmp_chat, min_idle=min_idle)
+
+
 def _convert_v080_chats():
     json_files = files.list_files(CHATS_FOLDER, "*.json")
     for file in json_files:
@@ -156,10 +253,14 @@ def _serialize_agent(agent: Agent):
 
     history = agent.history.serialize()
 
+    # the last prompt is kept unformatted, the context window is formatted when requested
+    ctx_window_prompt = agent.get_data(Agent.DATA_NAME_CTX_WINDOW_PROMPT)
+
     return {
         "number": agent.number,
         "data": data,
         "history": history,
+        "ctx_window_prompt": messages_to_dict(ctx_window_prompt) if ctx_window_prompt else [],
     }
 
 
@@ -202,8 +303,13 @@ def _deserialize_context(data):
         # streaming_agent=straming_agent,
     )
 
+    _restore_agents(context, data)
+    return context
+
+
+def _restore_agents(context: AgentContext, data: dict[str, Any]):
     agents = data.get("agents", [])
-    Delta = _deserialize_agents(agents, config, context)
+    Delta = _deserialize_agents(agents, context.config, context)
     streaming_agent = Delta
     while streaming_agent and streaming_agent.number != data.get("streaming_agent", 0):
         streaming_agent = streaming_agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
@@ -211,8 +317,6 @@ def _deserialize_context(data):
     context.Delta = Delta
     context.streaming_agent = streaming_agent
 
-    return context
-
 
 def _deserialize_agents(
     agents: list[dict[str, Any]], config: AgentConfig, context: AgentContext
@@ -230,6 +334,10 @@ def _deserialize_agents(
         current.history = history.deserialize_history(
             ag.get("history", ""), agent=current
         )
+        if ag.get("ctx_window_prompt"):
+            current.set_data(
+                Agent.DATA_NAME_CTX_WINDOW_PROMPT, messages_from_dict(ag["ctx_window_prompt"])
+            )
         if not zero:
             zero = current
 
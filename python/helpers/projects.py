@@ -290,6 +290,22 @@ def build_system_prompt_vars(name: str):
     }
 
 
+def get_project_revision(name: str):
+    # cheap marker that changes when the header or instruction files change
+    header_file = get_project_meta_folder(name, PROJECT_HEADER_FILE)
+    instructions_folder = get_project_meta_folder(name, PROJECT_INSTRUCTIONS_DIR)
+    revision = [
+        files.get_file_signature(header_file),
+        files.get_file_signature(instructions_folder),
+    ]
+    if os.path.isdir(instructions_folder):
+        for file_name in sorted(os.listdir(instructions_folder)):
+            revision.append(
+                files.get_file_signature(os.path.join(instructions_folder, file_name))
+            )
+    return tuple(revision)
+
+
 def get_additional_instructions_files(name: str):
     instructions_folder = files.get_abs_path(
         get_project_folder(name), PROJECT_META_DIR, PROJECT_INSTRUCTIONS_DIR
@@ -1,57 +1,265 @@
 import asyncio
+import heapq
+import itertools
+import threading
 import time
+from collections import deque
 from typing import Callable, Awaitable
 
 
+class _Window:
+    # sliding window of (timestamp, value) entries with a running total
+    def __init__(self):
+        self.entries: deque[tuple[float, float]] = deque()
+        self.total: float = 0
+
+    def add(self, now: float, value: float):
+        self.entries.append((now, value))
+        self.total += value
+
+    def prune(self, cutoff: float):
+        while self.entries and self.entries[0][0] <= cutoff:
+            self.total -= self.entries.popleft()[1]
+        if not self.entries:
+            self.total = 0  # no float drift once empty
+
+    def free_at(self, amount: float, limit: float, timeframe: float) -> float:
+        # time when enough entries expire for amount to fit under limit
+        excess = self.total + amount - limit
+        if amount > limit:
+            excess = self.total  # oversized requests are admitted into an empty window
+        freed = 0.0
+        for timestamp, value in self.entries:
+            freed += value
+            if freed >= excess:
+                return timestamp + timeframe
+        return self.entries[-1][0] + timeframe if self.entries else 0.0
+
+
+class _Waiter:
+    def __init__(self, amounts: dict[str, int], loop: asyncio.AbstractEventLoop | None):
+        self.amounts = amounts
+        self.loop = loop
+        self.event = asyncio.Event() if loop else None
+        self.thread_event = None if loop else threading.Event()
+
+    def wake(self):
+        if self.loop:
+            try:
+                if self.loop is _running_loop():
+                    self.event.set()  # type: ignore
+                else:
+                    self.loop.call_soon_threadsafe(self.event.set)  # type: ignore
+            except RuntimeError:
+                pass  # loop already closed
+        else:
+            self.thread_event.set()  # type: ignore
+
+    def clear(self):
+        if self.event:
+            self.event.clear()
+        else:
+            self.thread_event.clear()  # type: ignore
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
 class RateLimiter:
-    def __init__(self, seconds: int = 60, **limits: int):
+    """
+    Sliding window limiter. Usage is kept in per-key ring buffers with running totals,
+    waiters queue by (priority, arrival) and are woken exactly when capacity frees up.
+    """
+
+    def __init__(
+        self,
+        seconds: int = 60,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] | None = None,
+        **limits: int,
+    ):
         self.timeframe = seconds
         self.limits = {key: value if isinstance(value, (int, float)) else 0 for key, value in (limits or {}).items()}
-        self.values = {key: [] for key in self.limits.keys()}
-        self._lock = asyncio.Lock()
+        self.values: dict[str, _Window] = {key: _Window() for key in self.limits.keys()}
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._waiters: list[tuple[int, int, _Waiter]] = []
+        self._counter = itertools.count()
 
     def add(self, **kwargs: int):
-        now = time.time()
-        for key, value in kwargs.items():
-            if not key in self.values:
-                self.values[key] = []
-            self.values[key].append((now, value))
-
-    async def cleanup(self):
-        async with self._lock:
-            now = time.time()
-            cutoff = now - self.timeframe
-            for key in self.values:
-                self.values[key] = [(t, v) for t, v in self.values[key] if t > cutoff]
+        now = self._clock()
+        with self._lock:
+            for key, value in kwargs.items():
+                self._window(key).add(now, value)
+
+    def set_limits(self, **limits: int):
+        with self._lock:
+            changed = False
+            for key, value in limits.items():
+                value = value or 0
+                changed = changed or self.limits.get(key) != value
+                self.limits[key] = value
+            if changed:
+                self._wake_head()  # capacity may have grown
 
     async def get_total(self, key: str) -> int:
-        async with self._lock:
-            if not key in self.values:
-                return 0
-            return sum(value for _, value in self.values[key])
+        with self._lock:
+            return self._get_total(key, self._clock())
 
     async def wait(
         self,
         callback: Callable[[str, str, int, int], Awaitable[bool]] | None = None,
     ):
-        while True:
-            await self.cleanup()
-            should_wait = False
-
-            for key, limit in self.limits.items():
-                if limit <= 0:  # Skip if no limit set
-                    continue
-
-                total = await self.get_total(key)
-                if total > limit:
-                    if callback:
-                        msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting..."
-                        should_wait = not await callback(msg, key, total, limit)
-                    else:
-                        should_wait = True
+        # wait until current usage is within limits, without reserving anything
+        await self.acquire(callback)
+
+    async def acquire(
+        self,
+        callback: Callable[[str, str, int, int], Awaitable[bool]] | None = None,
+        priority: int = 0,
+        **amounts: int,
+    ):
+        """Wait for capacity in queue order, then record amounts. Lower priority values go first."""
+        waiter = _Waiter(amounts, asyncio.get_running_loop())
+        self._enqueue(waiter, priority)
+        try:
+            while True:
+                with self._lock:
+                    delay, exceeded = self._try_admit(waiter)
+                if delay == 0:
+                    return
+                if callback and exceeded:
+                    key, total, limit = exceeded
+                    msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting..."
+                    if await callback(msg, key, total, limit):
+                        with self._lock:
+                            self._admit(waiter)
+                        return
+                    if delay is None or delay > 1:
+                        delay = 1  # keep the callback informed about progress
+                await self._pause(waiter, delay)
+        except BaseException:
+            self._dequeue(waiter)
+            raise
+
+    def acquire_sync(self, priority: int = 0, **amounts: int):
+        """
+        Blocking variant of acquire for synchronous callers on threads without a running
+        event loop, blocking a loop would keep its own async waiters from being admitted.
+        """
+        if _running_loop():
+            raise RuntimeError("acquire_sync called from a running event loop, use acquire")
+        waiter = _Waiter(amounts, None)
+        self._enqueue(waiter, priority)
+        try:
+            while True:
+                with self._lock:
+                    delay, _ = self._try_admit(waiter)
+                if delay == 0:
+                    return
+                waiter.thread_event.wait(delay)  # type: ignore
+                waiter.clear()
+        except BaseException:
+            self._dequeue(waiter)
+            raise
+
+    async def _pause(self, waiter: _Waiter, delay: float | None):
+        notified = asyncio.ensure_future(waiter.event.wait())  # type: ignore
+        tasks: set[asyncio.Future] = {notified}
+        if delay is not None:
+            if self._sleep:
+                tasks.add(asyncio.ensure_future(self._sleep(delay)))
+            else:
+                tasks.add(asyncio.ensure_future(asyncio.sleep(delay)))
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            waiter.clear()
+
+    def _window(self, key: str) -> _Window:
+        window = self.values.get(key)
+        if window is None:
+            window = self.values[key] = _Window()
+        return window
+
+    def _get_total(self, key: str, now: float) -> int:
+        window = self.values.get(key)
+        if not window:
+            return 0
+        window.prune(now - self.timeframe)
+        return int(window.total)
+
+    def _enqueue(self, waiter: _Waiter, priority: int):
+        with self._lock:
+            heapq.heappush(self._waiters, (priority, next(self._counter), waiter))
+
+    def _dequeue(self, waiter: _Waiter):
+        with self._lock:
+            for i, (_, _, queued) in enumerate(self._waiters):
+                if queued is waiter:
+                    self._waiters.pop(i)
+                    heapq.heapify(self._waiters)
+                    self._wake_head()
                     break
 
-            if not should_wait:
-                break
+    def _admit(self, waiter: _Waiter):
+        # caller holds the lock
+        if self._waiters and self._waiters[0][2] is waiter:
+            heapq.heappop(self._waiters)
+        else:
+            self._waiters = [item for item in self._waiters if item[2] is not waiter]
+            heapq.heapify(self._waiters)
+        now = self._clock()
+        for key, value in waiter.amounts.items():
+            self._window(key).add(now, value)
+        self._wake_head()
+
+    def _wake_head(self):
+        # caller holds the lock
+        if self._waiters:
+            self._waiters[0][2].wake()
+
+    def _try_admit(self, waiter: _Waiter) -> tuple[float | None, tuple[str, int, int] | None]:
+        """
+        Caller holds the lock. Returns (0, None) when admitted, otherwise the delay until
+        capacity frees (None when waiting behind another waiter) and the exceeded limit.
+        """
+        now = self._clock()
+        delay = 0.0
+        exceeded = None
+        for key, limit in self.limits.items():
+            if limit <= 0:  # Skip if no limit set
+                continue
+            window = self._window(key)
+            window.prune(now - self.timeframe)
+            amount = waiter.amounts.get(key, 0)
+            if window.total + amount <= limit or (amount > limit and not window.entries):
+                continue
+            if exceeded is None:
+                exceeded = (key, int(window.total + amount), limit)
+            delay = max(delay, window.free_at(amount, limit, self.timeframe) - now)
+
+        if self._waiters[0][2] is not waiter:
+            # fairness: nobody overtakes earlier waiters, the head wakes us when admitted
+            return None, exceeded or self._head_exceeded(now)
+        if exceeded is None:
+            self._admit(waiter)
+            return 0, None
+        return max(delay, 1e-6), exceeded
 
-            await asyncio.sleep(1)
+    def _head_exceeded(self, now: float) -> tuple[str, int, int] | None:
+        head = self._waiters[0][2]
+        for key, limit in self.limits.items():
+            if limit <= 0:
+                continue
+            total = self._get_total(key, now) + head.amounts.get(key, 0)
+            if total > limit:
+                return key, total, limit
+        return None
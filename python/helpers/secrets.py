@@ -4,7 +4,7 @@ import time
 import os
 from io import StringIO
 from dataclasses import dataclass
-from typing import Dict, Optional, List, Literal, Set, Callable, Tuple, TYPE_CHECKING
+from typing import Any, Dict, Optional, List, Literal, Set, Callable, Tuple, TYPE_CHECKING
 from dotenv.parser import parse_stream
 from python.helpers.errors import RepairableException
 from python.helpers import files
@@ -40,8 +40,8 @@ class StreamingSecretsFilter:
 
     - Replaces full secret values with placeholders §§secret(KEY) when detected.
     - Holds the longest suffix of the current buffer that matches any secret prefix
-      (with minimum trigger length of 3) to avoid leaking partial secrets across chunks.
-    - On finalize(), any unresolved partial is masked with '***'.
+      to avoid leaking partial secrets across chunks, however the chunks are split.
+    - On finalize(), any unresolved partial of at least min_trigger (3) chars is masked with '***'.
     """
 
     def __init__(self, key_to_value: Dict[str, str], min_trigger: int = 3):
@@ -55,7 +55,7 @@ class StreamingSecretsFilter:
         # Precompute all prefixes for quick suffix matching
         self.prefixes: Set[str] = set()
         for v in self.secret_values:
-            for i in range(self.min_trigger, len(v) + 1):
+            for i in range(1, len(v) + 1):
                 self.prefixes.add(v[:i])
         self.max_len: int = max((len(v) for v in self.secret_values), default=0)
 
@@ -75,9 +75,9 @@ class StreamingSecretsFilter:
 
     def _longest_suffix_prefix(self, text: str) -> int:
         """Return length of longest suffix of text that is a known secret prefix.
-        Returns 0 if none found (or only shorter than min_trigger)."""
+        Returns 0 if none found."""
         max_check = min(len(text), self.max_len)
-        for length in range(max_check, self.min_trigger - 1, -1):
+        for length in range(max_check, 0, -1):
             suffix = text[-length:]
             if suffix in self.prefixes:
                 return length
@@ -112,7 +112,7 @@ class StreamingSecretsFilter:
             return ""
 
         hold_len = self._longest_suffix_prefix(self.pending)
-        if hold_len > 0:
+        if hold_len >= self.min_trigger:
             safe = self.pending[:-hold_len]
             # Mask unresolved partial
             result = safe + "***"
@@ -127,6 +127,7 @@ class SecretsManager:
     MASK_VALUE = "***"
 
     _instances: Dict[Tuple[str, ...], "SecretsManager"] = {}
+    _revision: int = 0
     _secrets_cache: Optional[Dict[str, str]] = None
     _last_raw_text: Optional[str] = None
 
@@ -254,6 +255,13 @@ class SecretsManager:
             key_formatter=alias_for_key,
         )
 
+    def get_revision(self) -> Tuple[Any, ...]:
+        """Cheap marker that changes when secrets are saved or their files are edited"""
+        return (
+            SecretsManager._revision,
+            tuple(files.get_file_signature(files.get_abs_path(path)) for path in self._files),
+        )
+
     def create_streaming_filter(self) -> "StreamingSecretsFilter":
         """Create a streaming-aware secrets filter snapshotting current secret values."""
         return StreamingSecretsFilter(self.load_secrets())
@@ -354,6 +362,7 @@ class SecretsManager:
 
     @classmethod
     def _invalidate_all_caches(cls):
+        SecretsManager._revision += 1
         for instance in cls._instances.values():
             instance.clear_cache()
 
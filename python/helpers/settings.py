@@ -163,6 +163,7 @@ API_KEY_PLACEHOLDER = "************"
 
 SETTINGS_FILE = files.get_abs_path("tmp/settings.json")
 _settings: Settings | None = None
+_settings_revision: int = 0
 
 
 def convert_out(settings: Settings) -> SettingsOutput:
@@ -1343,10 +1344,16 @@ def get_settings() -> Settings:
     return norm
 
 
+def get_settings_revision() -> int:
+    # incremented on every settings change, lets caches detect stale values cheaply
+    return _settings_revision
+
+
 def set_settings(settings: Settings, apply: bool = True):
-    global _settings
+    global _settings, _settings_revision
     previous = _settings
     _settings = normalize_settings(settings)
+    _settings_revision += 1
     _write_settings_file(_settings)
     if apply:
         _apply_settings(previous)
@@ -1545,6 +1552,8 @@ def _apply_settings(previous: Settings | None):
         config = initialize_agent()
         for ctx in AgentContext._contexts.values():
             ctx.config = config  # reinitialize context config with new settings
+            if not ctx.is_loaded:
+                continue  # agents get the context config when loaded
             # apply config to agents
             agent = ctx.Delta
             while agent:
@@ -5,12 +5,12 @@ import time
 import sys
 from typing import Optional, Tuple
 from python.helpers import tty_session, runtime
-from python.helpers.shell_ssh import clean_string
+from python.helpers.shell_ssh import OutputBuffer, TextTail, clean_string
 
 class LocalInteractiveSession:
     def __init__(self, cwd: str|None = None):
         self.session: tty_session.TTYSession|None = None
-        self.full_output = ''
+        self.output = OutputBuffer()
         self.cwd = cwd
 
     async def connect(self):
@@ -19,30 +19,45 @@ class LocalInteractiveSession:
         await self.session.read_full_until_idle(idle_timeout=1, total_timeout=1)
 
     async def close(self):
+        self.output.close()
         if self.session:
             self.session.kill()
             # self.session.wait()
 
+    def is_alive(self) -> bool:
+        return self.session is not None and self.session.is_alive()
+
     async def send_command(self, command: str):
         if not self.session:
             raise Exception("Shell not connected")
-        self.full_output = ""
+        self.output.reset()
         await self.session.sendline(command)
  
+    async def interrupt(self):
+        """Sends Ctrl+C to the foreground process."""
+        if not self.session:
+            raise Exception("Shell not connected")
+        await self.session.send("\x03")
+
+    async def wait_for_output(self, timeout: float | None = None) -> bool:
+        """Returns as soon as new output is available, False if none arrived within timeout."""
+        if not self.session:
+            raise Exception("Shell not connected")
+        return await self.session.wait_for_output(timeout)
+
     async def read_output(self, timeout: float = 0, reset_full_output: bool = False) -> Tuple[str, Optional[str]]:
         if not self.session:
             raise Exception("Shell not connected")
 
         if reset_full_output:
-            self.full_output = ""
-
-        # get output from terminal
-        partial_output = await self.session.read_full_until_idle(idle_timeout=0.01, total_timeout=timeout)
-        self.full_output += partial_output
+            self.output.reset()
 
-        # clean output
-        partial_output = clean_string(partial_output)
-        clean_full_output = clean_string(self.full_output)
+        # get output from terminal, only the new part is cleaned and only its tail is kept
+        partial = TextTail(self.output.tail_chars)
+        async for chunk in self.session.read_chunks_until_idle(idle_timeout=0.01, total_timeout=timeout):
+            partial.add(self.output.feed(chunk))
+        partial_output = clean_string(str(partial))
+        clean_full_output = self.output.render()
 
         if not partial_output:
             return clean_full_output, None
@@ -0,0 +1,150 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from python.helpers.print_style import PrintStyle
+
+# warm shells kept ready per pool
+POOL_SIZE = 1
+
+
+class ShellPool:
+    """
+    Small pool of pre-connected interactive shells. Shells are bound to the event loop
+    they were created on, so a pool only serves callers running on that loop.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = POOL_SIZE):
+        self.factory = factory  # returns a new, not yet connected session
+        self.size = size
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._ready: list[Any] = []
+        self._warming = 0
+        self._generation = 0  # increases when the pool moves to another loop
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    async def acquire(self, setup: Callable[[Any], None] | None = None) -> Any:
+        """
+        Returns a connected shell, warm if possible, and starts replenishing in the background.
+        setup prepares the shell for the caller, before connecting if no warm shell is ready.
+        """
+        self._bind_loop()
+        shell = None
+        while self._ready:
+            candidate = self._ready.pop(0)
+            if _is_alive(candidate):
+                shell = candidate
+                break
+            self.recycle(candidate)
+        if shell is None:
+            shell = self.factory()
+            if setup:
+                setup(shell)
+            await shell.connect()
+        elif setup:
+            setup(shell)
+        self.replenish()
+        return shell
+
+    def replenish(self):
+        if self._closed or not self.loop:
+            return
+        for _ in range(self.size - len(self._ready) - self._warming):
+            self._warming += 1
+            self._spawn(self._warm(self._generation))
+
+    def recycle(self, shell: Any):
+        """Closes a used or dead shell in the background."""
+        if self.loop and self.loop.is_running() and _get_running_loop() is not self.loop:
+            self.loop.call_soon_threadsafe(lambda: self._spawn(_close(shell)))
+        elif _get_running_loop():
+            self._spawn(_close(shell))
+
+    def close(self):
+        self._closed = True
+        ready, self._ready = self._ready, []
+        for shell in ready:
+            self.recycle(shell)
+
+    async def _warm(self, generation: int):
+        # warming started on a previous loop neither counts nor adds its shell to this one
+        shell = None
+        try:
+            shell = self.factory()
+            await shell.connect()
+            if self._closed or generation != self._generation:
+                await _close(shell)
+            else:
+                self._ready.append(shell)
+        except Exception as e:
+            PrintStyle.error(f"Failed to pre-warm shell: {e}")
+            if shell:
+                await _close(shell)
+        finally:
+            if generation == self._generation:
+                self._warming -= 1
+
+    def _spawn(self, coro: Awaitable[Any]):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # shells from another loop cannot be used here
+            stale, self._ready = self._ready, []
+            for shell in stale:
+                self.recycle(shell)
+            self._generation += 1
+            self._warming = 0
+            self.loop = loop
+
+
+_pools: dict[Hashable, ShellPool] = {}
+_recycling: set[asyncio.Future] = set()
+
+
+def get_pool(key: Hashable, factory: Callable[[], Any], size: int = POOL_SIZE) -> ShellPool:
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = ShellPool(factory, size)
+    else:
+        pool.factory = factory  # keep credentials and settings current
+    return pool
+
+
+def recycle(shell: Any):
+    """Closes a shell in the background without keeping the caller waiting."""
+    if _get_running_loop():
+        task = asyncio.ensure_future(_close(shell))
+        _recycling.add(task)
+        task.add_done_callback(_recycling.discard)
+
+
+def close_pools(owner: str):
+    """Closes pools whose key starts with owner, e.g. a context id."""
+    for key in [key for key in _pools if isinstance(key, tuple) and key and key[0] == owner]:
+        _pools.pop(key).close()
+
+
+def _is_alive(shell: Any) -> bool:
+    check = getattr(shell, "is_alive", None)
+    try:
+        return bool(check()) if check else True
+    except Exception:
+        return False
+
+
+async def _close(shell: Any):
+    try:
+        await shell.close()
+    except Exception:
+        pass
+
+
+def _get_running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
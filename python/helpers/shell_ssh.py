@@ -1,4 +1,8 @@
 import asyncio
+import codecs
+from collections import deque
+import itertools
+import os
 import paramiko
 import time
 import re
@@ -24,7 +28,7 @@ class SSHInteractiveSession:
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.shell = None
-        self.full_output = b""
+        self.output = OutputBuffer()
         self.last_command = b""
         self.trimmed_command_length = 0  # Initialize trimmed_command_length
         self.cwd = cwd
@@ -43,7 +47,9 @@ class SSHInteractiveSession:
         while True:
             try:
                 # --- establish TCP/SSH session ---------------------------------
-                self.client.connect(
+                # blocking handshake runs in a thread so pre-warming does not stall the loop
+                await asyncio.to_thread(
+                    self.client.connect,
                     self.hostname,
                     self.port,
                     self.username,
@@ -60,7 +66,9 @@ class SSHInteractiveSession:
                 # ----------------------------------------------------------------
 
                 # invoke interactive shell
-                self.shell = self.client.invoke_shell(width=100, height=50)
+                self.shell = await asyncio.to_thread(
+                    self.client.invoke_shell, width=100, height=50
+                )
 
                 # disable systemd/OSC prompt metadata and disable local echo
                 initial_command = "unset PROMPT_COMMAND PS0; stty -echo"
@@ -73,7 +81,7 @@ class SSHInteractiveSession:
                     full, part = await self.read_output()
                     if full and not part:
                         return
-                    time.sleep(0.1)
+                    await asyncio.sleep(0.1)
 
             except Exception as e:
                 errors += 1
@@ -84,20 +92,30 @@ class SSHInteractiveSession:
                         content=f"SSH Connection attempt {errors}...",
                         temp=True,
                     )
-                    time.sleep(5)
+                    await asyncio.sleep(5)
                 else:
                     raise e
 
     async def close(self):
+        self.output.close()
         if self.shell:
             self.shell.close()
         if self.client:
             self.client.close()
 
+    def is_alive(self) -> bool:
+        transport = self.client.get_transport() if self.client else None
+        return bool(
+            self.shell
+            and not self.shell.closed
+            and transport
+            and transport.is_active()
+        )
+
     async def send_command(self, command: str):
         if not self.shell:
             raise Exception("Shell not connected")
-        self.full_output = b""
+        self.output.reset()
         # if len(command) > 10: # if command is long, add end_comment to split output
         #     command = (command + " \\\n" +SSHInteractiveSession.end_comment + "\n")
         # else:
@@ -106,6 +124,45 @@ class SSHInteractiveSession:
         self.trimmed_command_length = 0
         self.shell.send(self.last_command)
         
+    async def interrupt(self):
+        """Sends Ctrl+C to the foreground process."""
+        if not self.shell:
+            raise Exception("Shell not connected")
+        self.shell.send(b"\x03")
+
+    async def wait_for_output(self, timeout: float | None = None) -> bool:
+        """Returns as soon as new output is available, False if none arrived within timeout."""
+        if not self.shell:
+            raise Exception("Shell not connected")
+        if self.shell.recv_ready():
+            return True
+        if self.shell.closed or self.shell.eof_received:
+            await asyncio.sleep(timeout or 0)  # nothing more will arrive
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            # paramiko signals incoming data on a pollable pipe
+            fd = self.shell.fileno()
+            ready = loop.create_future()
+            loop.add_reader(fd, lambda: ready.done() or ready.set_result(True))
+        except (AttributeError, NotImplementedError):
+            return await self._poll_for_output(timeout)
+        try:
+            await asyncio.wait([ready], timeout=timeout)
+        finally:
+            loop.remove_reader(fd)
+            ready.cancel()
+        return self.shell.recv_ready()
+
+    async def _poll_for_output(self, timeout: float | None) -> bool:
+        # fallback for event loops without add_reader support, e.g. the Windows proactor
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.shell.recv_ready():  # type: ignore
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.02)
+        return True
+
     async def read_output(
         self, timeout: float = 0, reset_full_output: bool = False
     ) -> Tuple[str, str]:
@@ -113,105 +170,232 @@ class SSHInteractiveSession:
             raise Exception("Shell not connected")
 
         if reset_full_output:
-            self.full_output = b""
-        partial_output = b""
-        leftover = b""
+            self.output.reset()
+        partial_output = TextTail(self.output.tail_chars)
         start_time = time.time()
 
-        while self.shell.recv_ready() and (
-            timeout <= 0 or time.time() - start_time < timeout
-        ):
-
-            # data = self.shell.recv(1024)
-            data = self.receive_bytes()
-
-            # # Trim own command from output
-            # if (
-            #     self.last_command
-            #     and len(self.last_command) > self.trimmed_command_length
-            # ):
-            #     command_to_trim = self.last_command[self.trimmed_command_length :]
-            #     data_to_trim = leftover + data
-
-            #     trim_com, trim_out = calculate_valid_match_lengths(
-            #         command_to_trim,
-            #         data_to_trim,
-            #         deviation_threshold=8,
-            #         deviation_reset=2,
-            #         ignore_patterns=[
-            #             rb"\x1b\[\?\d{4}[a-zA-Z](?:> )?",  # ANSI escape sequences
-            #             rb"\r",  # Carriage return
-            #             rb">\s",  # Greater-than symbol
-            #         ],
-            #         debug=False,
-            #     )
-
-            #     leftover = b""
-            #     if trim_com > 0 and trim_out > 0:
-            #         data = data_to_trim[trim_out:]
-            #         leftover = data
-            #         self.trimmed_command_length += trim_com
-
-            partial_output += data
-            self.full_output += data
-            await asyncio.sleep(0.1)  # Prevent busy waiting
-
-        # Decode once at the end
-        decoded_partial_output = partial_output.decode("utf-8", errors="replace")
-        decoded_full_output = self.full_output.decode("utf-8", errors="replace")
-
-        decoded_partial_output = clean_string(decoded_partial_output)
-        decoded_full_output = clean_string(decoded_full_output)
-
-        return decoded_full_output, decoded_partial_output
-
-    def receive_bytes(self, num_bytes=1024):
-        if not self.shell:
-            raise Exception("Shell not connected")
-        # Receive initial chunk of data
-        shell = self.shell
-        data = self.shell.recv(num_bytes)
-
-        # Helper function to ensure that we receive exactly `num_bytes`
-        def recv_all(num_bytes):
-            data = b""
-            while len(data) < num_bytes:
-                chunk = shell.recv(num_bytes - len(data))
-                if not chunk:
-                    break  # Connection might be closed or no more data
-                data += chunk
-            return data
-
-        # Check if the last byte(s) form an incomplete multi-byte UTF-8 sequence
-        if len(data) > 0:
-            last_byte = data[-1]
-
-            # Check if the last byte is part of a multi-byte UTF-8 sequence (continuation byte)
-            if (last_byte & 0b11000000) == 0b10000000:  # It's a continuation byte
-                # Now, find the start of this sequence by checking earlier bytes
-                for i in range(
-                    2, 5
-                ):  # Look back up to 4 bytes (since UTF-8 is up to 4 bytes long)
-                    if len(data) - i < 0:
-                        break
-                    byte = data[-i]
-
-                    # Detect the leading byte of a multi-byte sequence
-                    if (byte & 0b11100000) == 0b11000000:  # 2-byte sequence (110xxxxx)
-                        data += recv_all(1)  # Need 1 more byte to complete
-                        break
-                    elif (
-                        byte & 0b11110000
-                    ) == 0b11100000:  # 3-byte sequence (1110xxxx)
-                        data += recv_all(2)  # Need 2 more bytes to complete
-                        break
-                    elif (
-                        byte & 0b11111000
-                    ) == 0b11110000:  # 4-byte sequence (11110xxx)
-                        data += recv_all(3)  # Need 3 more bytes to complete
-                        break
-
-        return data
+        # drain whatever is available, only new bytes are decoded and cleaned
+        while self.shell.recv_ready():
+            data = self.shell.recv(65536)
+            if not data:
+                break
+            partial_output.add(self.output.feed(data))
+            if timeout > 0 and time.time() - start_time >= timeout:
+                break
+            await asyncio.sleep(0)  # let other tasks run between large reads
+
+        return self.output.render(), clean_string(str(partial_output))
+
+
+# Output capture limits, the middle of larger outputs is spilled to a file.
+OUTPUT_MAX_CHARS = 1_000_000
+OUTPUT_HEAD_CHARS = 100_000
+OUTPUT_SPILL_MAX_CHARS = 200_000_000
+OUTPUT_SPILL_FOLDER = "tmp/output"
+OUTPUT_SPILL_FILES = 20  # newest spill files kept per folder, code execution uses one per chat
+
+
+class OutputBuffer:
+    """
+    Terminal output decoded and cleaned incrementally, equivalent to clean_string over
+    everything fed since reset as long as it fits into max_chars. Larger outputs keep
+    their first head_chars and the most recent lines, the full output is spilled to a file.
+    """
+
+    _ESCAPE = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+    # an escape sequence cut off at the end of a chunk
+    _PARTIAL_ESCAPE = re.compile(r"\x1B(?:\[[0-?]*[ -/]*)?$")
+    _CONTENT = re.compile(r"[^\s>]")
+
+    def __init__(
+        self,
+        max_chars: int = OUTPUT_MAX_CHARS,
+        head_chars: int | None = None,
+        spill_folder: str | None = OUTPUT_SPILL_FOLDER,
+        spill_max_chars: int = OUTPUT_SPILL_MAX_CHARS,
+    ):
+        self.max_chars = max_chars
+        self.head_chars = min(head_chars if head_chars is not None else OUTPUT_HEAD_CHARS, max_chars // 10)
+        self.tail_chars = max_chars - self.head_chars
+        self.spill_folder = spill_folder  # None disables spilling
+        self.spill_max_chars = spill_max_chars
+        self.spill_path: str | None = None
+        self._spill = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.reset()
+
+    def reset(self):
+        self._close_spill()
+        self.spill_path = None
+        self._spill_size = 0
+        self._decoder.reset()
+        self._hold = ""  # unfinished escape sequence
+        self._head = ""  # leading output until real content shows up
+        self._started = False
+        self._first_lines: list[str] = []  # cleaned lines kept from the start
+        self._first_size = 0
+        self._first_full = False
+        self._spilled = False
+        self._lines: deque[str] = deque()  # cleaned complete lines
+        self._size = 0
+        self._omitted = 0  # characters dropped between the first and the recent lines
+        self._current = ""  # unfinished last line
+        self._rendered: str | None = None
+
+    def feed(self, data: bytes | str) -> str:
+        """Adds new output and returns it with escape sequences removed."""
+        text = self._decoder.decode(data) if isinstance(data, bytes) else data
+        text = self._hold + text
+        match = self._PARTIAL_ESCAPE.search(text)
+        if match:
+            self._hold = text[match.start():]
+            text = text[: match.start()]
+        else:
+            self._hold = ""
+        text = self._ESCAPE.sub("", text).replace("\x00", "")
+        if text:
+            self._rendered = None
+            self._append(text)
+        return text
+
+    def render(self) -> str:
+        if self._rendered is None:
+            if not self._started:
+                self._rendered = clean_string(self._head)
+            elif not self._omitted:
+                self._rendered = "\n".join([*self._first_lines, *self._lines, _clean_line(self._current)])
+            else:
+                self._rendered = "\n".join(
+                    [*self._first_lines, self._get_omitted_note(), *self._lines, _clean_line(self._current)]
+                )
+        return self._rendered
+
+    def _get_omitted_note(self) -> str:
+        if self.spill_path:
+            return f"[... {self._omitted} characters omitted, output saved to {self.spill_path} ...]"
+        return f"[... {self._omitted} characters omitted ...]"
+
+    def _append(self, text: str):
+        if not self._started:
+            self._head += text
+            if not self._CONTENT.search(self._head):
+                return
+            # same start rules as clean_string, applied once
+            text = re.sub(r"^[ \r]*(?:\r*\n>[ \r]*)*", "", self._head)
+            text = re.sub(r"^(>\s*)+", "", text)
+            text = text.lstrip("\r ")
+            self._head = ""
+            self._started = True
+
+        lines = (self._current + text).split("\n")
+        current = _compact_line(lines.pop())
+        if len(current) > self.tail_chars:
+            self._omitted += len(current) - self.tail_chars
+            current = current[-self.tail_chars :]
+        self._current = current
+        for line in lines:
+            line = _clean_line(line[:-1] if line.endswith("\r") else line)  # \r\n ends a line too
+            if not self._first_full:
+                if self._first_size + len(line) + 1 <= self.head_chars:
+                    self._first_lines.append(line)
+                    self._first_size += len(line) + 1
+                    continue
+                self._first_full = True
+            self._lines.append(line)
+            self._size += len(line) + 1
+            if self._spill:
+                self._write_spill(line)
+        while self._size > self.tail_chars and self._lines:
+            if not self._spilled:
+                self._open_spill()
+            line = self._lines.popleft()
+            self._size -= len(line) + 1
+            self._omitted += len(line) + 1
+
+    def _open_spill(self):
+        self._spilled = True
+        if not self.spill_folder:
+            return
+        from python.helpers import files
+
+        try:
+            folder = files.get_abs_path(self.spill_folder)  # type: ignore
+            os.makedirs(folder, exist_ok=True)
+            _prune_spill_files(folder)
+            self.spill_path = os.path.join(folder, f"{time.strftime('%Y%m%d_%H%M%S')}_{next(_spill_counter):06d}.txt")
+            self._spill = open(self.spill_path, "w", encoding="utf-8")
+        except OSError as e:
+            PrintStyle.error(f"Failed to spill terminal output: {e}")
+            self.spill_path = None
+            self._spill = None
+            return
+        # everything captured so far, later lines are appended as they complete
+        for line in [*self._first_lines, *self._lines]:
+            self._write_spill(line)
+
+    def _write_spill(self, line: str):
+        if self._spill_size + len(line) + 1 > self.spill_max_chars:
+            self._close_spill()
+            return
+        self._spill.write(line + "\n")  # type: ignore
+        self._spill_size += len(line) + 1
+
+    def _close_spill(self):
+        spill, self._spill = getattr(self, "_spill", None), None
+        if spill:
+            spill.close()
+
+    def close(self):
+        self._close_spill()
+
+
+_spill_counter = itertools.count(1)
+
+
+class TextTail:
+    """The most recent max_chars of text added in pieces."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._parts: deque[str] = deque()
+        self._size = 0
+
+    def add(self, text: str):
+        self._parts.append(text)
+        self._size += len(text)
+        while self._size - len(self._parts[0]) >= self.max_chars:
+            self._size -= len(self._parts.popleft())
+
+    def __str__(self) -> str:
+        return "".join(self._parts)[-self.max_chars :]
+
+
+def _prune_spill_files(folder: str):
+    names = sorted(name for name in os.listdir(folder) if name.endswith(".txt"))
+    for name in names[: max(len(names) - OUTPUT_SPILL_FILES + 1, 0)]:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+
+
+def _clean_line(line: str) -> str:
+    # Handle carriage returns '\r' by splitting and taking the last part
+    parts = [part for part in line.split("\r") if part.strip()]
+    if parts:
+        return parts[-1].rstrip()  # Overwrite with the last part after the last '\r'
+    return line
+
+
+def _compact_line(line: str) -> str:
+    # an unfinished line only needs the text after its last non-blank carriage return
+    cut = line.rfind("\r")
+    while cut > 0 and not line[cut + 1 :].strip():
+        cut = line.rfind("\r", 0, cut)
+    if cut > 0:
+        line = line[cut:]
+    return line
+
 
 def clean_string(input_string):
     # Remove ANSI escape codes
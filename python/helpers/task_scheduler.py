@@ -482,14 +482,26 @@ class SchedulerTaskList(BaseModel):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._lock = threading.RLock()
+        self._version = 0  # increases when the saved or reloaded tasks differ
+        self._json = ""
+
+    def get_version(self) -> int:
+        return self._version
+
+    def _set_json(self, json_data: str):
+        if json_data != self._json:
+            self._json = json_data
+            self._version += 1
 
     async def reload(self) -> "SchedulerTaskList":
         path = get_abs_path(SCHEDULER_FOLDER, "tasks.json")
         if exists(path):
             with self._lock:
-                data = self.__class__.model_validate_json(read_file(path))
+                json_data = read_file(path)
+                data = self.__class__.model_validate_json(json_data)
                 self.tasks.clear()
                 self.tasks.extend(data.tasks)
+                self._set_json(json_data)
         return self
 
     async def add_task(self, task: Union[ScheduledTask, AdHocTask, PlannedTask]) -> "SchedulerTaskList":
@@ -527,6 +539,7 @@ class SchedulerTaskList(BaseModel):
                 )
 
             write_file(path, json_data)
+            self._set_json(json_data)
 
             # Debug: Verify after saving
             if exists(path):
@@ -636,6 +649,10 @@ class TaskScheduler:
     async def reload(self):
         await self._tasks.reload()
 
+    def get_version(self) -> int:
+        """Version of the task list, increases when tasks are saved or reloaded with changes."""
+        return self._tasks.get_version()
+
     def get_tasks(self) -> list[Union[ScheduledTask, AdHocTask, PlannedTask]]:
         return self._tasks.get_tasks()
 
@@ -7,8 +7,9 @@ if _IS_WIN:
 
 
 #  Make stdin / stdout tolerant to broken UTF-8 so input() never aborts
-sys.stdin.reconfigure(errors="replace")  # type: ignore
-sys.stdout.reconfigure(errors="replace")  # type: ignore
+for _stream in (sys.stdin, sys.stdout):
+    if hasattr(_stream, "reconfigure"):  # not available on captured streams, e.g. under pytest
+        _stream.reconfigure(errors="replace")  # type: ignore
 
 
 # ──────────────────────────── PUBLIC CLASS ────────────────────────────
@@ -23,6 +24,7 @@ class TTYSession:
         self.echo = echo  # ← store preference
         self._proc = None
         self._buf = asyncio.Queue()
+        self._ready = asyncio.Event()  # set while decoded output is waiting in the queue
 
     def __del__(self):
         # Simple cleanup on object destruction
@@ -78,6 +80,9 @@ class TTYSession:
             raise RuntimeError("TTYSpawn is not started")
         return await self._proc.wait()
 
+    def is_alive(self) -> bool:
+        return self._proc is not None and getattr(self._proc, "returncode", None) is None
+
     def kill(self):
         """Force-kill the running child process.
 
@@ -102,9 +107,21 @@ class TTYSession:
     async def read(self, timeout=None):
         # Return any decoded text the child produced, or None on timeout
         try:
-            return await asyncio.wait_for(self._buf.get(), timeout)
+            chunk = await asyncio.wait_for(self._buf.get(), timeout)
         except asyncio.TimeoutError:
             return None
+        if self._buf.empty():
+            self._ready.clear()
+        return chunk
+
+    async def wait_for_output(self, timeout=None) -> bool:
+        # Wait until output is ready to read without consuming it, False on timeout
+        if self._buf.empty():
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return not self._buf.empty()
 
     # backward-compat alias:
     readline = read
@@ -143,6 +160,7 @@ class TTYSession:
             if not chunk:
                 break
             self._buf.put_nowait(chunk.decode(self.encoding, "replace"))
+            self._ready.set()
 
 
 # ──────────────────────────── POSIX IMPLEMENTATION ────────────────────
@@ -1,5 +1,7 @@
-from typing import Any, List, Sequence
+import asyncio
+from typing import Any, Collection, Iterable, List, Sequence
 import uuid
+import numpy as np
 from langchain_community.vectorstores import FAISS
 
 # faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
@@ -57,9 +59,12 @@ class VectorDB:
             )
         return VectorDB._cached_embeddings[namespace]
 
-    def __init__(self, agent: Agent, cache: bool = True):
+    def __init__(self, agent: Agent, cache: bool = True, index_fields: Sequence[str] = ()):
         self.agent = agent
         self.cache = cache  # store cache preference
+        # metadata value -> document ids, for fields used to filter often
+        self.field_index: dict[str, dict[Any, set[str]]] = {field: {} for field in index_fields}
+        self._positions: dict[str, int] | None = None  # document id -> faiss position
         self.embeddings = self._get_embeddings(agent, cache=cache)
         self.index = faiss.IndexFlatIP(len(self.embeddings.embed_query("example")))
 
@@ -86,6 +91,64 @@ class VectorDB:
             filter=comparator,
         )
 
+    async def search_many_by_similarity_threshold(
+        self,
+        queries: Sequence[str],
+        limit: int,
+        threshold: float,
+        ids: Collection[str] | None = None,
+    ) -> list[list[Document]]:
+        """Searches several queries with one embedding call, only among ids if given."""
+        if not queries:
+            return []
+        if ids is not None and not ids:
+            return [[] for _ in queries]
+        vectors = await self.embeddings.aembed_documents(list(queries))
+        return await asyncio.to_thread(
+            self._search_vectors, vectors, limit, threshold, ids
+        )
+
+    def _search_vectors(
+        self,
+        vectors: list[list[float]],
+        limit: int,
+        threshold: float,
+        ids: Collection[str] | None,
+    ) -> list[list[Document]]:
+        params = None
+        count = self.db.index.ntotal
+        if ids is not None:
+            positions = self._get_positions()
+            selected = np.array(
+                [positions[id] for id in ids if id in positions], dtype=np.int64
+            )
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(selected))
+            count = len(selected)
+        limit = min(limit, count)
+        if limit <= 0:
+            return [[] for _ in vectors]
+
+        scores, indices = self.db.index.search(
+            np.array(vectors, dtype=np.float32), limit, params=params
+        )
+        docs = self.db.get_all_docs()
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            results.append(
+                [
+                    docs[self.db.index_to_docstore_id[int(position)]]
+                    for score, position in zip(row_scores, row_indices)
+                    if position >= 0 and cosine_normalizer(float(score)) >= threshold
+                ]
+            )
+        return results
+
+    def get_by_field(self, field: str, values: Iterable[Any]) -> list[Document]:
+        """Documents whose indexed metadata field has one of the values."""
+        index = self.field_index[field]
+        ids = [id for value in dict.fromkeys(values) for id in index.get(value, ())]
+        return self.db.get_by_ids(ids)
+
     async def search_by_metadata(self, filter: str, limit: int = 0) -> list[Document]:
         comparator = get_comparator(filter)
         all_docs = self.db.get_all_docs()
@@ -98,14 +161,28 @@ class VectorDB:
                     break
         return result
 
-    async def insert_documents(self, docs: list[Document]):
+    async def insert_documents(
+        self, docs: list[Document], embeddings: Sequence[Sequence[float]] | None = None
+    ):
+        """Inserts documents, embedding them unless their embeddings are given."""
         ids = [str(uuid.uuid4()) for _ in range(len(docs))]
 
         if ids:
             for doc, id in zip(docs, ids):
                 doc.metadata["id"] = id  # add ids to documents metadata
 
-            self.db.add_documents(documents=docs, ids=ids)
+            if embeddings is None:
+                self.db.add_documents(documents=docs, ids=ids)
+            else:
+                self.db.add_embeddings(
+                    text_embeddings=[
+                        (doc.page_content, list(vector))
+                        for doc, vector in zip(docs, embeddings)
+                    ],
+                    metadatas=[doc.metadata for doc in docs],
+                    ids=ids,
+                )
+            self._update_index(docs, add=True)
         return ids
 
     async def delete_documents_by_ids(self, ids: list[str]):
@@ -116,8 +193,28 @@ class VectorDB:
         if rem_docs:
             rem_ids = [doc.metadata["id"] for doc in rem_docs]  # ids to remove
             await self.db.adelete(ids=rem_ids)
+            self._update_index(rem_docs, add=False)
         return rem_docs
 
+    def _update_index(self, docs: list[Document], add: bool):
+        self._positions = None  # faiss positions shift on every change
+        for field, index in self.field_index.items():
+            for doc in docs:
+                value = doc.metadata.get(field)
+                if add:
+                    index.setdefault(value, set()).add(doc.metadata["id"])
+                elif value in index:
+                    index[value].discard(doc.metadata["id"])
+                    if not index[value]:
+                        del index[value]
+
+    def _get_positions(self) -> dict[str, int]:
+        if self._positions is None:
+            self._positions = {
+                id: position for position, id in self.db.index_to_docstore_id.items()
+            }
+        return self._positions
+
 
 def format_docs_plain(docs: list[Document]) -> list[str]:
     result = []
@@ -141,7 +238,7 @@ def cosine_normalizer(val: float) -> float:
 def get_comparator(condition: str):
     def comparator(data: dict[str, Any]):
         try:
-            result = simple_eval(condition, {}, data)
+            result = simple_eval(condition, names=data)
             return result
         except Exception as e:
             # PrintStyle.error(f"Error evaluating condition: {e}")
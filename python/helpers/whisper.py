@@ -1,19 +1,36 @@
 import base64
+import io
+import subprocess
+import wave
 import warnings
+import numpy as np
 import whisper
-import tempfile
 import asyncio
+from typing import AsyncIterator, Iterator
 from python.helpers import runtime, rfc, settings, files
+from python.helpers.worker import Worker
 from python.helpers.print_style import PrintStyle
 from python.helpers.notification import NotificationManager, NotificationType, NotificationPriority
 
 # Suppress FutureWarning from torch.load
 warnings.filterwarnings("ignore", category=FutureWarning)
 
+SAMPLE_RATE = 16000  # whisper works with 16 kHz mono audio
+# long recordings are transcribed and streamed in chunks of whisper's 30 second window
+CHUNK_SECONDS = 30
+# chunks are split at the quietest point of their last seconds to avoid cutting words
+SPLIT_SEARCH_SECONDS = 2
+# transcriptions running at once, one model instance uses all cores through torch
+MAX_WORKERS = 1
+# transcriptions running or waiting for the worker, more are refused
+MAX_QUEUED = 8
+
 _model = None
 _model_name = ""
 is_updating_model = False  # Tracks whether the model is currently updating
 
+_worker = Worker("whisper", MAX_WORKERS, MAX_QUEUED)
+
 async def preload(model_name:str):
     try:
         # return await runtime.call_development_function(_preload, model_name)
@@ -21,7 +38,7 @@ async def preload(model_name:str):
     except Exception as e:
         # if not runtime.is_development():
         raise e
-        
+
 async def _preload(model_name:str):
     global _model, _model_name, is_updating_model
 
@@ -38,7 +55,7 @@ async def _preload(model_name:str):
                 display_time=99,
                 group="whisper-preload")
             PrintStyle.standard(f"Loading Whisper model: {model_name}")
-            _model = whisper.load_model(name=model_name, download_root=files.get_abs_path("/tmp/models/whisper")) # type: ignore
+            _model = await _worker.run(_load_model, model_name)
             _model_name = model_name
             NotificationManager.send_notification(
                 NotificationType.INFO,
@@ -49,6 +66,9 @@ async def _preload(model_name:str):
     finally:
         is_updating_model = False
 
+def _load_model(model_name: str):
+    return whisper.load_model(name=model_name, download_root=files.get_abs_path("/tmp/models/whisper")) # type: ignore
+
 async def is_downloading():
     # return await runtime.call_development_function(_is_downloading)
     return _is_downloading()
@@ -75,22 +95,103 @@ async def transcribe(model_name:str, audio_bytes_b64: str):
 
 
 async def _transcribe(model_name:str, audio_bytes_b64: str):
+    chunks = [chunk async for chunk in transcribe_stream(model_name, audio_bytes_b64)]
+    return {
+        "text": "".join(chunk["text"] for chunk in chunks),
+        "segments": [segment for chunk in chunks for segment in chunk["segments"]],
+        "language": chunks[0]["language"] if chunks else "",
+    }
+
+
+async def transcribe_stream(model_name: str, audio_bytes_b64: str) -> AsyncIterator[dict]:
+    """
+    Yields text, segments and language of consecutive chunks of the recording
+    as soon as the worker transcribes them.
+    """
     await _preload(model_name)
-    
-    # Decode audio bytes if encoded as a base64 string
-    audio_bytes = base64.b64decode(audio_bytes_b64)
-
-    # Create temp audio file
-    import os
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as audio_file:
-        audio_file.write(audio_bytes)
-        temp_path = audio_file.name
-    try:
-        # Transcribe the audio file
-        result = _model.transcribe(temp_path, fp16=False) # type: ignore
-        return result
-    finally:
+    async for chunk in _worker.stream(_transcribe_chunks, _model, audio_bytes_b64):
+        yield chunk
+
+
+async def open_stream(model_name: str, audio_bytes_b64: str) -> Iterator[dict]:
+    """Starts a transcription whose chunks are read by a blocking iterator, as streamed responses do."""
+    await _preload(model_name)
+    return _worker.open_stream(_transcribe_chunks, _model, audio_bytes_b64)
+
+
+def _transcribe_chunks(model, audio_bytes_b64: str) -> Iterator[dict]:
+    audio = decode_audio(base64.b64decode(audio_bytes_b64))
+    language = None
+    previous_text = None
+    for start, chunk in split_audio(audio):
+        # language of the first chunk and the previous text keep chunks consistent
+        result = model.transcribe(
+            chunk, fp16=False, language=language, initial_prompt=previous_text
+        )
+        language = language or result.get("language")
+        previous_text = result["text"]
+        offset = start / SAMPLE_RATE
+        yield {
+            "text": result["text"],
+            "segments": [
+                {**segment, "start": segment["start"] + offset, "end": segment["end"] + offset}
+                for segment in result["segments"]
+            ],
+            "language": language,
+            "start": offset,
+            "end": (start + len(chunk)) / SAMPLE_RATE,
+        }
+
+
+def decode_audio(audio_bytes: bytes) -> np.ndarray:
+    """Decodes a recording in memory to 16 kHz mono float samples."""
+    if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
         try:
-            os.remove(temp_path)
-        except Exception:
-            pass # ignore errors during cleanup
+            return _decode_wav(audio_bytes)
+        except wave.Error:
+            pass  # not PCM, left to ffmpeg
+    # other formats, like webm recorded by browsers, are decoded by ffmpeg through pipes
+    output = subprocess.run(
+        ["ffmpeg", "-nostdin", "-threads", "0", "-i", "pipe:0",
+         "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        input=audio_bytes, capture_output=True, check=True,
+    ).stdout
+    return np.frombuffer(output, np.int16).astype(np.float32) / 32768.0
+
+
+def _decode_wav(audio_bytes: bytes) -> np.ndarray:
+    with wave.open(io.BytesIO(audio_bytes)) as wav:
+        width = wav.getsampwidth()
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if width == 1:
+        audio = (np.frombuffer(frames, np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        audio = np.frombuffer(frames, np.int16).astype(np.float32) / 32768
+    elif width == 4:
+        audio = np.frombuffer(frames, np.int32).astype(np.float32) / 2147483648
+    else:
+        raise wave.Error(f"unsupported sample width {width}")
+    audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(0, len(audio), rate / SAMPLE_RATE)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+def split_audio(audio: np.ndarray) -> Iterator[tuple[int, np.ndarray]]:
+    """Yields (start sample, chunk) of at most CHUNK_SECONDS, split at quiet points."""
+    size = CHUNK_SECONDS * SAMPLE_RATE
+    search = SPLIT_SEARCH_SECONDS * SAMPLE_RATE
+    window = SAMPLE_RATE // 50  # 20 ms
+    start = 0
+    while len(audio) - start > size:
+        # energy of 20 ms windows at the end of the chunk, split at the quietest one
+        tail = audio[start + size - search : start + size]
+        energy = np.square(tail[: len(tail) // window * window]).reshape(-1, window).sum(axis=1)
+        end = start + size - search + int(np.argmin(energy)) * window + window // 2
+        yield start, audio[start:end]
+        start = end
+    if start < len(audio):
+        yield start, audio[start:]
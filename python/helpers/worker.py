@@ -0,0 +1,102 @@
+import asyncio
+import concurrent.futures
+import queue
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+_END = object()  # ends the items of a stream
+
+
+class Worker:
+    """
+    Dedicated threads for blocking work like model inference, kept off the event loops.
+    Generator functions run on them stream their items to async or blocking readers.
+    """
+
+    def __init__(self, name: str, max_workers: int = 1, max_queued: int = 0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued  # jobs running or waiting, more are refused, 0 for no limit
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._queued = 0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Runs fn on the worker and returns its result."""
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    async def stream(self, fn: Callable[..., Iterator], *args) -> AsyncIterator:
+        """Runs the generator function fn on the worker, yielding its items as soon as they are produced."""
+        loop = asyncio.get_running_loop()
+        results: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        put = lambda item: loop.call_soon_threadsafe(results.put_nowait, item)
+        self._submit(_produce, fn, args, put, cancelled)
+        try:
+            while (item := await results.get()) is not _END:
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            cancelled.set()
+
+    def open_stream(self, fn: Callable[..., Iterator], *args) -> Iterator:
+        """Starts the generator function fn on the worker, its items are read by a blocking iterator."""
+        results: queue.Queue = queue.Queue()
+        cancelled = threading.Event()
+        self._submit(_produce, fn, args, results.put, cancelled)
+        return _read(results, cancelled)
+
+    def _submit(self, fn: Callable, *args) -> concurrent.futures.Future:
+        with self._lock:
+            if self.max_queued and self._queued >= self.max_queued:
+                raise Exception(f"Too many {self.name} jobs in progress, please try again later")
+            self._queued += 1
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+            executor = self._executor
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # also called when the job is cancelled before it started
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._lock:
+            self._queued -= 1
+
+
+def _produce(fn: Callable[..., Iterator], args: tuple, put: Callable, cancelled: threading.Event):
+    # runs on the worker thread, items and errors are passed to put, _END ends them
+    items = fn(*args)
+    try:
+        for item in items:
+            put(item)
+            if cancelled.is_set():
+                break  # the reader stopped, the next item is not produced
+        put(_END)
+    except Exception as e:
+        put(_Failure(e))
+    finally:
+        items.close()
+
+
+def _read(results: queue.Queue, cancelled: threading.Event) -> Iterator:
+    try:
+        while (item := results.get()) is not _END:
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        cancelled.set()
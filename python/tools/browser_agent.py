@@ -5,7 +5,7 @@ from agent import Agent, InterventionException
 from pathlib import Path
 
 from python.helpers.tool import Tool, Response
-from python.helpers import files, defer, persist_chat, strings
+from python.helpers import files, defer, persist_chat, strings, browser_pool
 from python.helpers.browser_use import browser_use  # type: ignore[attr-defined]
 from python.helpers.print_style import PrintStyle
 from python.helpers.playwright import ensure_playwright_binary
@@ -18,29 +18,33 @@ from python.helpers.dirty_json import DirtyJson
 
 class State:
     @staticmethod
-    async def create(agent: Agent):
-        state = State(agent)
+    async def create(agent: Agent, fresh: bool = False):
+        state = State(agent, fresh)
         return state
 
-    def __init__(self, agent: Agent):
+    def __init__(self, agent: Agent, fresh: bool = False):
         self.agent = agent
+        self.fresh = fresh  # the first task gets a new browser instead of a pooled one
         self.browser_session: Optional[browser_use.BrowserSession] = None
         self.task: Optional[defer.DeferredTask] = None
         self.use_agent: Optional[browser_use.Agent] = None
         self.secrets_dict: Optional[dict[str, str]] = None
         self.iter_no = 0
+        self.pool = browser_pool.get_pool(
+            None if browser_pool.SHARED else self.agent.context.id, self._launch_browser
+        )
 
     def __del__(self):
         self.kill_task()
-        files.delete_dir(self.get_user_data_dir()) # cleanup user data dir
 
-    def get_user_data_dir(self):
+    def get_user_data_dir(self, slot: int = 0):
+        owner = "pool" if self.pool.owner == browser_pool.GLOBAL else f"agent_{self.agent.context.id}"
         user_data_dir = str(
             Path.home()
             / ".config"
             / "browseruse"
             / "profiles"
-            / f"agent_{self.agent.context.id}"
+            / (f"{owner}_{slot}" if slot else owner)
         )
         # Clean up locked profiles from previous crashes
         # Chrome crashes can leave locked profile directories that prevent new sessions
@@ -55,14 +59,11 @@ class State:
                     pass  # Lock might be held by another process, that's okay
         return user_data_dir
 
-    async def _initialize(self):
-        if self.browser_session:
-            return
-
+    async def _launch_browser(self, slot: int) -> browser_use.BrowserSession:
         # for some reason we need to provide exact path to headless shell, otherwise it looks for headed browser
         pw_binary = ensure_playwright_binary()
                 
-        self.browser_session = browser_use.BrowserSession(
+        browser_session = browser_use.BrowserSession(
             browser_profile=browser_use.BrowserProfile(
                 headless=True,
                 disable_security=True,
@@ -91,13 +92,13 @@ class State:
                     "--disable-gpu",
                     "--disable-software-rasterizer",
                 ],
-                # Use a unique user data directory to avoid conflicts
-                user_data_dir=self.get_user_data_dir(),
+                # Use a unique user data directory per pool slot to avoid conflicts
+                user_data_dir=self.get_user_data_dir(slot),
                 extra_http_headers=self.agent.config.browser_http_headers or {},
                 )
         )
 
-        await self.browser_session.start() if self.browser_session else None
+        await browser_session.start()
         # self.override_hooks()
 
         # --------------------------------------------------------------------------
@@ -107,54 +108,50 @@ class State:
         # aspect ratio. We fix this by directly setting viewport size after startup.
         # --------------------------------------------------------------------------
 
-        if self.browser_session:
-            try:
-                page = await self.browser_session.get_current_page()
-                if page:
-                    await page.set_viewport_size({"width": 1024, "height": 2048})
-            except Exception as e:
-                PrintStyle().warning(f"Could not force set viewport size: {e}")
+        try:
+            page = await browser_session.get_current_page()
+            if page:
+                await page.set_viewport_size({"width": 1024, "height": 2048})
+        except Exception as e:
+            PrintStyle().warning(f"Could not force set viewport size: {e}")
 
         # --------------------------------------------------------------------------    
         
         # Add init script to the browser session
-        if self.browser_session and self.browser_session.browser_context:
+        if browser_session.browser_context:
             js_override = files.get_abs_path("lib/browser/init_override.js")
-            await self.browser_session.browser_context.add_init_script(path=js_override) if self.browser_session else None
+            await browser_session.browser_context.add_init_script(path=js_override)
+        return browser_session
 
     def start_task(self, task: str):
         if self.task and self.task.is_alive():
             self.kill_task()
 
-        self.task = defer.DeferredTask(
-            thread_name="BrowserAgent" + self.agent.context.id
-        )
+        # tasks run on the pool thread, pooled browsers are bound to its event loop
+        self.task = defer.DeferredTask(thread_name=self.pool.thread_name)
         if self.agent.context.task:
-            self.agent.context.task.add_child_task(self.task, terminate_thread=True)
+            self.agent.context.task.add_child_task(self.task, terminate_thread=False)
         self.task.start_task(self._run_task, task) if self.task else None
         return self.task
 
     def kill_task(self):
+        # cancelling the task returns its browser to the pool
         if self.task:
-            self.task.kill(terminate_thread=True)
+            self.task.kill(terminate_thread=False)
             self.task = None
-        if self.browser_session:
-            try:
-                import asyncio
-
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(self.browser_session.close()) if self.browser_session else None
-                loop.close()
-            except Exception as e:
-                PrintStyle().error(f"Error closing browser session: {e}")
-            finally:
-                self.browser_session = None
         self.use_agent = None
         self.iter_no = 0
 
     async def _run_task(self, task: str):
-        await self._initialize()
+        self.browser_session = await self.pool.acquire(fresh=self.fresh)
+        self.fresh = False
+        try:
+            return await self._run_use_agent(task)
+        finally:
+            browser_session, self.browser_session = self.browser_session, None
+            await self.pool.release(browser_session)
+
+    async def _run_use_agent(self, task: str):
 
         class DoneResult(BaseModel):
             title: str
@@ -402,7 +399,7 @@ class BrowserAgent(Tool):
         if reset and self.state:
             self.state.kill_task()
         if not self.state or reset:
-            self.state = await State.create(self.agent)
+            self.state = await State.create(self.agent, fresh=reset)
         self.agent.set_data("_browser_agent_state", self.state)
 
     def update_progress(self, text):
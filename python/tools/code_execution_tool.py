@@ -1,10 +1,13 @@
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import json
+import os
 import shlex
 import time
 from python.helpers.tool import Tool, Response
-from python.helpers import files, rfc_exchange, projects, runtime
+from python.helpers import files, rfc_exchange, projects, runtime, shell_pool, persist_chat
 from python.helpers.print_style import PrintStyle
+from python.helpers.log import Log
 from python.helpers.shell_local import LocalInteractiveSession
 from python.helpers.shell_ssh import SSHInteractiveSession
 from python.helpers.docker import DockerContainerManager
@@ -28,6 +31,21 @@ OUTPUT_TIMEOUTS: dict[str, int] = {
     "dialog_timeout": 5,
 }
 
+# Trailing window of output scanned for prompts and dialogs.
+OUTPUT_TAIL_CHARS = 4096
+
+# Folder in the chat folder for large outputs, pruned per chat and deleted with it.
+OUTPUT_SPILL_SUBFOLDER = "output"
+
+# Long-lived REPL kernels for python and nodejs runtimes, scripts ship in docker/run/fs/exe.
+KERNELS: dict[str, dict[str, str]] = {
+    "python": {"script": "python_kernel.py", "command": "python3 -u", "prompt": "[python kernel] >>>"},
+    "nodejs": {"script": "node_kernel.js", "command": "node", "prompt": "[node kernel] >>>"},
+}
+KERNEL_START_TIMEOUT = 30
+KERNEL_INTERRUPT_TIMEOUT = 5
+KERNEL_UNAVAILABLE = "A0_KERNEL_UNAVAILABLE"
+
 @dataclass
 class ShellWrap:
     id: int
@@ -38,6 +56,9 @@ class ShellWrap:
 class State:
     ssh_enabled: bool
     shells: dict[int, ShellWrap]
+    kernels: dict[tuple[int, str], ShellWrap] = field(default_factory=dict)  # (session, runtime)
+    current: dict[int, str] = field(default_factory=dict)  # runtime last used per session
+    kernels_unavailable: set[str] = field(default_factory=set)
 
 
 class CodeExecution(Tool):
@@ -48,6 +69,7 @@ class CodeExecution(Tool):
         re.compile(r"root@[^:]+:[^#]+# ?$"),  # root@container:~#
         re.compile(r"[a-zA-Z0-9_.-]+@[^:]+:[^$#]+[$#] ?$"),  # user@host:~$
         re.compile(r"\(?.*\)?\s*PS\s+[^>]+> ?$"),  # PowerShell prompt like (base) PS C:\...>
+        re.compile(r"\[(python|node) kernel\] >>> ?$"),  # persistent REPL kernels
     ]
     # potential dialog detection
     dialog_patterns = [
@@ -113,67 +135,172 @@ class CodeExecution(Tool):
     async def after_execution(self, response, **kwargs):
         self.agent.hist_add_tool_result(self.name, response.message, **(response.additional or {}))
 
-    async def prepare_state(self, reset=False, session: int | None = None):
+    async def prepare_state(self, reset=False, session: int | None = None, runtime: str = "terminal"):
         self.state: State | None = self.agent.get_data("_cet_state")
         # always reset state when ssh_enabled changes
         if not self.state or self.state.ssh_enabled != self.agent.config.code_exec_ssh_enabled:
             # initialize shells dictionary if not exists
             shells: dict[int, ShellWrap] = {}
+            kernels: dict[tuple[int, str], ShellWrap] = {}
+            current: dict[int, str] = {}
+            kernels_unavailable: set[str] = set()
         else:
             shells = self.state.shells.copy()
-
-        # Only reset the specified session if provided
-        if reset and session is not None and session in shells:
-            await shells[session].session.close()
-            del shells[session]
+            kernels = self.state.kernels.copy()
+            current = self.state.current.copy()
+            kernels_unavailable = self.state.kernels_unavailable
+
+        # Only reset the specified session if provided, old shells and kernels are closed in the background
+        if reset and session is not None and (session in shells or any(key[0] == session for key in kernels)):
+            if session in shells:
+                shell_pool.recycle(shells.pop(session).session)
+            for key in [key for key in kernels if key[0] == session]:
+                shell_pool.recycle(kernels.pop(key).session)
+            current.pop(session, None)
         elif reset and not session:
             # Close all sessions if full reset requested
-            for s in list(shells.keys()):
-                await shells[s].session.close()
-            shells = {}
-
-        # initialize local or remote interactive shell interface for session 0 if needed
-        if session is not None and session not in shells:
-            if self.agent.config.code_exec_ssh_enabled:
-                # Check if SSH target is localhost/127.0.0.1 - if so, use local execution instead
-                ssh_addr = self.agent.config.code_exec_ssh_addr
-                if ssh_addr in ["localhost", "127.0.0.1", "::1"]:
-                    print(f"DEBUG: SSH target is localhost ({ssh_addr}), using local execution instead")
-                    shell = LocalInteractiveSession(cwd=self.get_cwd())
-                else:
-                    pswd = (
-                        self.agent.config.code_exec_ssh_pass
-                        if self.agent.config.code_exec_ssh_pass
-                        else await rfc_exchange.get_root_password()
-                    )
-                    shell = SSHInteractiveSession(
-                        self.agent.context.log,
-                        self.agent.config.code_exec_ssh_addr,
-                        self.agent.config.code_exec_ssh_port,
-                        self.agent.config.code_exec_ssh_user,
-                        pswd,
-                        cwd=self.get_cwd(),
-                    )
-            else:
-                shell = LocalInteractiveSession(cwd=self.get_cwd())
-
+            for wrap in [*shells.values(), *kernels.values()]:
+                shell_pool.recycle(wrap.session)
+            shells, kernels, current = {}, {}, {}
+
+        # take a warm local or remote interactive shell for the session if needed
+        if session is not None and runtime == "terminal" and session not in shells:
+            pool = await self.get_shell_pool()
+            shell = await pool.acquire(self.setup_shell)
             shells[session] = ShellWrap(id=session, session=shell, running=False)
-            await shell.connect()
 
-        self.state = State(shells=shells, ssh_enabled=self.agent.config.code_exec_ssh_enabled)
+        self.state = State(
+            shells=shells,
+            ssh_enabled=self.agent.config.code_exec_ssh_enabled,
+            kernels=kernels,
+            current=current,
+            kernels_unavailable=kernels_unavailable,
+        )
         self.agent.set_data("_cet_state", self.state)
         return self.state
 
+    def get_runtime(self, session: int) -> str:
+        # kernel runtime when the session last ran code in a live kernel, terminal otherwise
+        state: State | None = self.agent.get_data("_cet_state")
+        if not state:
+            return "terminal"
+        runtime = state.current.get(session, "terminal")
+        return runtime if (session, runtime) in state.kernels else "terminal"
+
+    def get_shell(self, session: int, runtime: str | None = None) -> ShellWrap | None:
+        if not self.state:
+            return None
+        runtime = runtime or self.get_runtime(session)
+        if runtime != "terminal":
+            return self.state.kernels.get((session, runtime))
+        return self.state.shells.get(session)
+
+    async def prepare_kernel(self, session: int, kernel: str, reset: bool = False) -> ShellWrap | None:
+        """Returns the live kernel for the session, starting one if needed, or None if kernels are not available."""
+        self.state = await self.prepare_state(reset=reset, session=session, runtime=kernel)
+        if runtime.is_windows() and not self.agent.config.code_exec_ssh_enabled:
+            return None  # kernels are launched from a posix shell
+        wrap = self.state.kernels.get((session, kernel))
+        if wrap and wrap.session.is_alive():
+            return wrap
+        if wrap:
+            self.drop_kernel(session, kernel)
+        if kernel in self.state.kernels_unavailable:
+            return None
+
+        pool = await self.get_shell_pool()
+        shell = await pool.acquire(self.setup_shell)
+        script = self.get_kernel_script(kernel, isinstance(shell, LocalInteractiveSession))
+        command = KERNELS[kernel]["command"]
+        executable = command.split()[0]
+        await shell.send_command(
+            f"if [ -f {shlex.quote(script)} ] && command -v {executable} >/dev/null; "
+            f"then stty -icanon 2>/dev/null; {command} {shlex.quote(script)}; "
+            f"else echo {KERNEL_UNAVAILABLE}; fi"
+        )
+        if not await self.wait_for_kernel(shell, kernel, KERNEL_START_TIMEOUT):
+            PrintStyle.warning(f"{kernel} kernel is not available, running code in the terminal")
+            shell_pool.recycle(shell)
+            self.state.kernels_unavailable.add(kernel)
+            return None
+
+        wrap = ShellWrap(id=session, session=shell, running=False)
+        self.state.kernels[(session, kernel)] = wrap
+        return wrap
+
+    async def wait_for_kernel(self, shell: LocalInteractiveSession | SSHInteractiveSession, kernel: str, timeout: float) -> bool:
+        # read until the kernel prompt shows up, False if the kernel failed to come up in time
+        deadline = time.time() + timeout
+        while (remaining := deadline - time.time()) > 0:
+            if not await shell.wait_for_output(timeout=remaining):
+                continue
+            full_output, _ = await shell.read_output(timeout=1)
+            tail = self.get_output_tail(full_output).rstrip()
+            if tail.endswith(KERNELS[kernel]["prompt"]):
+                return True
+            if KERNEL_UNAVAILABLE in tail:
+                return False
+        return False
+
+    def drop_kernel(self, session: int, kernel: str):
+        if self.state and (wrap := self.state.kernels.pop((session, kernel), None)):
+            shell_pool.recycle(wrap.session)
+
+    def get_kernel_script(self, kernel: str, local: bool) -> str:
+        script = "/exe/" + KERNELS[kernel]["script"]
+        if local and not os.path.exists(script):
+            script = files.get_abs_path("docker/run/fs/exe", KERNELS[kernel]["script"])
+        return script
+
+    async def get_shell_pool(self) -> shell_pool.ShellPool:
+        cwd = self.get_cwd()
+        if self.agent.config.code_exec_ssh_enabled:
+            # Check if SSH target is localhost/127.0.0.1 - if so, use local execution instead
+            ssh_addr = self.agent.config.code_exec_ssh_addr
+            if ssh_addr in ["localhost", "127.0.0.1", "::1"]:
+                print(f"DEBUG: SSH target is localhost ({ssh_addr}), using local execution instead")
+            else:
+                pswd = (
+                    self.agent.config.code_exec_ssh_pass
+                    if self.agent.config.code_exec_ssh_pass
+                    else await rfc_exchange.get_root_password()
+                )
+                port = self.agent.config.code_exec_ssh_port
+                user = self.agent.config.code_exec_ssh_user
+                # ssh shells are shared across contexts, setup_shell points them to the leasing chat
+                return shell_pool.get_pool(
+                    ("ssh", ssh_addr, port, user, cwd),
+                    lambda: SSHInteractiveSession(Log(), ssh_addr, port, user, pswd, cwd=cwd),
+                )
+        return shell_pool.get_pool(
+            (self.agent.context.id, "local", cwd),
+            lambda: LocalInteractiveSession(cwd=cwd),
+        )
+
+    def setup_shell(self, shell):
+        # pooled shells log and spill large outputs for the chat that leased them
+        if isinstance(shell, SSHInteractiveSession):
+            shell.logger = self.agent.context.log
+        shell.output.spill_folder = files.get_abs_path(
+            persist_chat.get_chat_folder_path(self.agent.context.id), OUTPUT_SPILL_SUBFOLDER
+        )
+
     async def execute_python_code(self, session: int, code: str, reset: bool = False):
+        prefix = "python> " + self.format_command_for_output(code) + "\n\n"
+        if await self.prepare_kernel(session, "python", reset):
+            return await self.kernel_session(session, "python", code, prefix)
+        # no kernel, run the snippet in a fresh interpreter
         escaped_code = shlex.quote(code)
         command = f"ipython -c {escaped_code}"
-        prefix = "python> " + self.format_command_for_output(code) + "\n\n"
         return await self.terminal_session(session, command, reset, prefix)
 
     async def execute_nodejs_code(self, session: int, code: str, reset: bool = False):
+        prefix = "node> " + self.format_command_for_output(code) + "\n\n"
+        if await self.prepare_kernel(session, "nodejs", reset):
+            return await self.kernel_session(session, "nodejs", code, prefix)
+        # no kernel, run the snippet in a fresh interpreter
         escaped_code = shlex.quote(code)
         command = f"node /exe/node_eval.js {escaped_code}"
-        prefix = "node> " + self.format_command_for_output(code) + "\n\n"
         return await self.terminal_session(session, command, reset, prefix)
 
     async def execute_terminal_command(
@@ -192,13 +319,14 @@ class CodeExecution(Tool):
 
         # Check if session is running and handle it
         if not self.allow_running:
-            if response := await self.handle_running_session(session):
+            if response := await self.handle_running_session(session, "terminal"):
                 return response
         
         # try again on lost connection
         for i in range(2):
             try:
 
+                self.state.current[session] = "terminal"
                 self.state.shells[session].running = True
                 await self.state.shells[session].session.send_command(command)
 
@@ -226,6 +354,47 @@ class CodeExecution(Tool):
                 else:
                     raise e
 
+    async def kernel_session(self, session: int, kernel: str, code: str, prefix: str = ""):
+        wrap = self.state.kernels[(session, kernel)]  # type: ignore
+
+        await self.agent.handle_intervention()  # wait for intervention and handle it, if paused
+
+        # Check if the kernel is still busy and handle it
+        if not self.allow_running:
+            if response := await self.handle_running_session(session, kernel):
+                return response
+
+        request = json.dumps({"code": code})
+        try:
+            await wrap.session.send_command(request)
+        except Exception as e:
+            # lost connection, start a fresh kernel once
+            PrintStyle.error(str(e))
+            self.drop_kernel(session, kernel)
+            if not (wrap := await self.prepare_kernel(session, kernel)):
+                raise e
+            await wrap.session.send_command(request)
+        self.state.current[session] = kernel  # type: ignore
+        wrap.running = True
+
+        PrintStyle(
+            background_color="white", font_color="#1B4F72", bold=True
+        ).print(f"{self.agent.agent_name} code execution output ({kernel} kernel)")
+        start_time = time.time()
+        response = await self.get_terminal_output(session=session, prefix=prefix, timeouts=CODE_EXEC_TIMEOUTS)
+
+        if not wrap.running and not response.rstrip().endswith(KERNELS[kernel]["prompt"]):
+            # back at the shell prompt, the kernel exited and restarts on the next call
+            self.drop_kernel(session, kernel)
+        elif wrap.running and time.time() - start_time >= CODE_EXEC_TIMEOUTS["max_exec_timeout"]:
+            # hard cap reached, interrupt the cell so the kernel stays usable
+            await wrap.session.interrupt()
+            if await self.wait_for_kernel(wrap.session, kernel, KERNEL_INTERRUPT_TIMEOUT):
+                wrap.running = False
+            else:
+                self.drop_kernel(session, kernel)
+        return response
+
     def format_command_for_output(self, command: str):
         # truncate long commands
         short_cmd = command[:200]
@@ -245,13 +414,14 @@ class CodeExecution(Tool):
         between_output_timeout=15,  # Wait up to x seconds between outputs
         dialog_timeout=5,  # potential dialog detection timeout
         max_exec_timeout=180,  # hard cap on total runtime
-        sleep_time=0.1,
+        intervention_interval=0.25,  # max wait between intervention checks
         prefix="",
         timeouts: dict | None = None,
     ):
 
         # if not self.state:
-        self.state = await self.prepare_state(session=session)
+        self.state = await self.prepare_state(session=session, runtime=self.get_runtime(session))
+        shell = self.get_shell(session).session  # type: ignore
 
         # Override timeouts if a dict is provided
         if timeouts:
@@ -263,19 +433,32 @@ class CodeExecution(Tool):
         start_time = time.time()
         last_output_time = start_time
         full_output = ""
-        truncated_output = ""
+        output_tail = ""
         got_output = False
+        dialog_checked = False
 
         # if prefix, log right away
         if prefix:
             self.log.update(content=prefix)
 
         while True:
-            await asyncio.sleep(sleep_time)
-            full_output, partial_output = await self.state.shells[session].session.read_output(
-                timeout=1, reset_full_output=reset_full_output
-            )
-            reset_full_output = False  # only reset once
+            # sleep until output arrives or the nearest timeout is due
+            deadline = start_time + max_exec_timeout
+            if not got_output:
+                deadline = min(deadline, start_time + first_output_timeout)
+            else:
+                deadline = min(deadline, last_output_time + between_output_timeout)
+                if not dialog_checked:
+                    deadline = min(deadline, last_output_time + dialog_timeout)
+            wait = min(max(deadline - time.time(), 0), intervention_interval)
+            has_output = await shell.wait_for_output(timeout=wait)
+
+            partial_output = None
+            if has_output or reset_full_output:
+                full_output, partial_output = await shell.read_output(
+                    timeout=1, reset_full_output=reset_full_output
+                )
+                reset_full_output = False  # only reset once
 
             await self.agent.handle_intervention()
 
@@ -283,17 +466,17 @@ class CodeExecution(Tool):
             if partial_output:
                 PrintStyle(font_color="#85C1E9").stream(partial_output)
                 # full_output += partial_output # Append new output
-                truncated_output = self.fix_full_output(full_output)
-                self.set_progress(truncated_output)
-                heading = self.get_heading_from_output(truncated_output, 0)
-                self.log.update(content=prefix + truncated_output, heading=heading)
+                # each wake only cleans the trailing window, the whole output is cleaned once when returning
+                output_tail = self.fix_full_output(self.get_output_tail(full_output))
+                self.set_progress(full_output)
+                heading = self.get_heading_from_output(output_tail, 0)
+                self.log.update(content=prefix + full_output, heading=heading)
                 last_output_time = now
                 got_output = True
+                dialog_checked = False
 
                 # Check for shell prompt at the end of output
-                last_lines = (
-                    truncated_output.splitlines()[-3:] if truncated_output else []
-                )
+                last_lines = self.get_last_lines(output_tail, 3)
                 last_lines.reverse()
                 for idx, line in enumerate(last_lines):
                     for pat in self.prompt_patterns:
@@ -305,26 +488,27 @@ class CodeExecution(Tool):
                             heading = self.get_heading_from_output(
                                 "\n".join(last_lines), idx + 1, True
                             )
-                            self.log.update(heading=heading)
+                            truncated_output = self.fix_full_output(full_output)
+                            self.log.update(content=prefix + truncated_output, heading=heading)
                             self.mark_session_idle(session)
                             return truncated_output
 
             # Check for max execution time
-            if now - start_time > max_exec_timeout:
+            if now - start_time >= max_exec_timeout:
                 sysinfo = self.agent.read_prompt(
                     "fw.code.max_time.md", timeout=max_exec_timeout
                 )
                 response = self.agent.read_prompt("fw.code.info.md", info=sysinfo)
-                if truncated_output:
-                    response = truncated_output + "\n\n" + response
+                if full_output:
+                    response = self.fix_full_output(full_output) + "\n\n" + response
                 PrintStyle.warning(sysinfo)
-                heading = self.get_heading_from_output(truncated_output, 0)
+                heading = self.get_heading_from_output(output_tail, 0)
                 self.log.update(content=prefix + response, heading=heading)
                 return response
 
             # Waiting for first output
             if not got_output:
-                if now - start_time > first_output_timeout:
+                if now - start_time >= first_output_timeout:
                     sysinfo = self.agent.read_prompt(
                         "fw.code.no_out_time.md", timeout=first_output_timeout
                     )
@@ -334,24 +518,23 @@ class CodeExecution(Tool):
                     return response
             else:
                 # Waiting for more output after first output
-                if now - last_output_time > between_output_timeout:
+                if now - last_output_time >= between_output_timeout:
                     sysinfo = self.agent.read_prompt(
                         "fw.code.pause_time.md", timeout=between_output_timeout
                     )
                     response = self.agent.read_prompt("fw.code.info.md", info=sysinfo)
-                    if truncated_output:
-                        response = truncated_output + "\n\n" + response
+                    if full_output:
+                        response = self.fix_full_output(full_output) + "\n\n" + response
                     PrintStyle.warning(sysinfo)
-                    heading = self.get_heading_from_output(truncated_output, 0)
+                    heading = self.get_heading_from_output(output_tail, 0)
                     self.log.update(content=prefix + response, heading=heading)
                     return response
 
-                # potential dialog detection
-                if now - last_output_time > dialog_timeout:
+                # potential dialog detection, once per pause as the output has not changed since
+                if not dialog_checked and now - last_output_time >= dialog_timeout:
+                    dialog_checked = True
                     # Check for dialog prompt at the end of output
-                    last_lines = (
-                        truncated_output.splitlines()[-2:] if truncated_output else []
-                    )
+                    last_lines = self.get_last_lines(output_tail, 2)
                     for line in last_lines:
                         for pat in self.dialog_patterns:
                             if pat.search(line.strip()):
@@ -365,12 +548,10 @@ class CodeExecution(Tool):
                                 response = self.agent.read_prompt(
                                     "fw.code.info.md", info=sysinfo
                                 )
-                                if truncated_output:
-                                    response = truncated_output + "\n\n" + response
+                                if full_output:
+                                    response = self.fix_full_output(full_output) + "\n\n" + response
                                 PrintStyle.warning(sysinfo)
-                                heading = self.get_heading_from_output(
-                                    truncated_output, 0
-                                )
+                                heading = self.get_heading_from_output(output_tail, 0)
                                 self.log.update(
                                     content=prefix + response, heading=heading
                                 )
@@ -379,24 +560,22 @@ class CodeExecution(Tool):
     async def handle_running_session(
         self,
         session=0,
+        runtime: str | None = None,
         reset_full_output=True, 
         prefix=""
     ):
-        if not self.state or session not in self.state.shells:
-            return None
-        if not self.state.shells[session].running:
+        wrap = self.get_shell(session, runtime)
+        if not wrap or not wrap.running:
             return None
         
-        full_output, _ = await self.state.shells[session].session.read_output(
+        full_output, _ = await wrap.session.read_output(
             timeout=1, reset_full_output=reset_full_output
         )
         truncated_output = self.fix_full_output(full_output)
         self.set_progress(truncated_output)
-        heading = self.get_heading_from_output(truncated_output, 0)
+        heading = self.get_heading_from_output(self.get_output_tail(truncated_output), 0)
 
-        last_lines = (
-            truncated_output.splitlines()[-3:] if truncated_output else []
-        )
+        last_lines = self.get_last_lines(truncated_output, 3)
         last_lines.reverse()
         for idx, line in enumerate(last_lines):
             for pat in self.prompt_patterns:
@@ -404,7 +583,7 @@ class CodeExecution(Tool):
                     PrintStyle.info(
                         "Detected shell prompt, returning output early."
                     )
-                    self.mark_session_idle(session)
+                    wrap.running = False
                     return None
 
         has_dialog = False 
@@ -430,8 +609,8 @@ class CodeExecution(Tool):
     
     def mark_session_idle(self, session: int = 0):
         # Mark session as idle - command finished
-        if self.state and session in self.state.shells:
-            self.state.shells[session].running = False
+        if wrap := self.get_shell(session):
+            wrap.running = False
 
     async def reset_terminal(self, session=0, reason: str | None = None):
         # Print the reason for the reset to the console if provided
@@ -469,6 +648,13 @@ class CodeExecution(Tool):
 
         return self.get_heading() + done_icon
 
+    def get_output_tail(self, output: str) -> str:
+        # prompts, dialogs and headings only ever look at the end of the output
+        return output[-OUTPUT_TAIL_CHARS:]
+
+    def get_last_lines(self, output: str, count: int) -> list[str]:
+        return self.get_output_tail(output).splitlines()[-count:] if output else []
+
     def fix_full_output(self, output: str):
         # remove any single byte \xXX escapes
         output = re.sub(r"(?<!\\)\\x[0-9A-Fa-f]{2}", "", output)
@@ -0,0 +1,201 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import glob
+import time
+import pytest
+from types import SimpleNamespace
+
+from python.helpers import browser_pool
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+    async def evaluate(self, script):
+        if self.context.crashed:
+            raise RuntimeError("Target closed")
+        return 1
+
+    async def close(self):
+        self.context.pages.remove(self)
+
+
+class FakeContext:
+    browser = None
+
+    def __init__(self):
+        self.crashed = False
+        self.pages = []
+        self.pages.append(FakePage(self))
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+
+class FakeSession:
+    # stand-in for browser_use.BrowserSession with a slow launch
+    launches = 0
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.browser_context = FakeContext()
+        self.killed = False
+
+    async def kill(self):
+        self.killed = True
+
+
+async def launch(slot):
+    await asyncio.sleep(0.2)
+    FakeSession.launches += 1
+    return FakeSession(slot)
+
+
+@pytest.mark.asyncio
+async def test_browsers_are_reused():
+    pool = browser_pool.BrowserPool("test", launch)
+    first = await pool.acquire()
+    await first.browser_context.new_page()  # extra tab is closed on release
+    await pool.release(first)
+
+    start = time.monotonic()
+    second = await pool.acquire()
+    assert time.monotonic() - start < 0.1  # no launch
+    assert second is first
+    assert len(second.browser_context.pages) == 1
+    await pool.close()
+    assert first.killed
+
+
+@pytest.mark.asyncio
+async def test_fresh_lease_after_reset():
+    pool = browser_pool.BrowserPool("test", launch)
+    first = await pool.acquire()
+    await pool.release(first)
+
+    fresh = await pool.acquire(fresh=True)
+    assert fresh is not first and first.killed
+    assert fresh.slot == first.slot and len(pool._slots) == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_max_size_and_waiting():
+    pool = browser_pool.BrowserPool("test", launch, max_size=2)
+    a = await pool.acquire()
+    b = await pool.acquire()
+    assert a.slot != b.slot
+
+    waiting = asyncio.ensure_future(pool.acquire())
+    await asyncio.sleep(0.3)
+    assert not waiting.done()  # no third browser
+    await pool.release(b)
+    assert await asyncio.wait_for(waiting, 1) is b
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_crashed_browser_is_relaunched():
+    pool = browser_pool.BrowserPool("test", launch, max_size=1)
+    first = await pool.acquire()
+    await pool.release(first)
+    first.browser_context.crashed = True
+
+    second = await pool.acquire()
+    assert second is not first and first.killed
+    assert second.slot == first.slot  # same profile slot
+
+    # crashing while leased is detected on release
+    second.browser_context.crashed = True
+    await pool.release(second)
+    assert second.killed and not pool._slots
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_browsers_are_closed(tmp_path):
+    pool = browser_pool.BrowserPool("test", launch, idle_timeout=0.2)
+    session = await pool.acquire()
+    profile = tmp_path / "profile"
+    profile.mkdir()
+    session.browser_profile = SimpleNamespace(user_data_dir=str(profile))
+    await pool.release(session)
+    await asyncio.sleep(0.4)
+    assert session.killed and not pool._slots
+    assert not profile.exists()
+    await pool.close()
+
+
+def _find_chromium():
+    for pattern in (
+        os.path.expanduser("~/.cache/ms-playwright/chromium_headless_shell-*/chrome-*/headless_shell"),
+        os.path.expanduser("~/.cache/puppeteer/chrome-headless-shell/*/*/chrome-headless-shell"),
+        "/a0/tmp/playwright/chromium_headless_shell-*/chrome-*/headless_shell",
+    ):
+        found = glob.glob(pattern)
+        if found:
+            return found[0]
+    return None
+
+
+class PlaywrightSession:
+    # minimal session around a persistent playwright context, like browser_use uses
+    def __init__(self, playwright, context):
+        self.playwright = playwright
+        self.browser_context = context
+
+    async def kill(self):
+        try:
+            await self.browser_context.close()
+        finally:
+            await self.playwright.stop()
+
+
+@pytest.mark.asyncio
+async def test_headless_chromium_pool(tmp_path):
+    executable = _find_chromium()
+    if not executable:
+        pytest.skip("no headless chromium available")
+    async_api = pytest.importorskip("playwright.async_api")
+
+    page_path = tmp_path / "index.html"
+    page_path.write_text("<html><title>pooled</title><body>static page</body></html>")
+
+    async def launch_chromium(slot):
+        playwright = await async_api.async_playwright().start()
+        context = await playwright.chromium.launch_persistent_context(
+            str(tmp_path / f"profile_{slot}"), executable_path=executable, headless=True, args=["--no-sandbox"]
+        )
+        return PlaywrightSession(playwright, context)
+
+    pool = browser_pool.BrowserPool("test", launch_chromium, isolate=True)
+    try:
+        try:
+            session = await pool.acquire()
+        except Exception as e:
+            pytest.skip(f"headless chromium cannot start: {e}")
+        page = session.browser_context.pages[0] if session.browser_context.pages else await session.browser_context.new_page()
+        await page.goto(page_path.as_uri())
+        assert await page.title() == "pooled"
+        await pool.release(session)
+
+        start = time.monotonic()
+        reused = await pool.acquire()
+        assert reused is session
+        assert time.monotonic() - start < 2
+        assert reused.browser_context.pages[0].url == "about:blank"  # isolated between leases
+
+        # browser crash while leased, the next lease gets a new browser
+        await reused.browser_context.close()
+        await pool.release(reused)
+        relaunched = await pool.acquire()
+        assert relaunched is not reused
+        await pool.release(relaunched)
+    finally:
+        await pool.close()
@@ -0,0 +1,114 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from types import SimpleNamespace
+import pytest
+
+from python.helpers import files
+from python.helpers.log import Log
+from python.helpers.shell_local import LocalInteractiveSession
+from python.tools.code_execution_tool import CodeExecution, OUTPUT_TAIL_CHARS
+
+
+class FakeAgent:
+    agent_name = "A0"
+
+    def __init__(self):
+        self.config = SimpleNamespace(code_exec_ssh_enabled=False)
+        self.context = SimpleNamespace(id="kernel-test", log=Log(), get_data=lambda key: None)
+        self.data = {}
+
+    def get_data(self, key):
+        return self.data.get(key)
+
+    def set_data(self, key, value):
+        self.data[key] = value
+
+    async def handle_intervention(self):
+        pass
+
+    def read_prompt(self, file, **kwargs):
+        return f"{file} {kwargs}"
+
+
+def _tool(agent: FakeAgent, runtime: str) -> CodeExecution:
+    tool = CodeExecution(agent, "code_execution_tool", None, {"runtime": runtime}, "", None)  # type: ignore
+    tool.log = tool.get_log_object()
+    tool.allow_running = False
+    return tool
+
+
+@pytest.mark.asyncio
+async def test_python_kernel_keeps_state():
+    agent = FakeAgent()
+    tool = _tool(agent, "python")
+    try:
+        await tool.execute_python_code(0, "import json\nvalue = 40")
+        assert (0, "python") in tool.state.kernels  # type: ignore
+
+        start = time.monotonic()
+        response = await tool.execute_python_code(0, "value + 2")
+        assert time.monotonic() - start < 5  # no interpreter startup
+        assert "42" in response
+        assert response.rstrip().endswith("[python kernel] >>>")
+
+        response = await tool.execute_python_code(0, "print(json.dumps({'a': value}))")
+        assert '{"a": 40}' in response
+
+        # reading stdin must not consume the next request
+        response = await tool.execute_python_code(
+            0, "import subprocess\ntry:\n    input()\nexcept EOFError:\n    print('no input', subprocess.run(['cat']).returncode)"
+        )
+        assert "no input 0" in response
+        response = await tool.execute_python_code(0, "value + 1")
+        assert "41" in response
+
+        # reset restarts the kernel with a clean namespace
+        await tool.reset_terminal(0)
+        assert not tool.state.kernels  # type: ignore
+        response = await tool.execute_python_code(0, "'value' in dir()")
+        assert "False" in response
+    finally:
+        await tool.prepare_state(reset=True)
+
+
+@pytest.mark.asyncio
+async def test_nodejs_kernel_keeps_state():
+    agent = FakeAgent()
+    tool = _tool(agent, "nodejs")
+    try:
+        await tool.execute_nodejs_code(0, "let total = 40")
+        response = await tool.execute_nodejs_code(0, "total + await Promise.resolve(2)")
+        assert "42" in response
+        assert response.rstrip().endswith("[node kernel] >>>")
+    finally:
+        await tool.prepare_state(reset=True)
+
+
+@pytest.mark.asyncio
+async def test_terminal_output_cleans_only_the_tail():
+    agent = FakeAgent()
+    tool = _tool(agent, "terminal")
+    cleaned = []
+    fix_full_output = tool.fix_full_output
+    tool.fix_full_output = lambda output: cleaned.append(len(output)) or fix_full_output(output)  # type: ignore
+    try:
+        response = await tool.execute_terminal_command(
+            0, "for i in $(seq 1 3); do seq 1 20000; sleep 0.2; done; echo finished"
+        )
+        assert "finished" in response and "19999" in response
+        # every wake cleans at most the trailing window, the whole output once at the end
+        assert len(cleaned) > 1
+        assert all(size <= OUTPUT_TAIL_CHARS for size in cleaned[:-1])
+        assert cleaned[-1] > 100_000
+    finally:
+        await tool.prepare_state(reset=True)
+
+
+def test_shells_spill_into_the_leasing_chat():
+    shell = LocalInteractiveSession()
+    _tool(FakeAgent(), "terminal").setup_shell(shell)
+    folder = shell.output.spill_folder
+    assert folder and os.path.basename(os.path.dirname(folder)) == "kernel-test"
@@ -0,0 +1,104 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gc
+import threading
+import time
+import weakref
+from types import SimpleNamespace
+import pytest
+
+from python.helpers import files  # noqa: F401, import order avoids a circular import
+from python.helpers import context_eviction, persist_chat
+from agent import AgentContext
+from initialize import initialize_agent
+
+
+class FakeShell:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def contexts(tmp_path, monkeypatch):
+    monkeypatch.setattr(persist_chat, "CHATS_FOLDER", str(tmp_path / "chats"))
+    config = initialize_agent()
+    created = []
+    for i in range(3):
+        context = AgentContext(config=config, name=f"Chat {i}")
+        for j in range(20):
+            context.log.log(type="user", heading=f"Message {j}", content="text " * 20)
+        context.last_access = time.monotonic() - 1000 + i  # oldest first
+        created.append(context)
+    yield created
+    for context in created:
+        AgentContext.remove(context.id)
+
+
+def test_evicts_least_recently_used_and_rehydrates(contexts):
+    oldest, middle, newest = contexts
+    shell = FakeShell()
+    oldest.Delta.set_data("_cet_state", SimpleNamespace(shells={0: SimpleNamespace(session=shell)}, kernels={}))
+    oldest.run_task(lambda: _noop()).result_sync()
+    output = oldest.output()
+    log = weakref.ref(oldest.log)
+    oldest.last_access = time.monotonic() - 1000  # used above
+    middle.last_access = oldest.last_access - 1
+    stats = context_eviction.stats.evictions, context_eviction.stats.rehydrations
+
+    # a running chat is kept even when it is the least recently used
+    middle.task = SimpleNamespace(is_alive=lambda: True)  # type: ignore[assignment]
+    evicted = context_eviction.evict_idle(max_loaded=len(AgentContext.all()) - 1, idle_timeout=10_000)
+    middle.task = None
+    assert evicted == [oldest.id] and oldest.id in AgentContext._contexts
+    assert not oldest.is_loaded and middle.is_loaded and newest.is_loaded
+    assert oldest.output() == output
+    gc.collect()
+    assert log() is None  # log and agents released
+    deadline = time.monotonic() + 5
+    while not shell.closed and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert shell.closed
+
+    # first use loads the chat again from disk
+    assert len(oldest.log.logs) == 21 and oldest.is_loaded
+    assert oldest.log.logs[-1].heading == "Message 19"
+    assert context_eviction.stats.evictions == stats[0] + 1
+    assert context_eviction.stats.rehydrations == stats[1] + 1
+
+
+def test_recently_used_chats_stay_loaded(contexts):
+    for context in contexts:
+        context.last_access = time.monotonic()
+    assert context_eviction.evict_idle(max_loaded=0, idle_timeout=10_000) == []
+
+    # idle timeout applies below the cap
+    contexts[0].last_access = time.monotonic() - 120
+    assert context_eviction.evict_idle(max_loaded=100, idle_timeout=100) == [contexts[0].id]
+    assert context_eviction.get_stats()["loaded"] == sum(ctx.is_loaded for ctx in AgentContext.all())
+
+
+async def _noop():
+    pass
+
+
+def test_use_while_saving_keeps_chat_loaded(contexts):
+    context = contexts[0]
+    agent = context.Delta
+    used = []
+    threads = []
+
+    def save(ctx):
+        persist_chat.save_tmp_chat(ctx)
+        # another thread sends a message while the chat is written to disk
+        threads.append(threading.Thread(target=lambda: used.append(ctx.Delta)))
+        threads[0].start()
+        time.sleep(0.2)
+
+    assert context.unload(persist_chat.load_tmp_chat, save) is None
+    threads[0].join()
+    assert used == [agent] and context.is_loaded and context.Delta is agent
@@ -0,0 +1,134 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import numpy as np
+import pytest
+
+from python.helpers.document_index import DocumentIndex
+
+
+def chunks(count, size=100):
+    return [("x" * size, {"document_uri": "file:///doc", "chunk_index": i}) for i in range(count)]
+
+
+def test_put_and_get_by_version(tmp_path):
+    index = DocumentIndex(str(tmp_path))
+    vectors = np.random.rand(3, 8).astype(np.float32)
+    index.put("file:///doc", "model", "sha256:1", chunks(3), vectors)
+
+    found = index.get("file:///doc", "model", "sha256:1")
+    assert found and len(found.chunks) == 3
+    assert found.chunks[2][1]["chunk_index"] == 2
+    assert np.array_equal(found.embeddings, vectors)
+
+    # changed content, other embedding model
+    assert index.get("file:///doc", "model", "sha256:2") is None
+    assert index.get("file:///doc", "other", "sha256:1") is None
+
+    # a new index on the same folder sees the stored document, as after a restart
+    assert DocumentIndex(str(tmp_path)).get("file:///doc", "model", "sha256:1")
+
+
+def test_least_recently_used_documents_are_evicted(tmp_path):
+    vectors = np.zeros((2, 16), dtype=np.float32)
+    index = DocumentIndex(str(tmp_path))
+    index.put("a", "model", "v", chunks(2), vectors)
+    index.max_size = index.get_size() * 3  # room for three documents
+    for name in ["b", "c"]:
+        index.put(name, "model", "v", chunks(2), vectors)
+    assert index.get("a", "model", "v")  # a is now more recent than b
+
+    index.put("d", "model", "v", chunks(2), vectors)
+    assert index.get("b", "model", "v") is None
+    assert all(index.get(name, "model", "v") for name in ["a", "c", "d"])
+    assert index.get_size() <= index.max_size
+
+
+def test_concurrent_readers_and_writer(tmp_path):
+    index = DocumentIndex(str(tmp_path))
+    vectors = np.ones((50, 32), dtype=np.float32)
+    index.put("doc", "model", "v", chunks(50), vectors)
+    errors = []
+
+    def read():
+        try:
+            for _ in range(20):
+                found = index.get("doc", "model", "v")
+                assert found and found.embeddings.shape == (50, 32)
+        except Exception as e:
+            errors.append(e)
+
+    def write():
+        try:
+            for i in range(20):
+                index.put(f"other{i}", "model", "v", chunks(5), vectors[:5])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(4)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+class WordEmbeddings:
+    model_name = "document_index_test"
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+@pytest.mark.asyncio
+async def test_store_reuses_indexed_document(tmp_path, monkeypatch):
+    from langchain_core.embeddings import Embeddings
+    from python.helpers import document_index
+    from python.helpers.document_query import DocumentQueryStore
+
+    class Model(WordEmbeddings, Embeddings):
+        pass
+
+    model = Model()
+
+    class FakeAgent:
+        config = True
+
+        def get_embedding_model(self):
+            return model
+
+    monkeypatch.setattr(document_index, "_index", DocumentIndex(str(tmp_path / "index")))
+    path = tmp_path / "report.txt"
+    path.write_text("report text " * 500)
+    uri = f"file://{path}"
+
+    first = DocumentQueryStore(FakeAgent())  # type: ignore[arg-type]
+    assert not await first.document_exists(uri)
+    await first.add_document(path.read_text(), uri)
+    calls = model.calls
+
+    second = DocumentQueryStore(FakeAgent())  # type: ignore[arg-type]
+    assert await second.document_exists(uri)
+    assert model.calls == calls  # nothing embedded again
+    doc = await second.get_document(uri)
+    assert doc and "report text" in doc.page_content
+
+    path.write_text("changed")
+    assert not await DocumentQueryStore(FakeAgent()).document_exists(uri)  # type: ignore[arg-type]
+
+    # deleting removes the indexed version too
+    path.write_text("report text " * 500)
+    store = DocumentQueryStore(FakeAgent())  # type: ignore[arg-type]
+    assert await store.document_exists(uri)
+    assert await store.delete_document(uri)
+    assert not document_index.get_index().get(uri, store._get_index_model(), await store._get_version(uri))
+    assert not await DocumentQueryStore(FakeAgent()).document_exists(uri)  # type: ignore[arg-type]
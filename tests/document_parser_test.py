@@ -0,0 +1,70 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import pytest
+
+from python.helpers import document_parser
+
+fitz = pytest.importorskip("fitz")
+
+
+def create_pdf(path, pages, lines=1):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        text = "\n".join(f"page {number} line {line} some words to extract" for line in range(lines))
+        page.insert_text((40, 40), text, fontsize=6)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_pages_are_parsed_in_order(tmp_path):
+    path = create_pdf(tmp_path / "doc.pdf", 20)
+    progress = []
+    contents = await document_parser.parse_pdf(path, progress=progress.append)
+
+    positions = [contents.index(f"page {number} line 0") for number in range(20)]
+    assert positions == sorted(positions)
+    assert progress[-1] == "Parsed 20 of 20 pages"
+    assert len(progress) == 3  # one update per shard of PAGES_PER_SHARD pages
+
+
+@pytest.mark.asyncio
+async def test_intervention_cancels_parsing(tmp_path):
+    path = create_pdf(tmp_path / "doc.pdf", 40)
+    checks = 0
+
+    async def check():
+        nonlocal checks
+        checks += 1
+        if checks > 2:
+            raise InterruptedError("intervention")
+
+    with pytest.raises(InterruptedError):
+        await document_parser.parse_pdf(path, check=check)
+
+    # the pool is still usable afterwards
+    assert "page 0 line 0" in await document_parser.parse_pdf(path)
+
+
+@pytest.mark.asyncio
+async def test_parallel_parsing_is_faster(tmp_path):
+    if (os.cpu_count() or 1) < 2:
+        pytest.skip("needs several cores")
+    path = create_pdf(tmp_path / "big.pdf", 96, lines=80)
+    await document_parser.parse_pdf(create_pdf(tmp_path / "warm.pdf", 1))  # start workers
+
+    start = time.monotonic()
+    serial = "\n".join(document_parser._parse_pdf_pages(path, 0, 96))
+    serial_time = time.monotonic() - start
+
+    start = time.monotonic()
+    parallel = await document_parser.parse_pdf(path)
+    parallel_time = time.monotonic() - start
+
+    assert parallel == serial
+    assert parallel_time < serial_time / 1.3
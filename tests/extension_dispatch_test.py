@@ -0,0 +1,33 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from python.helpers import extension
+
+
+@pytest.mark.asyncio
+async def test_dispatch_table_is_reused():
+    await extension.call_extensions("response_stream_chunk", stream_data={"chunk": "a", "full": "a"})
+    table = extension._get_dispatch_table("response_stream_chunk", "")
+    instance = table.get_instance(table.classes[0], None)
+    await extension.call_extensions("response_stream_chunk", stream_data={"chunk": "b", "full": "ab"})
+
+    assert extension._get_dispatch_table("response_stream_chunk", "") is table
+    assert table.get_instance(table.classes[0], None) is instance  # stateless, reused
+    timing = extension.get_extension_timings()["response_stream_chunk/_10_mask_stream"]
+    assert timing.calls >= 2
+
+
+def test_independent_extensions_are_grouped():
+    class A(extension.Extension):
+        independent = True
+
+    class B(extension.Extension):
+        independent = True
+
+    class C(extension.Extension):
+        pass
+
+    assert extension._group_steps([A, B, C, A]) == [[A, B], [C], [A]]
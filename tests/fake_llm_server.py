@@ -0,0 +1,139 @@
+"""
+Minimal local stand-in for LLM provider endpoints (OpenAI and Anthropic style).
+Records incoming requests and replays queued responses, used by model tests.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+def openai_stream(text: str, usage: dict | None = None) -> list[dict]:
+    chunks: list[dict] = [
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "test",
+            "choices": [{"index": 0, "delta": {"role": "assistant", "content": text}, "finish_reason": None}],
+        },
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "test",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        },
+    ]
+    if usage:
+        chunks.append(
+            {
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "test",
+                "choices": [],
+                "usage": usage,
+            }
+        )
+    return chunks
+
+
+def anthropic_stream(text: str, usage: dict | None = None) -> list[tuple[str, dict]]:
+    usage = {"input_tokens": 10, "output_tokens": 1, **(usage or {})}
+    return [
+        ("message_start", {
+            "type": "message_start",
+            "message": {
+                "id": "msg_test", "type": "message", "role": "assistant", "model": "test",
+                "content": [], "stop_reason": None, "stop_sequence": None, "usage": usage,
+            },
+        }),
+        ("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}),
+        ("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}}),
+        ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 5}}),
+        ("message_stop", {"type": "message_stop"}),
+    ]
+
+
+class FakeLLMServer:
+    """Queue responses with add_* methods, then point api_base at self.url."""
+
+    def __init__(self):
+        self.requests: list[dict[str, Any]] = []
+        self._responses: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                body = self.rfile.read(length) if length else b""
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    payload = {}
+                with server._lock:
+                    server.requests.append({"path": self.path, "headers": dict(self.headers), "json": payload})
+                    response = server._responses.pop(0) if server._responses else {"kind": "error", "status": 500, "headers": {}, "body": {"error": {"message": "no response queued"}}}
+                self._send(response)
+
+            def _send(self, response: dict[str, Any]):
+                if response["kind"] == "error":
+                    data = json.dumps(response["body"]).encode()
+                    self.send_response(response["status"])
+                    for key, value in response["headers"].items():
+                        self.send_header(key, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                lines: list[str] = []
+                if response["kind"] == "anthropic":
+                    for event, data in response["events"]:
+                        lines.append(f"event: {event}\ndata: {json.dumps(data)}\n\n")
+                else:
+                    for data in response["events"]:
+                        lines.append(f"data: {json.dumps(data)}\n\n")
+                    lines.append("data: [DONE]\n\n")
+                data = "".join(lines).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_openai_stream(self, text: str, usage: dict | None = None):
+        self._responses.append({"kind": "openai", "events": openai_stream(text, usage)})
+
+    def add_anthropic_stream(self, text: str, usage: dict | None = None):
+        self._responses.append({"kind": "anthropic", "events": anthropic_stream(text, usage)})
+
+    def add_error(self, status: int, headers: dict[str, str] | None = None, message: str = "error"):
+        self._responses.append(
+            {"kind": "error", "status": status, "headers": headers or {}, "body": {"error": {"message": message, "type": "error"}}}
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,127 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import pytest
+
+from python.helpers import files  # noqa: F401, import order avoids a circular import
+import faiss
+from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+from python.helpers import knowledge_import, memory
+from python.helpers.memory import Memory, MyFaiss
+
+FILES = 2000
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    knowledge = tmp_path / "knowledge"
+    for i in range(FILES):
+        folder = knowledge / "main" / f"part{i % 20}"
+        folder.mkdir(parents=True, exist_ok=True)
+        ext = "md" if i % 2 else "txt"
+        (folder / f"note{i}.{ext}").write_text(f"note {i} about topic {i % 7}")
+    monkeypatch.setattr(memory, "abs_db_dir", lambda subdir: str(tmp_path / "db"))
+    monkeypatch.setattr(
+        memory, "abs_knowledge_dir", lambda subdir, *sub: str(knowledge.joinpath(*sub))
+    )
+    return knowledge
+
+
+def create_memory():
+    embeddings = CountingEmbeddings()
+    db = MyFaiss(
+        embedding_function=embeddings,
+        index=faiss.IndexFlatIP(2),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.COSINE,
+    )
+    mem = Memory(db, "knowledge_test")
+    mem.saves = 0  # type: ignore[attr-defined]
+
+    def save():
+        mem.saves += 1  # type: ignore[attr-defined]
+
+    mem._save_db = save  # type: ignore[method-assign]
+    return mem, embeddings
+
+
+def contents(mem, knowledge):
+    return {
+        doc.metadata["source_path"]: doc.page_content
+        for doc in mem.db.get_all_docs().values()
+        if doc.metadata["source_path"].startswith(str(knowledge))
+    }
+
+
+async def preload(mem):
+    updates = []
+    progress = knowledge_import.ImportProgress(callback=lambda p: updates.append(p.inserted))
+    await mem.preload_knowledge(None, ["test"], "knowledge_test", progress)
+    assert knowledge_import.get_progress("knowledge_test") is progress
+    return progress, updates
+
+
+@pytest.mark.asyncio
+async def test_incremental_import(corpus, monkeypatch):
+    mem, embeddings = create_memory()
+    progress, updates = await preload(mem)
+
+    assert progress.done and progress.failed == 0
+    assert progress.changed == progress.loaded == progress.files >= FILES
+    assert progress.inserted == progress.documents == len(mem.db.get_all_docs())
+    assert len(contents(mem, corpus)) == FILES
+    # embedded and saved once per batch, progress reported while inserting
+    batches = -(-progress.documents // memory.KNOWLEDGE_BATCH_SIZE)
+    assert embeddings.calls == mem.saves == batches  # type: ignore[attr-defined]
+    assert len(set(updates)) > batches
+
+    # nothing changed, files are not even hashed
+    hashed = []
+    checksum = knowledge_import.calculate_checksum
+    monkeypatch.setattr(
+        knowledge_import, "calculate_checksum", lambda path: hashed.append(path) or checksum(path)
+    )
+    ids = set(mem.db.get_all_docs())
+    progress, _ = await preload(mem)
+    assert hashed == [] and progress.changed == progress.loaded == 0
+    assert set(mem.db.get_all_docs()) == ids
+    assert embeddings.calls == batches
+
+    # edit, touch without changes and remove some files
+    edited = [corpus / "main" / "part1" / "note1.md", corpus / "main" / "part2" / "note2.txt"]
+    for path in edited:
+        path.write_text("edited note")
+    touched = corpus / "main" / "part3" / "note3.md"
+    os.utime(touched, (1, 1))
+    removed = corpus / "main" / "part4" / "note4.txt"
+    removed.unlink()
+
+    progress, _ = await preload(mem)
+    assert sorted(hashed) == sorted(str(path) for path in edited + [touched])
+    assert progress.changed == progress.loaded == 2 and progress.removed == 1
+    docs = contents(mem, corpus)
+    assert len(docs) == FILES - 1 and str(removed) not in docs
+    assert all(docs[str(path)] == "edited note" for path in edited)
+    assert len(mem.db.get_all_docs()) == len(ids) - 1
+
+    saved = json.loads((corpus.parent / "db" / "knowledge_import.json").read_text())
+    assert set(saved[str(edited[0])]) == {"file", "checksum", "ids", "mtime", "size"}
+    assert str(removed) not in saved
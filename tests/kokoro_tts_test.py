@@ -0,0 +1,73 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import base64
+import io
+import time
+import pytest
+
+from python.helpers import files  # noqa: F401, import order avoids a circular import
+
+sf = pytest.importorskip("soundfile")
+pytest.importorskip("kokoro")
+
+from python.helpers import kokoro_tts
+
+TEXT = " ".join(
+    f"This is sentence number {i} of a long answer that is read aloud." for i in range(8)
+)
+
+
+def test_split_sentences():
+    assert kokoro_tts.split_sentences(["One. Two!\nThree?  ", " "]) == ["One.", "Two!", "Three?"]
+    assert len(kokoro_tts.split_sentences([TEXT])) == 8
+
+
+@pytest.mark.asyncio
+async def test_time_to_first_audio():
+    try:
+        await kokoro_tts.preload()
+    except Exception as e:
+        pytest.skip(f"kokoro model not available: {e}")
+
+    start = time.perf_counter()
+    full = await kokoro_tts.synthesize_sentences([TEXT])
+    full_seconds = time.perf_counter() - start
+
+    # ticks of the event loop while the worker synthesizes
+    gaps = []
+
+    async def tick():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    def read(stream):
+        # read like the streamed synthesize response, on a server thread
+        for audio in stream:
+            arrivals.append(time.perf_counter() - start)
+            parts.append(sf.read(io.BytesIO(base64.b64decode(audio)))[0])
+
+    ticker = asyncio.create_task(tick())
+    start = time.perf_counter()
+    arrivals = []
+    parts = []
+    await asyncio.to_thread(read, await kokoro_tts.open_stream([TEXT]))
+    ticker.cancel()
+
+    print(
+        f"\n8 sentences: first audio after {arrivals[0]:.2f}s, "
+        f"last {arrivals[-1]:.2f}s, whole text {full_seconds:.2f}s, "
+        f"longest loop stall {max(gaps) * 1000:.0f} ms"
+    )
+    assert len(parts) == 8
+    assert arrivals[0] * 3 < full_seconds
+    assert max(gaps) < 0.25
+    # streamed sentences add up to the same audio as the whole text
+    full_samples = len(sf.read(io.BytesIO(base64.b64decode(full)))[0])
+    assert abs(sum(len(part) for part in parts) - full_samples) < kokoro_tts.SAMPLE_RATE
@@ -0,0 +1,166 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import re
+import pytest
+
+from python.helpers import files  # noqa: F401, import order avoids a circular import
+import faiss
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+from python.helpers.memory import Memory, MyFaiss
+from python.helpers.memory_consolidation import create_memory_consolidator
+
+TOPICS = ["python", "docker", "git", "cooking"]
+AREA = Memory.Area.FRAGMENTS.value
+
+EXISTING = {
+    "mem_python": "python venv setup",
+    "mem_docker": "docker compose network",
+    "mem_git": "git rebase flow",
+}
+
+NEW = [
+    "python packaging tip merge",
+    "docker volume hint keep",
+    "cooking pasta note",
+    "python venv activation merge",
+    "git hooks update",
+]
+
+
+class TopicEmbeddings(Embeddings):
+    # texts about the same topic are identical vectors, other topics are orthogonal
+    def embed_query(self, text):
+        return [1.0 if topic in text else 0.0 for topic in TOPICS] + [0.001]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class FakeAgent:
+    def __init__(self):
+        self.calls = []
+
+    def read_prompt(self, file, **kwargs):
+        return json.dumps({"prompt": file, **kwargs})
+
+    async def call_utility_model(self, system, message, callback=None, background=False):
+        request = json.loads(message)
+        prompt = request["prompt"]
+        self.calls.append(prompt)
+        if prompt == "memory.keyword_extraction.msg.md":
+            return json.dumps(self._keywords(request["memory_content"]))
+        if prompt == "memory.keyword_extraction_batch.msg.md":
+            memories = re.split(r"### Memory \d+\n", request["memories"])[1:]
+            return json.dumps([self._keywords(memory) for memory in memories])
+        if prompt == "memory.consolidation.msg.md":
+            return json.dumps(self._decide(request["new_memory"], request["similar_memories"]))
+        raise AssertionError(prompt)
+
+    def _keywords(self, memory):
+        return [topic for topic in TOPICS if topic in memory]
+
+    def _decide(self, new_memory, similar_text):
+        similar = re.findall(r"ID: (\S+)\nTimestamp: .*\nContent: (.*)", similar_text)
+        ids = [id for id, _ in similar]
+        contents = sorted(content for _, content in similar)
+        if "merge" in new_memory:
+            return {
+                "action": "merge",
+                "memories_to_remove": ids,
+                "new_memory_content": " + ".join([new_memory] + contents),
+            }
+        if "keep" in new_memory:
+            return {"action": "keep_separate", "new_memory_content": new_memory}
+        if "update" in new_memory:
+            return {
+                "action": "update",
+                "memories_to_update": [{"id": ids[0], "new_content": f"{contents[0]} / {new_memory}"}],
+                "new_memory_content": "",
+            }
+        return {"action": "skip"}
+
+
+def create_memory():
+    db = MyFaiss(
+        embedding_function=TopicEmbeddings(),
+        index=faiss.IndexFlatIP(len(TOPICS) + 1),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.COSINE,
+        relevance_score_fn=Memory._cosine_normalizer,
+    )
+    db.add_documents(
+        [Document(text, metadata={"id": id, "area": AREA, "timestamp": "2026-01-01 00:00:00"}) for id, text in EXISTING.items()],
+        ids=list(EXISTING),
+    )
+    memory = Memory(db, "test")
+    memory.saves = 0  # type: ignore[attr-defined]
+
+    def save():
+        memory.saves += 1  # type: ignore[attr-defined]
+
+    memory._save_db = save  # type: ignore[method-assign]
+    return memory
+
+
+def contents(memory):
+    return sorted(doc.page_content for doc in memory.db.get_all_docs().values())
+
+
+async def consolidate(monkeypatch, batch):
+    memory = create_memory()
+
+    async def get(agent):
+        return memory
+
+    monkeypatch.setattr(Memory, "get", staticmethod(get))
+    agent = FakeAgent()
+    consolidator = create_memory_consolidator(agent, max_similar_memories=8, max_llm_context_memories=4)  # type: ignore[arg-type]
+    if batch:
+        results = await consolidator.process_new_memories(NEW, AREA, {"area": AREA})
+    else:
+        results = [await consolidator.process_new_memory(text, AREA, {"area": AREA}) for text in NEW]
+    return memory, agent, results
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_serial(monkeypatch):
+    serial, serial_agent, serial_results = await consolidate(monkeypatch, batch=False)
+    batch, batch_agent, batch_results = await consolidate(monkeypatch, batch=True)
+
+    assert contents(batch) == contents(serial)
+    assert [result["success"] for result in batch_results] == [result["success"] for result in serial_results]
+    assert "python packaging tip merge" not in contents(batch)
+    assert "python venv activation merge + python packaging tip merge + python venv setup" in contents(batch)
+    assert "git rebase flow / git hooks update" in contents(batch)
+
+    # one keyword call and one save for the whole batch
+    assert batch_agent.calls.count("memory.keyword_extraction_batch.msg.md") == 1
+    assert "memory.keyword_extraction.msg.md" not in batch_agent.calls
+    assert batch.saves == 1  # type: ignore[attr-defined]
+    assert serial.saves > len(NEW)  # type: ignore[attr-defined]
+
+
+@pytest.mark.asyncio
+async def test_batch_keyword_fallback(monkeypatch):
+    # a malformed batch answer falls back to one keyword call per memory
+    original = FakeAgent.call_utility_model
+
+    async def call_utility_model(self, system, message, callback=None, background=False):
+        if json.loads(message)["prompt"] == "memory.keyword_extraction_batch.msg.md":
+            self.calls.append("batch")
+            return "[]"
+        return await original(self, system, message, callback, background)
+
+    monkeypatch.setattr(FakeAgent, "call_utility_model", call_utility_model)
+    serial, _, _ = await consolidate(monkeypatch, batch=False)
+    batch, agent, _ = await consolidate(monkeypatch, batch=True)
+    assert contents(batch) == contents(serial)
+    assert agent.calls.count("memory.keyword_extraction.msg.md") == len(NEW)
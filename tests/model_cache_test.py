@@ -0,0 +1,57 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import models
+from python.helpers import settings
+from tests.fake_llm_server import FakeLLMServer
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    models.clear_model_cache()
+    yield
+    models.clear_model_cache()
+
+
+def test_instances_are_reused():
+    config = models.ModelConfig(type=models.ModelType.CHAT, provider="openai", name="gpt-test")
+    a = models.get_chat_model("openai", "gpt-test", model_config=config, api_key="x", temperature=0)
+    b = models.get_chat_model("OpenAI", "gpt-test", model_config=config, temperature=0, api_key="x")
+    c = models.get_chat_model("openai", "gpt-test", model_config=config, api_key="x", temperature=1)
+    assert a is b
+    assert a is not c
+
+
+def test_settings_change_invalidates(monkeypatch):
+    a = models.get_chat_model("openai", "gpt-test", api_key="x")
+    monkeypatch.setattr(settings, "_settings_revision", settings.get_settings_revision() + 1)
+    b = models.get_chat_model("openai", "gpt-test", api_key="x")
+    assert a is not b
+
+
+def test_cache_is_bounded():
+    for i in range(models.MAX_CACHED_MODELS + 5):
+        models.get_chat_model("openai", f"gpt-{i}", api_key="x")
+    assert len(models._model_cache) == models.MAX_CACHED_MODELS
+
+
+@pytest.mark.asyncio
+async def test_round_robin_keys_with_cached_instance(monkeypatch):
+    monkeypatch.setenv("API_KEY_OPENAI", "key-a,key-b")
+    monkeypatch.setitem(models.api_keys_round_robin, "openai", -1)
+
+    async def callback(chunk: str, full: str):
+        pass
+
+    with FakeLLMServer() as server:
+        for _ in range(3):
+            server.add_openai_stream("ok")
+            model = models.get_chat_model("openai", "gpt-test", api_base=server.url + "/v1")
+            await model.unified_call(user_message="hi", response_callback=callback)
+
+    assert len(models._model_cache) == 1
+    keys = [{k.lower(): v for k, v in r["headers"].items()}["authorization"] for r in server.requests]
+    assert keys == ["Bearer key-a", "Bearer key-b", "Bearer key-a"]
@@ -0,0 +1,113 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from python.helpers import files
+from python.helpers import persist_chat
+from agent import AgentContext
+from initialize import initialize_agent
+
+CHATS = 500
+
+
+@pytest.fixture
+def chats(tmp_path, monkeypatch):
+    # synthetic chats with a long log and history, saved as by older versions
+    monkeypatch.setattr(persist_chat, "CHATS_FOLDER", str(tmp_path / "chats"))
+    context = AgentContext(config=initialize_agent())
+    for i in range(40):
+        context.log.log(type="user", heading=f"Message {i}", content="log text " * 50)
+        context.Delta.history.add_message(ai=bool(i % 2), content="history text " * 50)
+    data = persist_chat._serialize_context(context)
+    AgentContext.remove(context.id)
+
+    ids = [f"chat{i:03}" for i in range(CHATS)]
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i, ctxid in enumerate(ids):
+        data.update(id=ctxid, name=f"Chat {i}", last_message=(start + timedelta(minutes=i)).isoformat())
+        path = persist_chat._get_chat_file_path(ctxid)
+        files.make_dirs(path)
+        files.write_file(path, json.dumps(data))
+    yield ids
+    for ctxid in ids:
+        AgentContext.remove(ctxid)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return seconds, memory
+
+
+def test_lazy_startup(chats):
+    persist_chat.load_tmp_chats(prefetch=0)  # writes the index of each chat once
+    for ctxid in chats:
+        AgentContext.remove(ctxid)
+
+    lazy_seconds, lazy_memory = measure(lambda: persist_chat.load_tmp_chats(prefetch=0))
+    contexts = [AgentContext.get(ctxid) for ctxid in chats]
+    assert all(ctx and not ctx.is_loaded for ctx in contexts)
+    outputs = [ctx.output() for ctx in contexts]  # type: ignore[union-attr]
+
+    loaded_seconds, loaded_memory = measure(lambda: [ctx.load() for ctx in contexts])  # type: ignore[union-attr]
+    print(
+        f"\n{CHATS} chats: index {lazy_seconds:.2f}s {lazy_memory / 2**20:.1f} MiB, "
+        f"loading all {loaded_seconds:.2f}s {loaded_memory / 2**20:.1f} MiB"
+    )
+    assert lazy_seconds < loaded_seconds
+    assert lazy_memory * 5 < loaded_memory
+
+    # stubs showed the same list entries as loaded chats
+    assert [ctx.output() for ctx in contexts] == outputs  # type: ignore[union-attr]
+    assert len(contexts[0].log.logs) == 41  # type: ignore[union-attr]
+    assert "history text" in contexts[0].Delta.history.output_text()  # type: ignore[union-attr]
+
+
+def test_load_on_access_and_prefetch(chats):
+    persist_chat.load_tmp_chats(prefetch=3)
+    recent = [AgentContext.get(ctxid) for ctxid in chats[-3:]]
+    deadline = time.monotonic() + 60
+    while not all(ctx.is_loaded for ctx in recent) and time.monotonic() < deadline:  # type: ignore[union-attr]
+        time.sleep(0.1)
+    assert all(ctx.is_loaded for ctx in recent)  # type: ignore[union-attr]
+
+    context = AgentContext.get(chats[0])
+    assert context and not context.is_loaded
+    # changes made before loading survive it and are saved to the index
+    context.name = "Renamed"
+    context.set_data("project", "demo")
+    assert context.get_agent().number == 0 and context.is_loaded
+    assert context.get_data("project") == "demo"
+    persist_chat.save_tmp_chat(context)
+    index = json.loads(files.read_file(persist_chat._get_chat_index_path(context.id)))
+    assert index["name"] == "Renamed" and index["data"]["project"] == "demo"
+    assert sum(ctx.is_loaded for ctx in AgentContext.all() if ctx.id in chats) == 4
+
+
+def test_ctx_window_survives_reload(tmp_path, monkeypatch):
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    monkeypatch.setattr(persist_chat, "CHATS_FOLDER", str(tmp_path / "chats"))
+    context = AgentContext(config=initialize_agent())
+    agent = context.Delta
+    agent.set_data(agent.DATA_NAME_CTX_WINDOW_PROMPT, [SystemMessage(content="system"), HumanMessage(content="hello")])
+    persist_chat.save_tmp_chat(context)
+    assert agent.DATA_NAME_CTX_WINDOW not in agent.data  # saving does not format the prompt
+    window = agent.get_ctx_window()
+    AgentContext.remove(context.id)
+
+    restored = persist_chat._deserialize_context(
+        json.loads(files.read_file(persist_chat._get_chat_file_path(context.id)))
+    )
+    assert restored.Delta.get_ctx_window() == window and "hello" in window["text"]  # type: ignore[index]
+    AgentContext.remove(restored.id)
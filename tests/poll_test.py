@@ -0,0 +1,121 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import time
+import pytest
+
+from python.helpers import files  # noqa: F401, import order avoids a circular import
+
+pytest.importorskip("flask")
+
+from python.helpers import task_scheduler
+from python.helpers.task_scheduler import SchedulerTaskList, TaskScheduler
+from python.api.poll import Poll
+from agent import AgentContext
+from initialize import initialize_agent
+
+CONTEXTS = 200
+CLIENTS = 5
+POLLS = 20
+
+
+@pytest.fixture
+def contexts(tmp_path, monkeypatch):
+    monkeypatch.setattr(task_scheduler, "SCHEDULER_FOLDER", str(tmp_path / "scheduler"))
+    monkeypatch.setattr(TaskScheduler, "_instance", None)
+    monkeypatch.setattr(SchedulerTaskList, "_SchedulerTaskList__instance", None)
+    config = initialize_agent()
+    created = []
+    for i in range(CONTEXTS):
+        context = AgentContext(config=config, name=f"Chat {i}")
+        for j in range(5):
+            context.log.log(type="user", heading=f"Message {j}", content="text " * 20)
+        created.append(context)
+    yield created
+    for context in created:
+        AgentContext.remove(context.id)
+
+
+def poll(handler: Poll, **input) -> dict:
+    return asyncio.run(handler.process({"timezone": "UTC", **input}, None))  # type: ignore[arg-type]
+
+
+def next_input(context: AgentContext, response: dict) -> dict:
+    return {
+        "context": context.id,
+        "log_from": response.get("log_version", 0),
+        "notifications_from": response.get("notifications_version", 0),
+        "versions": response["versions"],
+    }
+
+
+def test_only_changes_are_sent(contexts, monkeypatch):
+    handler = Poll(app=None, thread_lock=threading.Lock())  # type: ignore[arg-type]
+    selected = contexts[0]
+    first = poll(handler, context=selected.id)
+    assert first["logs"][-1]["heading"] == "Message 4" and "notifications" in first
+    assert {ctx.id for ctx in contexts} <= {ctx["id"] for ctx in first["contexts"]}
+
+    # nothing changed
+    response = poll(handler, **next_input(selected, first))
+    assert response["unchanged"] and "contexts" not in response and "logs" not in response
+
+    # one renamed chat is serialized again, the selected chat is not sent
+    outputs = []
+    output = AgentContext.output
+    monkeypatch.setattr(AgentContext, "output", lambda self: outputs.append(self.id) or output(self))
+    contexts[5].name = "Renamed"
+    response = poll(handler, **next_input(selected, first))
+    assert outputs == [contexts[5].id] and "logs" not in response and not response.get("unchanged")
+    assert next(ctx for ctx in response["contexts"] if ctx["id"] == contexts[5].id)["name"] == "Renamed"
+
+    # a message in the selected chat changes its log and list entry
+    selected.log.log(type="response", heading="Reply", content="reply")
+    update = poll(handler, **{**next_input(selected, response), "log_from": first["log_version"]})
+    assert [log["heading"] for log in update["logs"]] == ["Reply"]
+    assert outputs == [contexts[5].id, selected.id]
+
+    # clients without versions get everything
+    full = poll(handler, context=selected.id)
+    assert {"logs", "contexts", "tasks", "notifications"} <= set(full)
+
+
+def test_poll_cpu(contexts):
+    handler = Poll(app=None, thread_lock=threading.Lock())  # type: ignore[arg-type]
+    selected = contexts[0]
+
+    def cold_poll():
+        # every poll rebuilds the lists, as before versions
+        Poll._lists.clear()
+        Poll._outputs.clear()
+        poll(handler, context=selected.id)
+
+    steady = poll(handler, context=selected.id)
+
+    def steady_poll():
+        poll(handler, **next_input(selected, steady))
+
+    cold_seconds = measure(cold_poll)
+    steady_seconds = measure(steady_poll)
+    print(
+        f"\n{CONTEXTS} contexts, {CLIENTS} clients x {POLLS} polls: "
+        f"full {cold_seconds:.3f}s CPU, versioned {steady_seconds:.3f}s CPU"
+    )
+    assert steady_seconds * 3 < cold_seconds
+
+
+def measure(fn) -> float:
+    def client():
+        for _ in range(POLLS):
+            fn()
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    start = time.process_time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.process_time() - start
@@ -0,0 +1,75 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+import models
+from tests.fake_llm_server import FakeLLMServer
+
+
+def _messages():
+    summary = HumanMessage(content="summary of earlier topics")
+    summary.additional_kwargs[models.CACHE_BREAKPOINT_KWARG] = True
+    return [
+        SystemMessage(content="system prompt"),
+        summary,
+        AIMessage(content="ok"),
+        HumanMessage(content="current message"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cache_breakpoints_and_usage():
+    with FakeLLMServer() as server:
+        server.add_anthropic_stream(
+            "Hello",
+            usage={"input_tokens": 20, "cache_read_input_tokens": 1000, "cache_creation_input_tokens": 0},
+        )
+        model = models.LiteLLMChatWrapper(
+            model="claude-test",
+            provider="anthropic",
+            api_base=server.url,
+            api_key="test",
+            a0_prompt_caching=True,
+        )
+
+        chunks = []
+
+        async def callback(chunk: str, full: str):
+            chunks.append(chunk)
+
+        response, _ = await model.unified_call(messages=_messages(), response_callback=callback)
+
+    assert response == "Hello"
+    body = server.requests[0]["json"]
+    # system prompt is sent as blocks with a breakpoint on the last one
+    assert body["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    # the summarized history prefix is marked, the current message is not
+    first, *_, last = body["messages"]
+    assert first["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in str(last)
+
+    stats = models.get_prompt_cache_stats(model.model_name)
+    assert stats.requests == 1
+    assert stats.cached_tokens == 1000
+
+
+@pytest.mark.asyncio
+async def test_no_breakpoints_when_disabled():
+    with FakeLLMServer() as server:
+        server.add_anthropic_stream("Hello")
+        model = models.LiteLLMChatWrapper(
+            model="claude-test",
+            provider="anthropic",
+            api_base=server.url,
+            api_key="test",
+        )
+
+        async def callback(chunk: str, full: str):
+            pass
+
+        await model.unified_call(messages=_messages(), response_callback=callback)
+
+    assert "cache_control" not in str(server.requests[0]["json"])
@@ -1,25 +1,154 @@
 
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import time
+import pytest
 import models
+from python.helpers.rate_limiter import RateLimiter
 
 provider = "openrouter"
 name = "deepseek/deepseek-r1"
 
-model = models.get_chat_model(
-    provider=provider,
-    name=name,
-    model_config=models.ModelConfig(
-        type=models.ModelType.CHAT,
-        provider=provider,
-        name=name,
-        limit_requests = 5,
-        limit_input = 15000,
-        limit_output = 1000,
-    )
-    )
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float):
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+def fake_limiter(seconds: int = 10, **limits: int):
+    clock = FakeClock()
+    return RateLimiter(seconds=seconds, clock=clock, sleep=clock.sleep, **limits), clock
+
+
+@pytest.mark.asyncio
+async def test_waits_exactly_until_capacity_frees():
+    limiter, clock = fake_limiter(requests=2)
+    await limiter.acquire(requests=1)
+    clock.now = 0.05
+    await limiter.acquire(requests=1)
+    clock.now = 1
+    await limiter.acquire(requests=1)
+    assert clock.now == pytest.approx(10)  # first entry expired, no 1s polling steps
+    await limiter.acquire(requests=1)
+    assert clock.now == pytest.approx(10.05)
+
+
+@pytest.mark.asyncio
+async def test_waiters_do_not_overtake():
+    limiter, clock = fake_limiter(input=10)
+    await limiter.acquire(input=8)
+    admitted = []
+
+    async def request(label: str, tokens: int):
+        await limiter.acquire(input=tokens)
+        admitted.append((label, clock.now))
+
+    big = asyncio.create_task(request("big", 5))
+    await asyncio.sleep(0)
+    small = asyncio.create_task(request("small", 1))  # would fit, but arrived later
+    await asyncio.gather(big, small)
+    assert admitted == [("big", 10), ("small", 10)]
+
+
+@pytest.mark.asyncio
+async def test_priority_goes_first():
+    limiter, clock = fake_limiter(requests=1)
+    await limiter.acquire(requests=1)
+    admitted = []
+
+    async def request(label: str, priority: int):
+        await limiter.acquire(priority=priority, requests=1)
+        admitted.append((label, clock.now))
+
+    tasks = [asyncio.create_task(request("background", 1))]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(request("chat", 0)))
+    await asyncio.gather(*tasks)
+    assert admitted == [("chat", 10), ("background", 20)]
+
+
+@pytest.mark.asyncio
+async def test_callback_and_cancellation():
+    limiter, clock = fake_limiter(requests=1)
+    await limiter.acquire(requests=1)
+    messages = []
+
+    async def callback(msg: str, key: str, total: int, limit: int):
+        messages.append((key, total, limit))
+        return True  # proceed without waiting
+
+    await limiter.acquire(callback, requests=1)
+    assert messages == [("requests", 2, 1)]
+    assert clock.now == 0
+
+    waiting = asyncio.create_task(limiter.acquire(requests=1))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert not limiter._waiters
+
+
+@pytest.mark.asyncio
+async def test_running_totals():
+    limiter, clock = fake_limiter(output=0)
+    for i in range(1000):
+        clock.now = i / 100
+        limiter.add(output=1)
+    assert await limiter.get_total("output") == 1000
+    clock.now = 15
+    assert await limiter.get_total("output") == 499  # entries older than or at the cutoff (t <= 5) expired
+
+
+def test_acquire_sync_wakes_on_time():
+    limiter = RateLimiter(seconds=1, requests=1)
+    limiter.acquire_sync(requests=1)
+    time.sleep(0.7)
+    start = time.monotonic()
+    limiter.acquire_sync(requests=1)
+    assert 0.2 <= time.monotonic() - start < 0.5
+
+
+@pytest.mark.asyncio
+async def test_sync_caller_on_loop_behind_async_waiter(monkeypatch):
+    limiter = RateLimiter(seconds=1, requests=1)
+    monkeypatch.setitem(models.rate_limiters, f"{provider}\\{name}", limiter)
+    config = models.ModelConfig(type=models.ModelType.CHAT, provider=provider, name=name, limit_requests=1)
+    await limiter.acquire(requests=1)
+    queued = asyncio.create_task(limiter.acquire(requests=1))
+    await asyncio.sleep(0)
+
+    # blocking the loop thread would keep the queued waiter from ever being admitted
+    with pytest.raises(RuntimeError):
+        limiter.acquire_sync(requests=1)
+
+    start = time.monotonic()
+    models.apply_rate_limiter_sync(config, "text")
+    assert queued.done()
+    assert 1.5 < time.monotonic() - start < 5  # after the queued waiter's window
+
 
 async def run():
+    model = models.get_chat_model(
+        provider=provider,
+        name=name,
+        model_config=models.ModelConfig(
+            type=models.ModelType.CHAT,
+            provider=provider,
+            name=name,
+            limit_requests = 5,
+            limit_input = 15000,
+            limit_output = 1000,
+        )
+        )
     response, reasoning = await model.unified_call(
         user_message="Tell me a joke"
     )
@@ -27,5 +156,5 @@ async def run():
     print("Reasoning: ", reasoning)
 
 
-import asyncio
-asyncio.run(run())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(run())
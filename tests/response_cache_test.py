@@ -0,0 +1,95 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import pytest
+
+import models
+
+
+class FakeUtilityModel:
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, response: str, delay: float = 0):
+        async def run():
+            self.calls += 1
+            await asyncio.sleep(delay)
+            return response
+
+        return run
+
+
+def test_key_ignores_api_key_and_internal_params():
+    a = models.ResponseCache.make_key("m", "sys", "msg", {"api_key": "a", "temperature": 0})
+    b = models.ResponseCache.make_key("m", "sys", "msg", {"api_key": "b", "temperature": 0, "a0_response_cache": True})
+    c = models.ResponseCache.make_key("m", "sys", "msg", {"temperature": 1})
+    assert a == b
+    assert a != c
+
+
+@pytest.mark.asyncio
+async def test_hits_and_coalescing(tmp_path):
+    cache = models.ResponseCache(folder=str(tmp_path))
+    model = FakeUtilityModel()
+    results = await asyncio.gather(
+        *[cache.get_or_call("k", model.call("answer", 0.05), ttl=60) for _ in range(5)]
+    )
+    assert [r for r, _ in results] == ["answer"] * 5
+    assert model.calls == 1
+    assert await cache.get_or_call("k", model.call("other"), ttl=60) == ("answer", True)
+    assert model.calls == 1
+    assert cache.stats.coalesced == 4
+    assert cache.stats.saved_calls == 5
+    assert cache.stats.hit_ratio() == pytest.approx(5 / 6)
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached(tmp_path):
+    cache = models.ResponseCache(folder=str(tmp_path))
+
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await cache.get_or_call("k", fail, ttl=60)
+    model = FakeUtilityModel()
+    assert await cache.get_or_call("k", model.call("ok"), ttl=60) == ("ok", False)
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_disk_spill(tmp_path):
+    cache = models.ResponseCache(max_entries=1, folder=str(tmp_path))
+    model = FakeUtilityModel()
+    await cache.get_or_call("a", model.call("first"), ttl=60)
+    await cache.get_or_call("b", model.call("second"), ttl=60)  # spills "a" to disk
+    assert len(cache._entries) == 1
+    assert await cache.get_or_call("a", model.call("again"), ttl=60) == ("first", True)
+    assert cache.stats.disk_hits == 1
+
+    await cache.get_or_call("c", model.call("expired"), ttl=-1)
+    assert await cache.get_or_call("c", model.call("fresh"), ttl=60) == ("fresh", False)
+    assert model.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_disk_io_runs_off_the_event_loop(tmp_path):
+    cache = models.ResponseCache(max_entries=1, folder=str(tmp_path))
+    threads = []
+
+    def record(method):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return method(*args)
+
+        return wrapper
+
+    cache._write_spills = record(cache._write_spills)  # type: ignore
+    cache._read_spilled = record(cache._read_spilled)  # type: ignore
+    model = FakeUtilityModel()
+    await cache.get_or_call("a", model.call("first"), ttl=60)
+    await cache.get_or_call("b", model.call("second"), ttl=60)  # spills "a" to disk
+    assert await cache.get_or_call("a", model.call("again"), ttl=60) == ("first", True)
+    assert threads and threading.current_thread() not in threads
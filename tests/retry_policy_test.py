@@ -0,0 +1,127 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import pytest
+
+import models
+from tests.fake_llm_server import FakeLLMServer
+
+
+def _model(server: FakeLLMServer, **kwargs):
+    return models.LiteLLMChatWrapper(
+        model="gpt-test",
+        provider="openai",
+        api_base=server.url + "/v1",
+        api_key="test",
+        **kwargs,
+    )
+
+
+async def _call(model: models.LiteLLMChatWrapper):
+    async def callback(chunk: str, full: str):
+        pass
+
+    response, _ = await model.unified_call(user_message="hi", response_callback=callback)
+    return response
+
+
+@pytest.fixture(autouse=True)
+def reset_breakers():
+    models.circuit_breakers.clear()
+    yield
+    models.circuit_breakers.clear()
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured():
+    with FakeLLMServer() as server:
+        server.add_error(429, {"Retry-After": "0.5"}, "rate limited")
+        server.add_openai_stream("done")
+        start = time.monotonic()
+        response = await _call(_model(server, a0_retry_delay_seconds=0.01))
+        elapsed = time.monotonic() - start
+
+    assert response == "done"
+    assert len(server.requests) == 2  # no hidden retries inside the provider client
+    assert elapsed >= 0.5
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    with FakeLLMServer() as server:
+        server.add_error(503)
+        server.add_error(502)
+        server.add_openai_stream("done")
+        response = await _call(_model(server, a0_retry_attempts=2, a0_retry_delay_seconds=0.01))
+
+    assert response == "done"
+    assert len(server.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_token_rate_limit_is_retried():
+    with FakeLLMServer() as server:
+        server.add_error(429, message="Rate limit reached: too many tokens per minute")
+        server.add_openai_stream("done")
+        response = await _call(_model(server, a0_retry_delay_seconds=0.01))
+
+    assert response == "done"
+    assert len(server.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_context_overflow_is_not_retried():
+    with FakeLLMServer() as server:
+        server.add_error(400, message="This model's maximum context length is 8192 tokens")
+        server.add_openai_stream("never")
+        with pytest.raises(Exception) as exc_info:
+            await _call(_model(server, a0_retry_delay_seconds=0.01))
+
+    assert models.classify_llm_error(exc_info.value) == models.LLMErrorKind.CONTEXT_OVERFLOW
+    assert len(server.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_stops_hammering():
+    with FakeLLMServer() as server:
+        model = _model(server, a0_retry_attempts=0, a0_retry_max_delay_seconds=1)
+        breaker = models.get_circuit_breaker(model.provider, server.url + "/v1")
+        breaker.failure_threshold = 2
+        breaker.cooldown = 30
+        for _ in range(2):
+            server.add_error(500)
+            with pytest.raises(Exception):
+                await _call(model)
+        # breaker is open now, the endpoint is not called again
+        with pytest.raises(models.CircuitOpenError):
+            await _call(model)
+
+    assert len(server.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_half_open_probe():
+    breaker = models.CircuitBreaker(failure_threshold=1, cooldown=0.2)
+    breaker.record_failure(models.LLMErrorKind.TRANSIENT)
+    assert breaker.is_open()
+    start = time.monotonic()
+    await breaker.before_call(max_wait=1)  # waits for cooldown, then probes
+    assert time.monotonic() - start >= 0.2
+    with pytest.raises(models.CircuitOpenError):
+        await breaker.before_call(max_wait=0.01)  # probe in flight
+    breaker.record_success()
+    await breaker.before_call(max_wait=0)
+
+
+def test_decorrelated_jitter_bounds():
+    policy = models.RetryPolicy(max_attempts=5, base_delay=1, max_delay=10)
+    delay = 0.0
+    for _ in range(50):
+        delay = policy.next_delay(delay)
+        assert delay is not None and 1 <= delay <= 10
+    assert policy.next_delay(1, retry_after=3) >= 3
+    assert policy.next_delay(1, retry_after=30) is None
+    assert not policy.should_retry(models.LLMErrorKind.FATAL, 0)
+    assert not policy.should_retry(models.LLMErrorKind.TRANSIENT, 5)
@@ -0,0 +1,97 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import time
+import pytest
+
+from python.helpers import files, shell_ssh  # noqa: F401, import order for helpers
+from python.helpers.log import Log
+from python.helpers.shell_ssh import OutputBuffer, SSHInteractiveSession, clean_string
+
+
+class FakeChannel:
+    # stand-in for a paramiko channel with buffered output
+    def __init__(self, data: bytes, chunk_size: int = 1024):
+        self.chunks = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+        self.closed = False
+
+    def recv_ready(self):
+        return bool(self.chunks)
+
+    def recv(self, size: int) -> bytes:
+        data = b""
+        while self.chunks and len(data) + len(self.chunks[0]) <= size:
+            data += self.chunks.pop(0)
+        return data or self.chunks.pop(0)
+
+
+def test_incremental_cleaning_matches_clean_string():
+    pieces = ["ls", " ", "\r", "\n", "\r\n", ">", "\x1b[31m", "\x1b[0m", "é", "\x00", "\t", "x\ry", "\r\r\n"]
+    rnd = random.Random(7)
+    for _ in range(2000):
+        text = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 40)))
+        data = text.encode()
+        buffer = OutputBuffer()
+        i = 0
+        while i < len(data):
+            step = rnd.randint(1, 5)  # splits escapes and multi-byte characters
+            buffer.feed(data[i : i + step])
+            i += step
+        assert buffer.render() == clean_string(text)
+
+
+def test_head_and_tail_are_bounded(tmp_path):
+    buffer = OutputBuffer(max_chars=1000, spill_folder=str(tmp_path))
+    for i in range(1000):
+        buffer.feed(f"line {i}\n".encode())
+    output = buffer.render()
+    assert len(output) <= 1000 + 200  # plus the omission note
+    assert output.startswith("line 0\nline 1\n")
+    assert output.endswith("line 999\n")
+    assert "characters omitted" in output
+
+    # the spill file has everything for paging through later
+    assert buffer.spill_path and buffer.spill_path in output
+    buffer.close()
+    with open(buffer.spill_path) as file:
+        assert file.read().splitlines() == [f"line {i}" for i in range(1000)]
+
+
+def test_no_spill_below_cap(tmp_path):
+    buffer = OutputBuffer(max_chars=10_000, spill_folder=str(tmp_path))
+    buffer.feed(b"short output\n")
+    assert buffer.render() == "short output\n"
+    assert buffer.spill_path is None
+    assert not os.listdir(tmp_path)
+
+
+def test_spill_files_are_pruned_per_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(shell_ssh, "OUTPUT_SPILL_FILES", 1)
+    kept = OutputBuffer(max_chars=1000, spill_folder=str(tmp_path / "chat-a"))
+    kept.feed(b"line\n" * 1000)
+    kept.close()
+    for _ in range(3):  # a busy chat only prunes its own files
+        busy = OutputBuffer(max_chars=1000, spill_folder=str(tmp_path / "chat-b"))
+        busy.feed(b"line\n" * 1000)
+        busy.close()
+    assert kept.spill_path and os.path.exists(kept.spill_path)
+    assert len(os.listdir(tmp_path / "chat-b")) == 1
+
+
+@pytest.mark.asyncio
+async def test_ssh_read_throughput(tmp_path):
+    lines = b"".join(b"\x1b[32mprogress\x1b[0m %d%%\r\n" % (i % 100) for i in range(200_000))
+    session = SSHInteractiveSession(Log(), "localhost", 22, "root", "")
+    session.shell = FakeChannel(lines)  # type: ignore
+    session.output = OutputBuffer(spill_folder=str(tmp_path))
+
+    start = time.monotonic()
+    full, partial = await session.read_output()
+    elapsed = time.monotonic() - start
+
+    assert full.endswith("progress 99%\n")
+    assert "characters omitted" in full
+    assert len(partial) <= session.output.tail_chars  # only the recent part is echoed
+    assert elapsed < 5  # was throttled to ~10 KB/s by fixed sleeps
@@ -0,0 +1,124 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import time
+import pytest
+
+from python.helpers import shell_pool
+from python.helpers.shell_local import LocalInteractiveSession
+
+
+class FakeSSHSession:
+    # stand-in for SSHInteractiveSession with a slow handshake
+    connects = 0
+
+    def __init__(self):
+        self.connected = False
+        self.closed = False
+
+    async def connect(self):
+        await asyncio.sleep(0.2)
+        FakeSSHSession.connects += 1
+        self.connected = True
+
+    async def close(self):
+        self.closed = True
+
+    def is_alive(self):
+        return self.connected and not self.closed
+
+
+async def _settle(pool: shell_pool.ShellPool):
+    while pool._tasks:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_warm_shell_is_swapped_in():
+    pool = shell_pool.ShellPool(FakeSSHSession)
+    first = await pool.acquire()  # cold
+    await _settle(pool)
+    assert len(pool._ready) == 1
+
+    start = time.monotonic()
+    second = await pool.acquire()
+    assert time.monotonic() - start < 0.1  # no handshake on the critical path
+    assert second is not first and second.is_alive()
+    await _settle(pool)
+    pool.close()
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_dead_shells_are_replaced():
+    pool = shell_pool.ShellPool(FakeSSHSession)
+    await pool.acquire()
+    await _settle(pool)
+    pool._ready[0].closed = True  # died while waiting
+    shell = await pool.acquire()
+    assert shell.is_alive()
+    await _settle(pool)
+    pool.close()
+
+
+@pytest.mark.asyncio
+async def test_warming_on_a_previous_loop_is_ignored():
+    pool = shell_pool.ShellPool(FakeSSHSession)
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever)
+    thread.start()
+    try:
+        # leased on another loop, its warm shell is still connecting when this loop takes over
+        asyncio.run_coroutine_threadsafe(pool.acquire(), other).result(5)
+        await pool.acquire()
+        await asyncio.sleep(0.3)  # both warmings finished
+        await _settle(pool)
+        assert pool._warming == 0
+        assert len(pool._ready) == 1
+        pool.replenish()
+        assert not pool._tasks  # no extra shell spawned
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join()
+        other.close()
+    pool.close()
+
+
+@pytest.mark.asyncio
+async def test_setup_runs_for_each_lease():
+    pool = shell_pool.ShellPool(FakeSSHSession)
+    leased = []
+    cold = await pool.acquire(lambda shell: leased.append((shell, shell.connected)))
+    await _settle(pool)
+    warm = await pool.acquire(lambda shell: leased.append((shell, shell.connected)))
+    assert leased == [(cold, False), (warm, True)]  # cold shells are set up before connecting
+    await _settle(pool)
+    pool.close()
+
+
+@pytest.mark.asyncio
+async def test_local_pty_pool():
+    pool = shell_pool.get_pool(("test-context", "local", None), lambda: LocalInteractiveSession())
+    shell = await pool.acquire()
+    await shell.send_command("echo pooled")
+    output = ""
+    for _ in range(300):
+        output, _ = await shell.read_output(timeout=0.1)
+        if "pooled" in output:
+            break
+    assert "pooled" in output
+
+    await _settle(pool)
+    warm = pool._ready[0]
+    assert warm.is_alive()
+    shell_pool.recycle(shell)
+    shell_pool.close_pools("test-context")
+    assert ("test-context", "local", None) not in shell_pool._pools
+    for _ in range(50):
+        await asyncio.sleep(0.05)
+        if not shell.is_alive() and not warm.is_alive():
+            break
+    assert not shell.is_alive() and not warm.is_alive()
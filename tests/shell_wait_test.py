@@ -0,0 +1,78 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+import pytest
+
+from python.helpers import files
+from python.helpers.shell_local import LocalInteractiveSession
+from python.helpers.shell_ssh import SSHInteractiveSession
+from python.helpers.log import Log
+
+
+class PipeChannel:
+    # stand-in for a paramiko channel, signals data on a pollable pipe like paramiko does
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.data = b""
+        self.closed = False
+        self.eof_received = False
+
+    def fileno(self):
+        return self.read_fd
+
+    def push(self, data: bytes):
+        self.data += data
+        os.write(self.write_fd, b"*")
+
+    def recv_ready(self):
+        return bool(self.data)
+
+    def recv(self, size: int) -> bytes:
+        data, self.data = self.data[:size], self.data[size:]
+        if not self.data:
+            os.read(self.read_fd, 1024)
+        return data
+
+
+@pytest.mark.asyncio
+async def test_ssh_wait_wakes_on_data():
+    session = SSHInteractiveSession(Log(), "localhost", 22, "root", "")
+    channel = session.shell = PipeChannel()  # type: ignore
+
+    start = time.monotonic()
+    assert not await session.wait_for_output(timeout=0.1)
+    assert time.monotonic() - start >= 0.1
+
+    asyncio.get_running_loop().call_later(0.05, channel.push, b"root@host:~# ")
+    start = time.monotonic()
+    assert await session.wait_for_output(timeout=5)
+    assert time.monotonic() - start < 1  # woken by the data, not the timeout
+
+    full, partial = await session.read_output()
+    assert partial.strip() == "root@host:~#"
+    assert not await session.wait_for_output(timeout=0)
+
+
+@pytest.mark.asyncio
+async def test_local_wait_wakes_on_data():
+    shell = LocalInteractiveSession()
+    await shell.connect()
+    try:
+        for _ in range(100):  # let the shell finish starting up
+            if not await shell.wait_for_output(timeout=1):
+                break
+            await shell.read_output(timeout=0.1)
+
+        await shell.send_command("sleep 0.3; echo done")
+        start = time.monotonic()
+        full = ""
+        while "done" not in full and time.monotonic() - start < 30:
+            assert await shell.wait_for_output(timeout=30)
+            full, _ = await shell.read_output(timeout=1)
+        assert "done" in full
+        assert time.monotonic() - start < 5
+    finally:
+        await shell.close()
@@ -0,0 +1,95 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+import pytest
+
+import models
+from python.helpers.secrets import StreamingSecretsFilter
+
+
+async def _stream(chunks: list[str], delay: float = 0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_batched_in_order():
+    received = []
+
+    async def callback(chunk: str, full: str):
+        received.append((chunk, full))
+
+    coalescer = models.StreamCoalescer({"response": callback}, max_delay=10, max_chars=10)
+    full = ""
+    async for chunk in coalescer.iterate(_stream(list("abcdefghijklmnopqrstuvwxyz"))):
+        full += chunk
+        await coalescer.add("response", chunk, full)
+    await coalescer.flush()
+
+    assert [c for c, _ in received] == ["abcdefghij", "klmnopqrst", "uvwxyz"]
+    assert received[-1][1] == full
+
+
+@pytest.mark.asyncio
+async def test_stalled_stream_flushes_within_window():
+    received = []
+    start = time.monotonic()
+
+    async def callback(chunk: str, full: str):
+        received.append((chunk, time.monotonic() - start))
+
+    async def stalled():
+        yield "tool"
+        await asyncio.sleep(0.5)
+        yield "call"
+
+    coalescer = models.StreamCoalescer({"response": callback}, max_delay=0.03, max_chars=256)
+    full = ""
+    async for chunk in coalescer.iterate(stalled()):
+        full += chunk
+        await coalescer.add("response", chunk, full)
+    await coalescer.flush()
+
+    assert received[0][0] == "tool"
+    assert received[0][1] < 0.3  # not held until the next chunk arrives
+    assert received[1][0] == "call"
+
+
+@pytest.mark.asyncio
+async def test_kinds_are_not_interleaved():
+    received = []
+
+    async def reasoning(chunk: str, full: str):
+        received.append(("reasoning", chunk))
+
+    async def response(chunk: str, full: str):
+        received.append(("response", chunk))
+
+    coalescer = models.StreamCoalescer({"reasoning": reasoning, "response": response}, max_delay=10)
+    await coalescer.add("reasoning", "think", "think")
+    await coalescer.add("reasoning", "ing", "thinking")
+    await coalescer.add("response", "{", "{")
+    await coalescer.flush()
+    assert received == [("reasoning", "thinking"), ("response", "{")]
+
+
+def test_secret_masking_across_window_boundaries():
+    secrets = {"API_TOKEN": "sk-secret-value-123"}
+    text = "use sk-secret-value-123 now and sk-secret-value-123 again"
+    tokens = [text[i : i + 3] for i in range(0, len(text), 3)]
+
+    per_token = StreamingSecretsFilter(secrets)
+    expected = "".join(per_token.process_chunk(t) for t in tokens) + per_token.finalize()
+
+    # windows that split the secret at arbitrary points
+    windows = ["".join(tokens[i : i + 2]) for i in range(0, len(tokens), 2)]
+    batched = StreamingSecretsFilter(secrets)
+    actual = "".join(batched.process_chunk(w) for w in windows) + batched.finalize()
+
+    assert actual == expected
+    assert "sk-secret" not in actual
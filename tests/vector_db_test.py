@@ -0,0 +1,132 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+import pytest
+
+from python.helpers import files  # noqa: F401, import order avoids a circular import
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from python.helpers.vector_db import VectorDB
+
+WORDS = ["engine", "gearbox", "brakes", "wheels", "seats", "radio"]
+
+
+class WordEmbeddings(Embeddings):
+    # normalized bag of known words, counts embedding calls
+    model_name = "vector_db_test"
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self._embed(text)
+
+    def _embed(self, text):
+        vector = [float(text.count(word)) for word in WORDS] + [0.01]
+        norm = sum(value * value for value in vector) ** 0.5
+        return [value / norm for value in vector]
+
+
+class FakeAgent:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def get_embedding_model(self):
+        return self.embeddings
+
+
+async def create_db():
+    embeddings = WordEmbeddings()
+    db = VectorDB(FakeAgent(embeddings), cache=False, index_fields=["document_uri"])  # type: ignore[arg-type]
+    docs = []
+    for uri in ["file:///a.txt", "file:///b.txt", "file:///c.txt"]:
+        for i, word in enumerate(WORDS):
+            docs.append(Document(f"{word} notes from {uri}", metadata={"document_uri": uri, "chunk_index": i}))
+    await db.insert_documents(docs)
+    return db, embeddings
+
+
+@pytest.mark.asyncio
+async def test_field_index_matches_metadata_filter():
+    db, _ = await create_db()
+    indexed = db.get_by_field("document_uri", ["file:///a.txt", "file:///c.txt"])
+    filtered = await db.search_by_metadata("document_uri == 'file:///a.txt' or document_uri == 'file:///c.txt'")
+    assert sorted(doc.metadata["id"] for doc in indexed) == sorted(doc.metadata["id"] for doc in filtered)
+
+    await db.delete_documents_by_ids([doc.metadata["id"] for doc in db.get_by_field("document_uri", ["file:///a.txt"])])
+    assert db.get_by_field("document_uri", ["file:///a.txt"]) == []
+    assert len(db.get_by_field("document_uri", ["file:///c.txt"])) == len(WORDS)
+
+
+@pytest.mark.asyncio
+async def test_batched_search_matches_single_searches():
+    db, embeddings = await create_db()
+    # positions shift after a delete, searches must still map to the right chunks
+    await db.delete_documents_by_ids([db.get_by_field("document_uri", ["file:///a.txt"])[0].metadata["id"]])
+    queries = ["engine", "gearbox brakes", "radio", "nothing known"]
+    uris = ["file:///b.txt", "file:///c.txt"]
+    ids = [doc.metadata["id"] for doc in db.get_by_field("document_uri", uris)]
+
+    calls = embeddings.calls
+    batched = await db.search_many_by_similarity_threshold(queries, limit=100, threshold=0.6, ids=ids)
+    assert embeddings.calls == calls + 1  # one embedding call for all queries
+
+    filter = " or ".join(f"document_uri == '{uri}'" for uri in uris)
+    for query, result in zip(queries, batched):
+        single = await db.search_by_similarity_threshold(query, limit=100, threshold=0.6, filter=filter)
+        assert sorted(doc.metadata["id"] for doc in result) == sorted(doc.metadata["id"] for doc in single)
+        assert all(doc.metadata["document_uri"] in uris for doc in result)
+    assert len(batched[1]) == 4 and batched[3] == []
+
+
+class FakeQAAgent(FakeAgent):
+    # utility calls take a while, as they do over the network
+    async def handle_intervention(self):
+        pass
+
+    def parse_prompt(self, file, **kwargs):
+        return file
+
+    async def call_utility_model(self, system, message, callback=None, background=False):
+        await asyncio.sleep(0.2)
+        return message.split('"')[1]
+
+    async def call_chat_model(self, messages, **kwargs):
+        return messages[1].content, ""
+
+
+@pytest.mark.asyncio
+async def test_document_qa_runs_questions_concurrently():
+    from python.helpers.document_query import DocumentQueryHelper
+
+    agent = FakeQAAgent(WordEmbeddings())
+    agent.config = True  # type: ignore[attr-defined]
+    helper = DocumentQueryHelper(agent)  # type: ignore[arg-type]
+    texts = {
+        "file:///a.txt": "engine notes\n\nengine notes",
+        "file:///b.txt": "gearbox and brakes notes",
+        "file:///c.txt": "radio notes",
+    }
+
+    async def document_get_content(uri, add_to_db=False):
+        await helper.store.add_document(texts[uri], uri)
+        return texts[uri]
+
+    helper.document_get_content = document_get_content  # type: ignore[method-assign]
+    await document_get_content("file:///c.txt")  # indexed but not queried
+
+    questions = ["engine", "gearbox", "brakes", "radio", "wheels"]
+    start = time.monotonic()
+    ok, answer = await helper.document_qa(["file:///a.txt", "file:///b.txt"], questions)
+    assert time.monotonic() - start < 0.2 * len(questions) / 2
+    assert ok
+    assert "gearbox and brakes notes" in answer and "radio" not in answer.split("# Queries:")[0]
@@ -0,0 +1,77 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import base64
+import io
+import time
+import wave
+import numpy as np
+import pytest
+
+from python.helpers import files  # noqa: F401, import order avoids a circular import
+from python.helpers import whisper
+
+SECONDS = 40  # two chunks
+
+
+def generate_wav(seconds: float, rate: int = 44100) -> str:
+    # tones separated by short pauses, stereo at another rate than whisper uses
+    t = np.arange(int(seconds * rate)) / rate
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > -0.8)
+    samples = (np.stack([tone, tone], axis=1) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_decode_and_split():
+    audio = whisper.decode_audio(base64.b64decode(generate_wav(SECONDS)))
+    assert audio.dtype == np.float32
+    assert abs(len(audio) - SECONDS * whisper.SAMPLE_RATE) <= 1
+
+    chunks = list(whisper.split_audio(audio))
+    assert len(chunks) == 2 and chunks[0][0] == 0 and chunks[1][0] == len(chunks[0][1])
+    assert sum(len(chunk) for _, chunk in chunks) == len(audio)
+    limit = whisper.CHUNK_SECONDS * whisper.SAMPLE_RATE
+    assert limit - whisper.SPLIT_SEARCH_SECONDS * whisper.SAMPLE_RATE < len(chunks[0][1]) <= limit
+
+
+@pytest.mark.asyncio
+async def test_loop_stays_responsive():
+    try:
+        await whisper.preload("tiny")
+    except Exception as e:
+        pytest.skip(f"tiny whisper model not available: {e}")
+
+    # ticks of the event loop while the worker transcribes
+    gaps = []
+
+    async def tick():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticker = asyncio.create_task(tick())
+    start = time.perf_counter()
+    chunks = []
+    async for chunk in whisper.transcribe_stream("tiny", generate_wav(SECONDS)):
+        chunks.append((time.perf_counter() - start, chunk))
+    ticker.cancel()
+
+    print(
+        f"\nchunks after {', '.join(f'{t:.2f}s' for t, _ in chunks)}, "
+        f"longest loop stall {max(gaps) * 1000:.0f} ms over {len(gaps)} ticks"
+    )
+    assert [chunk["start"] for _, chunk in chunks] == [0, chunks[1][1]["start"]]
+    assert chunks[1][1]["start"] > whisper.CHUNK_SECONDS - whisper.SPLIT_SEARCH_SECONDS
+    assert max(gaps) < 0.25
+    assert len(gaps) > 10
@@ -0,0 +1,61 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import time
+import pytest
+
+from python.helpers.worker import Worker
+
+
+def produce(count: int, produced: list, fail: bool = False):
+    for i in range(count):
+        time.sleep(0.05)
+        produced.append(i)
+        yield i
+    if fail:
+        raise ValueError("failed")
+
+
+@pytest.mark.asyncio
+async def test_streams_items_as_produced():
+    worker = Worker("test")
+    produced = []
+    start = time.perf_counter()
+    arrivals = []
+    async for item in worker.stream(produce, 5, produced):
+        arrivals.append((item, time.perf_counter() - start))
+    assert [item for item, _ in arrivals] == list(range(5))
+    assert arrivals[0][1] < arrivals[-1][1] / 2  # the first item did not wait for the rest
+    assert await worker.run(sum, [1, 2]) == 3
+
+    with pytest.raises(ValueError):
+        async for _ in worker.stream(produce, 2, [], True):
+            pass
+    with pytest.raises(ValueError):
+        list(worker.open_stream(produce, 2, [], True))
+
+
+@pytest.mark.asyncio
+async def test_readers_stopping_and_queue_bound():
+    worker = Worker("test", max_queued=2)
+    produced = []
+    stream = worker.open_stream(produce, 100, produced)
+    assert next(stream) == 0
+    stream.close()  # the reader went away
+    await asyncio.sleep(0.3)
+    assert len(produced) <= 2
+
+    # a blocked job and a waiting one fill the queue
+    release = threading.Event()
+    running = worker.run(release.wait)
+    waiting = worker.run(time.sleep, 0)
+    tasks = [asyncio.ensure_future(running), asyncio.ensure_future(waiting)]
+    await asyncio.sleep(0.1)
+    with pytest.raises(Exception, match="Too many test jobs"):
+        await worker.run(time.sleep, 0)
+    release.set()
+    await asyncio.gather(*tasks)
+    assert await worker.run(time.sleep, 0) is None
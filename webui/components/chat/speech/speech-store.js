@@ -3,6 +3,7 @@ import { updateChatInput, sendMessage } from "/index.js";
 import { sleep } from "/js/sleep.js";
 import { store as microphoneSettingStore } from "/components/settings/speech/microphone-setting-store.js";
 import * as shortcuts from "/js/shortcuts.js";
+import { streamJsonApi } from "/js/api.js";
 
 const Status = {
   INACTIVE: "inactive",
@@ -403,30 +404,20 @@ const model = {
   // Kokoro TTS
   async speakWithKokoro(text, waitForPrevious = false, terminator = null) {
     try {
-      // synthesize on the backend
-      const response = await sendJsonData("/synthesize", { text });
-
-      // wait for previous to finish if requested
-      while (waitForPrevious && this.isSpeaking) await sleep(25);
-      if (terminator && terminator()) return;
-
-      // stop previous if any
-      this.stopAudio();
-
-      if (response.success) {
-        if (response.audio_parts) {
-          // Multiple chunks - play sequentially
-          for (const audioPart of response.audio_parts) {
-            if (terminator && terminator()) return;
-            await this.playAudio(audioPart);
-            await sleep(100); // Brief pause
-          }
-        } else if (response.audio) {
-          // Single audio
-          this.playAudio(response.audio);
-        }
-      } else {
-        throw new Error("Kokoro TTS error:", response.error);
+      // synthesized on the backend sentence by sentence, the first one plays while the rest is generated
+      let first = true;
+      for await (const part of streamJsonApi("/synthesize", { text, stream: true })) {
+        // wait for previous to finish if requested, later sentences always wait
+        while ((waitForPrevious || !first) && this.isSpeaking) await sleep(25);
+        if (terminator && terminator()) return;
+
+        // stop previous if any
+        if (first) this.stopAudio();
+        first = false;
+
+        // not awaited, the next sentence is read meanwhile
+        this.isSpeaking = true; // before playback starts, so the next sentence waits
+        this.playAudio(part.audio).catch((error) => console.error(error));
       }
     } catch (error) {
       throw new Error("Kokoro TTS error:", error);
@@ -633,6 +624,9 @@ const model = {
     this.microphoneInput = new MicrophoneInput(async (text, isFinal) => {
       if (isFinal) {
         this.sendMessage(text);
+      } else {
+        // partial transcription of a long recording
+        updateChatInput("(voice) " + text);
       }
     });
 
@@ -886,12 +880,19 @@ class MicrophoneInput {
     const base64 = await this.convertBlobToBase64Wav(audioBlob);
 
     try {
-      const result = await sendJsonData("/transcribe", { audio: base64 });
-      const text = this.filterResult(result.text || "");
+      // long recordings are transcribed in chunks, shown as they arrive
+      let transcription = "";
+      for await (const chunk of streamJsonApi("/transcribe", { audio: base64, stream: true })) {
+        transcription += chunk.text || "";
+        if (this.filterResult(transcription)) {
+          await this.updateCallback(transcription, false);
+        }
+      }
+      const text = this.filterResult(transcription);
 
       if (text) {
-        console.log("Transcription:", result.text);
-        await this.updateCallback(result.text, true);
+        console.log("Transcription:", transcription);
+        await this.updateCallback(transcription, true);
       }
     } catch (error) {
       window.toastFetchError("Transcription error", error);
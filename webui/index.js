@@ -253,6 +253,8 @@ function setConnectionStatus(connected) {
 let lastLogVersion = 0;
 let lastLogGuid = "";
 let lastSpokenNo = 0;
+// versions of the last poll, the backend omits sections that did not change since
+let pollVersions = {};
 
 export async function poll() {
   let updated = false;
@@ -266,6 +268,7 @@ export async function poll() {
       notifications_from: notificationStore.lastNotificationVersion || 0,
       context: context || null,
       timezone: timezone,
+      versions: pollVersions,
     });
 
     // Check if the response is valid
@@ -288,17 +291,26 @@ export async function poll() {
       return;
     }
 
+    pollVersions = response.versions || {};
+    if (response.unchanged) {
+      setConnectionStatus(true);
+      return false;
+    }
+
+    const contextChanged = response.log_guid !== undefined;
+
     // if the chat has been reset, restart this poll as it may have been called with incorrect log_from
-    if (lastLogGuid != response.log_guid) {
+    if (contextChanged && lastLogGuid != response.log_guid) {
       const chatHistoryEl = document.getElementById("chat-history");
       if (chatHistoryEl) chatHistoryEl.innerHTML = "";
       lastLogVersion = 0;
       lastLogGuid = response.log_guid;
+      pollVersions = {};
       await poll();
       return;
     }
 
-    if (lastLogVersion != response.log_version) {
+    if (contextChanged && lastLogVersion != response.log_version) {
       updated = true;
       for (const log of response.logs) {
         const messageId = log.id || log.no; // Use log.id if available
@@ -314,27 +326,33 @@ export async function poll() {
       afterMessagesUpdate(response.logs);
     }
 
-    lastLogVersion = response.log_version;
-    lastLogGuid = response.log_guid;
+    if (contextChanged) {
+      lastLogVersion = response.log_version;
+      lastLogGuid = response.log_guid;
 
-    updateProgress(response.log_progress, response.log_progress_active);
+      updateProgress(response.log_progress, response.log_progress_active);
 
-    // Update notifications from response
-    notificationStore.updateFromPoll(response);
+      //set ui model vars from backend
+      inputStore.paused = response.paused;
+    }
 
-    //set ui model vars from backend
-    inputStore.paused = response.paused;
+    // Update notifications from response
+    if (response.notifications_guid !== undefined) {
+      notificationStore.updateFromPoll(response);
+    }
 
     // Update status icon state
     setConnectionStatus(true);
 
     // Update chats list using store
-    let contexts = response.contexts || [];
-    chatsStore.applyContexts(contexts);
+    if (response.contexts !== undefined) {
+      chatsStore.applyContexts(response.contexts);
+    }
 
     // Update tasks list using store
-    let tasks = response.tasks || [];
-    tasksStore.applyTasks(tasks);
+    if (response.tasks !== undefined) {
+      tasksStore.applyTasks(response.tasks);
+    }
 
     // Make sure the active context is properly selected in both lists
     if (context) {
@@ -369,7 +387,7 @@ export async function poll() {
       const welcomeVisible = Boolean(welcomeStore && welcomeStore.isVisible);
 
       // No context selected, try to select the first available item unless welcome screen is active
-      if (!welcomeVisible && contexts.length > 0) {
+      if (!welcomeVisible && chatsStore.contexts.length > 0) {
         const firstChatId = chatsStore.firstId();
         if (firstChatId) {
           setContext(firstChatId);
@@ -378,10 +396,13 @@ export async function poll() {
       }
     }
 
-    lastLogVersion = response.log_version;
-    lastLogGuid = response.log_guid;
+    if (contextChanged) {
+      lastLogVersion = response.log_version;
+      lastLogGuid = response.log_guid;
+    }
   } catch (error) {
     console.error("Error:", error);
+    pollVersions = {};
     setConnectionStatus(false);
   }
 
@@ -478,6 +499,7 @@ export const setContext = function (id) {
   lastLogGuid = "";
   lastLogVersion = 0;
   lastSpokenNo = 0;
+  pollVersions = {};
 
   // Stop speech when switching chats
   speechStore.stopAudio();
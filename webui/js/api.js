@@ -36,6 +36,50 @@ export async function callJsonApi(endpoint, data) {
   return jsonResponse;
 }
 
+/**
+ * Call a JSON-in streaming API endpoint that responds with one JSON object per line
+ * Objects are yielded as soon as their line arrives, a {success: false} line throws its error
+ * @param {string} endpoint - The API endpoint to call
+ * @param {any} data - The data to send to the API
+ * @returns {AsyncGenerator<any>} The JSON objects of the response
+ */
+export async function* streamJsonApi(endpoint, data) {
+  const response = await fetchApi(endpoint, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    credentials: "same-origin",
+    body: JSON.stringify(data),
+  });
+
+  if (!response.ok) {
+    const error = await response.text();
+    throw new Error(error);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+      const lines = buffer.split("\n");
+      buffer = done ? "" : lines.pop();
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const data = JSON.parse(line);
+        // the backend reports errors after the response started as a last line
+        if (data.success === false) throw new Error(data.error || "Stream failed");
+        yield data;
+      }
+      if (done) break;
+    }
+  } finally {
+    reader.releaseLock();
+  }
+}
+
 /**
  * Fetch wrapper for A0 APIs that ensures token exchange
  * Automatically adds CSRF token to request headers